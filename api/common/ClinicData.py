@@ -11,11 +11,13 @@ class ClinicData:
     """
     ClinicData is a class to retrieve historic referral data and triage classes from the database module.
     Usage:
-        To create a new ClinicData object, create it with `ClinicData(clinic_id)` where
+        To create a new ClinicData object, create it with `ClinicData(clinic_id, session)` where
         those values are:
         ```
         {
             'clinic_id' (int) The ID value of the clinic for which data is needed.
+            'session' (Session) Optional request session to run the queries in, see
+                                `api.common.database_interaction.Session`.
         }
         ```
     """
@@ -34,8 +36,9 @@ class ClinicData:
     """
 
     # Constructor
-    def __init__(self, clinic_id):
+    def __init__(self, clinic_id, session=None):
         self.clinic_id = clinic_id
+        self.session = session
         self.clinic_settings = self._get_clinic_settings_from_database()
 
     def get_referral_data(self, triage_class, interval):
@@ -47,33 +50,235 @@ class ClinicData:
             A list of historic referral datapoints.
         """
 
-        triage_class_data = list(filter(lambda c: c['severity'] == triage_class, self.clinic_settings))[0]
-        triage_class_duration_days = triage_class_data['duration'] * 7
-
-        # Calculate the start and end dates for data retrieval.
-
         # Establish database connection
-        db = DataBase(self.DATABASE_DATA)
+        db = self._get_database()
 
         # Query for referral data from previous year
-        rows = db.select("SELECT CAST(historicdata.date_received AS VARCHAR), \
-                                 CAST(historicdata.date_seen AS VARCHAR) \
-                           FROM triagedata.historicdata \
-                           WHERE historicdata.date_received >= '%(start_date)s'::date \
-                                 AND historicdata.date_received < '%(end_date)s'::date \
-                                 AND (historicdata.severity = %(triage_class)s OR \
-                                     (historicdata.severity IS NULL AND \
-                                      historicdata.date_seen - historicdata.date_received <= %(duration)s))" %
-                         {
-                             'start_date': interval[0],
-                             'end_date': interval[1],
-                             'triage_class': triage_class,
-                             'duration': triage_class_duration_days
-                         })
+        rows = db.select("SELECT CAST(referrals.date_received AS VARCHAR), \
+                                 CAST(referrals.date_seen AS VARCHAR) \
+                          FROM (%s) AS referrals" % self._get_referrals_query('%(triage_class)s', '%(duration)s'),
+                         params=self._get_referrals_params(triage_class, interval),
+                         prepare='referral_data')
 
         # Return results
         return [(self.clinic_id, triage_class) + row for row in rows]
 
+    def stream_referral_data(self, triage_class, interval, size=1000):
+        """Yields historic referral data in chunks, reading it from a server side cursor.
+        Only one chunk is held in memory at a time, however wide the interval is.
+        Parameters:
+            `triage_class` (int): The triage class severity level.
+            `interval` (tuple): A tuple with a start and end date.
+            `size` (int): The number of referral datapoints in each chunk.
+        Yields:
+            Lists of at most size historic referral datapoints, see `get_referral_data`.
+        """
+
+        # Establish database connection
+        db = self._get_database()
+
+        # Stream referral data from previous year
+        chunks = db.stream("SELECT CAST(referrals.date_received AS VARCHAR), \
+                                   CAST(referrals.date_seen AS VARCHAR) \
+                            FROM (%s) AS referrals" % self._get_referrals_query('%(triage_class)s', '%(duration)s'),
+                           params=self._get_referrals_params(triage_class, interval),
+                           size=size)
+
+        # Yield results
+        for rows in chunks:
+            yield [(self.clinic_id, triage_class) + row for row in rows]
+
+    def get_referral_counts(self, triage_class, interval, resolution):
+        """Returns the number of historic referrals received in each period of an interval.
+        Parameters:
+            `triage_class` (int): The triage class severity level.
+            `interval` (tuple): A tuple with a start and end date.
+            `resolution` (str): The period length, one of `day`, `week` (starting on mondays) or `month`.
+        Returns:
+            A list of dictionaries for each period with referrals, ordered by start date, with
+            ```
+            {
+                start (str) Start date of the period.
+                received (int) Number of referrals received in the period.
+                seen (int) Number of those referrals that were seen.
+                on_time (int) Number of those referrals that were seen within the triage class duration.
+            }
+            ```
+        """
+        # Keys for response
+        keys = ['start', 'received', 'seen', 'on_time']
+        # Establish database connection
+        db = self._get_database()
+
+        # Query for referral counts per period
+        params = self._get_referrals_params(triage_class, interval)
+        params['resolution'] = resolution
+        rows = db.select("SELECT CAST(CAST(DATE_TRUNC(%%(resolution)s, CAST(referrals.date_received AS timestamp)) \
+                                           AS date) AS VARCHAR) AS period, \
+                                 COUNT(*), \
+                                 COUNT(referrals.date_seen), \
+                                 COUNT(*) FILTER (WHERE referrals.date_seen - referrals.date_received \
+                                                        <= %%(duration)s) \
+                          FROM (%s) AS referrals \
+                          GROUP BY period \
+                          ORDER BY period" % self._get_referrals_query('%(triage_class)s', '%(duration)s'),
+                         params=params,
+                         prepare='referral_counts')
+
+        # Return results
+        return [dict(zip(keys, values)) for values in rows]
+
+    def get_referral_lateness(self, triage_class, interval):
+        """Returns the distribution of the time historic referrals received within an interval waited to be seen.
+        Parameters:
+            `triage_class` (int): The triage class severity level.
+            `interval` (tuple): A tuple with a start and end date.
+        Returns:
+            A list of dictionaries for each number of weeks waited by at least one referral, ordered by weeks, with
+            ```
+            {
+                weeks (int) Number of whole weeks between the referral being received and seen.
+                seen (int) Number of referrals seen after waiting that many weeks.
+            }
+            ```
+        """
+        # Keys for response
+        keys = ['weeks', 'seen']
+        # Establish database connection
+        db = self._get_database()
+
+        # Query for the number of referrals by weeks waited
+        rows = db.select("SELECT (referrals.date_seen - referrals.date_received) / 7 AS weeks, \
+                                 COUNT(*) \
+                          FROM (%s) AS referrals \
+                          WHERE referrals.date_seen IS NOT NULL \
+                          GROUP BY weeks \
+                          ORDER BY weeks" % self._get_referrals_query('%(triage_class)s', '%(duration)s'),
+                         params=self._get_referrals_params(triage_class, interval),
+                         prepare='referral_lateness')
+
+        # Return results
+        return [dict(zip(keys, values)) for values in rows]
+
+    def get_weekly_referral_counts_by_class(self, triage_classes, interval, weeks):
+        """Returns the number of historic referrals received each week by many triage classes, retrieved with a single
+        query, to use as a start for running ML predictions.
+        Parameters:
+            `triage_classes` (list(int)): The triage class severity levels.
+            `interval` (tuple): A tuple with a start and end date.
+            `weeks` (int): The number of weeks from the start date to count referrals for.
+        Returns:
+            A dictionary with a list of the referral count of each week for each triage class by severity level.
+        """
+        if len(triage_classes) == 0:
+            return {}
+
+        # Establish database connection
+        db = self._get_database()
+
+        # Query for the weekly referral counts of every triage class from previous year
+        params = self._get_referrals_params(triage_classes[0], interval)
+        params['triage_classes'] = list(triage_classes)
+        params['durations_weeks'] = [self._get_referrals_params(triage_class, interval)['duration_weeks']
+                                     for triage_class in triage_classes]
+        rows = db.select("SELECT classes.severity, \
+                                 (counts.date_received - %%(start_date)s::date) / 7 AS week, \
+                                 SUM(counts.referrals) \
+                          FROM UNNEST(%%(triage_classes)s::integer[], %%(durations_weeks)s::integer[]) \
+                               AS classes (severity, duration_weeks) \
+                          CROSS JOIN LATERAL (%s) AS counts \
+                          GROUP BY classes.severity, week" %
+                         self._get_referral_counts_query('classes.severity', 'classes.duration_weeks'),
+                         params=params,
+                         prepare='class_weekly_referral_counts')
+
+        # Return results
+        weekly_counts = {(severity, week): count for severity, week, count in rows}
+        return {triage_class: [weekly_counts.get((triage_class, week), 0) for week in range(weeks)]
+                for triage_class in triage_classes}
+
+    def _get_referrals_query(self, triage_class, duration):
+        """Returns the query for the historic referrals of a triage class of the clinic received within an interval.
+        Referrals without a severity belong to the triage class if they were seen within its duration.
+        Each case is its own branch so that it is served by its clinic scoped index.
+        Parameters:
+            `triage_class` (str): The SQL expression of the triage class severity level.
+            `duration` (str): The SQL expression of the triage class duration in days.
+        Returns:
+            A query string selecting the date_received and date_seen of the referrals, with the parameters of
+            `_get_referrals_params`.
+        """
+
+        return "SELECT historicdata.date_received, historicdata.date_seen \
+                FROM triagedata.historicdata \
+                WHERE historicdata.clinic_id = %%(clinic_id)s \
+                      AND historicdata.severity = %(triage_class)s \
+                      AND historicdata.date_received >= %%(start_date)s::date \
+                      AND historicdata.date_received < %%(end_date)s::date \
+                UNION ALL \
+                SELECT historicdata.date_received, historicdata.date_seen \
+                FROM triagedata.historicdata \
+                WHERE historicdata.clinic_id = %%(clinic_id)s \
+                      AND historicdata.severity IS NULL \
+                      AND historicdata.date_received >= %%(start_date)s::date \
+                      AND historicdata.date_received < %%(end_date)s::date \
+                      AND historicdata.wait_days <= %(duration)s" % \
+            {
+                'triage_class': triage_class,
+                'duration': duration
+            }
+
+    def _get_referral_counts_query(self, triage_class, duration_weeks):
+        """Returns the query for the daily historic referral counts of a triage class of the clinic within an interval.
+        The counts are maintained on upload, see
+        `api.common.HistoricDataUpload.HistoricDataUpload.update_referral_counts`, so reading them does not depend on
+        the size of the history. They follow the same rules as `_get_referrals_query`.
+        Parameters:
+            `triage_class` (str): The SQL expression of the triage class severity level.
+            `duration_weeks` (str): The SQL expression of the triage class duration in weeks.
+        Returns:
+            A query string selecting the date_received and number of referrals of each day, possibly more than once
+            per day, with the parameters of `_get_referrals_params`.
+        """
+
+        return "SELECT dailyreferralcounts.date_received, dailyreferralcounts.referrals \
+                FROM triagedata.dailyreferralcounts \
+                WHERE dailyreferralcounts.clinic_id = %%(clinic_id)s \
+                      AND dailyreferralcounts.severity = %(triage_class)s \
+                      AND dailyreferralcounts.date_received >= %%(start_date)s::date \
+                      AND dailyreferralcounts.date_received < %%(end_date)s::date \
+                UNION ALL \
+                SELECT dailyunclassifiedreferralcounts.date_received, dailyunclassifiedreferralcounts.referrals \
+                FROM triagedata.dailyunclassifiedreferralcounts \
+                WHERE dailyunclassifiedreferralcounts.clinic_id = %%(clinic_id)s \
+                      AND dailyunclassifiedreferralcounts.date_received >= %%(start_date)s::date \
+                      AND dailyunclassifiedreferralcounts.date_received < %%(end_date)s::date \
+                      AND dailyunclassifiedreferralcounts.wait_weeks <= %(duration_weeks)s" % \
+            {
+                'triage_class': triage_class,
+                'duration_weeks': duration_weeks
+            }
+
+    def _get_referrals_params(self, triage_class, interval):
+        """Returns the parameters of the historic referrals query of a triage class.
+        Parameters:
+            `triage_class` (int): The triage class severity level.
+            `interval` (tuple): A tuple with a start and end date.
+        Returns:
+            A dictionary of query parameters, see `_get_referrals_query`.
+        """
+
+        triage_class_data = list(filter(lambda c: c['severity'] == triage_class, self.clinic_settings))[0]
+
+        return {
+            'clinic_id': self.clinic_id,
+            'start_date': interval[0],
+            'end_date': interval[1],
+            'triage_class': triage_class,
+            'duration': triage_class_data['duration'] * 7,
+            'duration_weeks': triage_class_data['duration']
+        }
+
     def get_clinic_settings(self):
         """Returns clinic settings (triage classes).
         Returns:
@@ -99,11 +304,13 @@ class ClinicData:
         # Keys for response
         keys = ['clinic_id', 'severity', 'name', 'duration', 'proportion']
         # Establish database connection
-        db = DataBase(self.DATABASE_DATA)
+        db = self._get_database()
         # Query for data
         rows = db.select("SELECT clinic_id, severity, name, duration, proportion \
                           FROM triagedata.triageclasses \
-                          WHERE clinic_id=%(clinic_id)s" % {'clinic_id': self.clinic_id})
+                          WHERE clinic_id=%(clinic_id)s",
+                         params={'clinic_id': self.clinic_id},
+                         prepare='clinic_settings')
 
         if len(rows) == 0:
             raise RuntimeError('Could not retrieve clinic settings for clinic-id: %s', self.clinic_id)
@@ -111,6 +318,15 @@ class ClinicData:
         # Return data
         return [dict(zip(keys, values)) for values in rows]
 
+    def _get_database(self):
+        """Returns the request session to run queries in, or a database connection if there is none.
+        Returns:
+            A `Session` or `DataBase` object.
+        """
+        if self.session is not None:
+            return self.session
+        return DataBase(self.DATABASE_DATA)
+
     def update_triage_class(self, triage_class):
         """
         Creates or updates the respective triage class within the clinic.
@@ -120,19 +336,19 @@ class ClinicData:
         """
 
         # Establish database connection
-        db = DataBase(self.DATABASE_DATA)
+        db = self._get_database()
         # Insert or update information
         db.insert("INSERT INTO triagedata.triageclasses (clinic_id, severity, name, duration, proportion) \
                     VALUES(%(clinic_id)s, \
                         %(severity)s, \
-                        '%(name)s', \
+                        %(name)s, \
                         %(duration)s, \
                         %(proportion)s) \
                     ON CONFLICT ON CONSTRAINT pk DO UPDATE \
-                        SET name = '%(name)s', \
+                        SET name = %(name)s, \
                             duration = %(duration)s, \
-                            proportion = %(proportion)s" %
-                  {
+                            proportion = %(proportion)s",
+                  params={
                       'clinic_id': triage_class['clinic_id'],
                       'severity': triage_class['severity'],
                       'name': triage_class['name'],
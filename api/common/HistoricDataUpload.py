@@ -0,0 +1,444 @@
+"""
+The HistoricDataUpload loads uploaded past appointments into the historic data in stages.
+"""
+
+# External dependencies.
+import codecs
+import csv
+import hashlib
+import io
+import logging
+
+# Internal dependencies
+from api.common.database_interaction import DataBase, Session
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('clinic_id', 'severity', 'date_received', 'date_seen')
+"""
+The columns of an uploaded past appointments row, in file order.
+"""
+
+STAGING_COLUMNS = ('upload_id', 'line', 'chunk') + COLUMNS + ('rejection',)
+"""
+The columns of the staging table written for every uploaded row.
+"""
+
+NULL_VALUES = ('', '\\N')
+"""
+The uploaded values read as NULL, an empty value or the `\\N` of PostgreSQL text format files.
+"""
+
+MAX_REPORTED_REJECTIONS = 100
+"""
+The maximum number of rejected rows listed in an upload report, the report always holds the total count.
+"""
+
+
+class HistoricDataUpload:
+    """
+    HistoricDataUpload loads a csv file of past appointments into the historic data without a long running transaction.
+    Usage:
+        To load a file, create it with `HistoricDataUpload(connection_data, chunk_size, batch_size)` and load the file
+        with `upload.load(upload_file)`, which returns the report of the upload.
+
+    The upload runs in three stages:
+        1. The file is streamed into the unlogged staging table in chunks of `chunk_size` rows, each chunk in its
+           own transaction.
+        2. The staged rows are validated by a single set based query. Invalid rows are kept with the reason they
+           were rejected.
+        3. The valid rows are merged into the historic data in batches of `batch_size` rows. Each batch is added to
+           the coverage and the referral counts in the transaction inserting it, so readers never see counts that do
+           not match the data and are never blocked for longer than one batch.
+
+    Uploads are identified by the checksum of the file. Rows of past appointments have no natural key, as identical
+    rows are separate referrals, so duplicates are detected per upload: a file that was already merged is reported as
+    a duplicate and not merged again. An upload interrupted while merging resumes from the rows left in staging when
+    the same file is uploaded again. The staging table is emptied when the database restarts, so an upload without
+    staged rows is staged again, skipping the rows it merged before the restart.
+
+    Args:
+        connection_data (dict): The connection data, see `api.common.database_interaction.DataBase`
+        chunk_size (int): The number of rows staged per transaction
+        batch_size (int): The number of rows merged per transaction
+    """
+
+    def __init__(self, connection_data, chunk_size=10000, batch_size=10000):
+        if chunk_size <= 0 or batch_size <= 0:
+            raise ValueError('Invalid upload chunk size %s or batch size %s.', chunk_size, batch_size)
+
+        self.connection_data = connection_data
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+
+    def load(self, upload_file):
+        """
+        Loads a csv file of past appointments into the historic data.
+
+        The file is not expected to contain headers.
+        Expected rows contain: 'clinic_id', 'severity', 'date_received', 'date_seen'
+
+        Args:
+            upload_file (FileStorage): The csv file to import into the database.
+
+        Returns:
+            A dictionary with the upload id, whether the upload is a duplicate, the progress of every chunk, the
+            number of merged and rejected rows and the first rejected rows with the reason they were rejected.
+        """
+        upload_id = self._checksum(upload_file.stream)
+        upload = DataBase(self.connection_data).select(
+            "SELECT uploads.staged_rows, uploads.completed IS NOT NULL, \
+                    EXISTS (SELECT 1 FROM triagedata.historicdatastaging WHERE upload_id = uploads.id) \
+             FROM triagedata.historicdatauploads AS uploads \
+             WHERE uploads.id = %(upload_id)s",
+            params={
+                'upload_id': upload_id
+            })
+
+        if upload and upload[0][1]:
+            logger.info('Upload %s was already merged', upload_id)
+            return {
+                'upload_id': upload_id,
+                'duplicate': True,
+                'chunks': [],
+                'merged_rows': 0,
+                'rejected_rows': 0,
+                'rejected': []
+            }
+
+        if not upload or upload[0][0] is None or not upload[0][2]:
+            self._stage(upload_id, upload_file.stream)
+            self._validate(upload_id)
+
+        last_line = 0
+        while last_line is not None:
+            last_line = self._merge_batch(upload_id, last_line)
+
+        return self._complete(upload_id)
+
+    def _checksum(self, stream):
+        """
+        Computes the checksum identifying an upload, then rewinds the upload for reading.
+
+        Args:
+            stream (file): The binary stream of the uploaded file.
+
+        Returns:
+            The hexadecimal sha256 digest of the file content.
+        """
+        checksum = hashlib.sha256()
+        for block in iter(lambda: stream.read(1 << 16), b''):
+            checksum.update(block)
+        stream.seek(0)
+
+        return checksum.hexdigest()
+
+    def _stage(self, upload_id, stream):
+        """
+        Streams the rows of an upload into the staging table, one chunk per transaction.
+
+        Rows left in staging by an interrupted attempt at staging the same upload are removed first. The number of
+        rows the upload already merged is kept, see `HistoricDataUpload._validate`.
+
+        Args:
+            upload_id (str): The id of the upload.
+            stream (file): The binary stream of the uploaded file.
+        """
+        db = DataBase(self.connection_data)
+        params = {
+            'upload_id': upload_id
+        }
+        db.insert("INSERT INTO triagedata.historicdatauploads (id) VALUES (%(upload_id)s) \
+                   ON CONFLICT (id) DO UPDATE SET staged_rows = NULL, rejected_rows = NULL",
+                  params=params)
+        db.update("DELETE FROM triagedata.historicdatastaging WHERE upload_id = %(upload_id)s", params=params)
+
+        reader = csv.reader(codecs.iterdecode(stream, 'utf-8', errors='replace'))
+        chunk, rows = 0, []
+        for row in reader:
+            if not row:
+                continue
+            rows.append(self._staged_row(upload_id, reader.line_num, chunk, row))
+            if len(rows) == self.chunk_size:
+                self._stage_chunk(db, upload_id, chunk, rows)
+                chunk, rows = chunk + 1, []
+        if rows:
+            self._stage_chunk(db, upload_id, chunk, rows)
+
+    @staticmethod
+    def _staged_row(upload_id, line, chunk, row):
+        """
+        Returns the staging table values of an uploaded row.
+
+        Rows that do not have one value per column are staged without values, and rejected. Values in `NULL_VALUES`
+        are staged as NULL, such as the severity of an unclassified referral or the date seen of an unseen one.
+
+        Args:
+            upload_id (str): The id of the upload.
+            line (int): The line number of the row in the uploaded file.
+            chunk (int): The number of the chunk the row is staged in.
+            row (list): The values read from the uploaded file.
+
+        Returns:
+            A list of values in the order of `STAGING_COLUMNS`.
+        """
+        if len(row) != len(COLUMNS):
+            rejection = 'Expected %s values, found %s' % (len(COLUMNS), len(row))
+            return [upload_id, line, chunk] + [None] * len(COLUMNS) + [rejection]
+
+        values = [value.strip() for value in row]
+        return [upload_id, line, chunk] + [None if value in NULL_VALUES else value for value in values] + [None]
+
+    def _stage_chunk(self, db, upload_id, chunk, rows):
+        """
+        Copies a chunk of rows into the staging table.
+
+        Args:
+            db (DataBase): The database to copy the rows with.
+            upload_id (str): The id of the upload.
+            chunk (int): The number of the chunk.
+            rows (list): The staging table values of the rows, see `HistoricDataUpload._staged_row`.
+        """
+        data_file = io.StringIO()
+        csv.writer(data_file).writerows(rows)
+        data_file.seek(0)
+        db.insert_csv_from_file('triagedata.historicdatastaging', STAGING_COLUMNS, data_file)
+        logger.info('Staged chunk %s of upload %s, %s rows', chunk, upload_id, len(rows))
+
+    def _validate(self, upload_id):
+        """
+        Rejects the staged rows of an upload that cannot be merged into the historic data.
+
+        Valid rows are merged in line order, so the rows an upload merged before its staged rows were lost are its
+        first valid rows. They are marked as merged so they are not merged again.
+
+        Args:
+            upload_id (str): The id of the upload.
+        """
+        params = {
+            'upload_id': upload_id
+        }
+        with Session(self.connection_data) as session:
+            session.update("UPDATE triagedata.historicdatastaging AS staging \
+                            SET rejection = checked.rejection \
+                            FROM (SELECT line, \
+                                         CASE \
+                                             WHEN clinic_id IS NULL THEN 'Missing clinic id' \
+                                             WHEN clinic_id !~ '^[0-9]{1,9}$' THEN 'Invalid clinic id' \
+                                             WHEN NOT EXISTS (SELECT 1 FROM triagedata.clinic \
+                                                              WHERE clinic.id = clinic_id::integer) \
+                                                 THEN 'Unknown clinic id' \
+                                             WHEN severity !~ '^-?[0-9]{1,9}$' THEN 'Invalid severity' \
+                                             WHEN date_received IS NOT NULL \
+                                                  AND triagedata.to_date_or_null(date_received) IS NULL \
+                                                 THEN 'Invalid date received' \
+                                             WHEN date_seen IS NOT NULL \
+                                                  AND triagedata.to_date_or_null(date_seen) IS NULL \
+                                                 THEN 'Invalid date seen' \
+                                             WHEN date_seen::date < date_received::date \
+                                                 THEN 'Date seen before date received' \
+                                         END AS rejection \
+                                  FROM triagedata.historicdatastaging \
+                                  WHERE upload_id = %(upload_id)s AND rejection IS NULL) AS checked \
+                            WHERE staging.upload_id = %(upload_id)s AND staging.line = checked.line \
+                                  AND checked.rejection IS NOT NULL",
+                           params=params)
+            session.update("UPDATE triagedata.historicdatastaging AS staging \
+                            SET merged = true \
+                            FROM (SELECT line FROM triagedata.historicdatastaging \
+                                  WHERE upload_id = %(upload_id)s AND rejection IS NULL \
+                                  ORDER BY line \
+                                  LIMIT (SELECT merged_rows FROM triagedata.historicdatauploads \
+                                         WHERE id = %(upload_id)s)) AS lines \
+                            WHERE staging.upload_id = %(upload_id)s AND staging.line = lines.line",
+                           params=params)
+            session.update("UPDATE triagedata.historicdatauploads \
+                            SET (staged_rows, rejected_rows) = ( \
+                                SELECT COUNT(*), COUNT(rejection) \
+                                FROM triagedata.historicdatastaging \
+                                WHERE upload_id = %(upload_id)s) \
+                            WHERE id = %(upload_id)s",
+                           params=params)
+        logger.info('Validated upload %s', upload_id)
+
+    def _merge_batch(self, upload_id, last_line):
+        """
+        Merges the next batch of valid staged rows of an upload into the historic data, in its own transaction.
+
+        Args:
+            upload_id (str): The id of the upload.
+            last_line (int): The line of the last row merged by the previous batch, or 0 for the first batch.
+
+        Returns:
+            The line of the last merged row, or None if there were no rows left to merge.
+        """
+        params = {
+            'upload_id': upload_id,
+            'last_line': last_line,
+            'batch_size': self.batch_size
+        }
+        with Session(self.connection_data) as session:
+            # Uploads are serialized so that the rows after the last id are the rows of this batch
+            session.update("LOCK TABLE triagedata.dailyreferralcounts IN SHARE ROW EXCLUSIVE MODE")
+            last_id = session.select("SELECT COALESCE(MAX(id), 0) FROM triagedata.historicdata")[0][0]
+            # Create the partitions of the batch first, so its rows are not inserted into the default partition
+            session.update("SELECT triagedata.partition_historic_dates(ARRAY( \
+                                SELECT date_received::date FROM triagedata.historicdatastaging \
+                                WHERE upload_id = %(upload_id)s AND line > %(last_line)s \
+                                      AND rejection IS NULL AND NOT merged \
+                                ORDER BY line \
+                                LIMIT %(batch_size)s))",
+                           params=params)
+            last_line = session.update("WITH batch AS ( \
+                                            UPDATE triagedata.historicdatastaging AS staging \
+                                            SET merged = true \
+                                            FROM (SELECT line FROM triagedata.historicdatastaging \
+                                                  WHERE upload_id = %(upload_id)s AND line > %(last_line)s \
+                                                        AND rejection IS NULL AND NOT merged \
+                                                  ORDER BY line \
+                                                  LIMIT %(batch_size)s) AS lines \
+                                            WHERE staging.upload_id = %(upload_id)s AND staging.line = lines.line \
+                                            RETURNING staging.line, staging.clinic_id, staging.severity, \
+                                                      staging.date_received, staging.date_seen), \
+                                        inserted AS ( \
+                                            INSERT INTO triagedata.historicdata \
+                                                (clinic_id, severity, date_received, date_seen) \
+                                            SELECT clinic_id::integer, severity::integer, \
+                                                   date_received::date, date_seen::date \
+                                            FROM batch \
+                                            ORDER BY line \
+                                            RETURNING 1) \
+                                        UPDATE triagedata.historicdatauploads \
+                                        SET merged_rows = merged_rows + (SELECT COUNT(*) FROM inserted) \
+                                        WHERE id = %(upload_id)s \
+                                        RETURNING (SELECT MAX(line) FROM batch)",
+                                       returning=True,
+                                       params=params)
+            if last_line is None:
+                return None
+
+            self.update_coverage(session, last_id)
+            self.update_referral_counts(session, last_id)
+
+        logger.info('Merged upload %s up to line %s', upload_id, last_line)
+        return last_line
+
+    def _complete(self, upload_id):
+        """
+        Marks an upload as merged and removes its rows from the staging table.
+
+        Args:
+            upload_id (str): The id of the upload.
+
+        Returns:
+            The report of the upload, see `HistoricDataUpload.load`.
+        """
+        params = {
+            'upload_id': upload_id
+        }
+        with Session(self.connection_data) as session:
+            chunks = session.select("SELECT chunk, COUNT(*), COUNT(rejection), COUNT(*) FILTER (WHERE merged) \
+                                     FROM triagedata.historicdatastaging \
+                                     WHERE upload_id = %(upload_id)s \
+                                     GROUP BY chunk \
+                                     ORDER BY chunk",
+                                    params=params)
+            rejected = session.select("SELECT line, rejection \
+                                       FROM triagedata.historicdatastaging \
+                                       WHERE upload_id = %(upload_id)s AND rejection IS NOT NULL \
+                                       ORDER BY line \
+                                       LIMIT %(limit)s",
+                                      params=dict(params, limit=MAX_REPORTED_REJECTIONS))
+            staged_rows, rejected_rows, merged_rows = session.select(
+                "SELECT staged_rows, rejected_rows, merged_rows \
+                 FROM triagedata.historicdatauploads \
+                 WHERE id = %(upload_id)s",
+                params=params)[0]
+
+            # Staging is unlogged, so its rows are lost if the database restarts while merging, uploading the same file
+            # again stages the rows that were not merged
+            if merged_rows != staged_rows - rejected_rows:
+                raise RuntimeError('Upload %s merged %s of %s rows, its staged rows were lost.',
+                                   upload_id, merged_rows, staged_rows - rejected_rows)
+
+            session.update("UPDATE triagedata.historicdatauploads SET completed = CURRENT_TIMESTAMP \
+                            WHERE id = %(upload_id)s",
+                           params=params)
+            session.update("DELETE FROM triagedata.historicdatastaging WHERE upload_id = %(upload_id)s",
+                           params=params)
+
+        logger.info('Completed upload %s, %s rows merged, %s rows rejected', upload_id, merged_rows, rejected_rows)
+        return {
+            'upload_id': upload_id,
+            'duplicate': False,
+            'chunks': [{'chunk': chunk, 'rows': rows, 'rejected': rejected_count, 'merged': merged}
+                       for chunk, rows, rejected_count, merged in chunks],
+            'merged_rows': merged_rows,
+            'rejected_rows': rejected_rows,
+            'rejected': [{'line': line, 'reason': reason} for line, reason in rejected]
+        }
+
+    @staticmethod
+    def update_coverage(db, last_id):
+        """
+        Merges the historic data inserted after a row id into the coverage of each clinic and severity.
+
+        Merging is idempotent, so rows inserted concurrently by other uploads can safely be merged more than once.
+
+        Args:
+            db (DataBase, Session): The database connection information to use.
+            last_id (int): The largest historic data row id before the data was inserted.
+        """
+        db.insert("INSERT INTO triagedata.historiccoverage AS coverage \
+                       (clinic_id, severity, min_date_received, max_date_received, years) \
+                   SELECT clinic_id, severity, MIN(date_received), MAX(date_received), \
+                          ARRAY_AGG(DISTINCT EXTRACT(YEAR FROM date_received)::integer \
+                                    ORDER BY EXTRACT(YEAR FROM date_received)::integer) \
+                   FROM triagedata.historicdata \
+                   WHERE id > %(last_id)s AND date_received IS NOT NULL \
+                   GROUP BY clinic_id, severity \
+                   ON CONFLICT (clinic_id, (COALESCE(severity, -1))) DO UPDATE \
+                       SET min_date_received = LEAST(coverage.min_date_received, EXCLUDED.min_date_received), \
+                           max_date_received = GREATEST(coverage.max_date_received, EXCLUDED.max_date_received), \
+                           years = ARRAY(SELECT DISTINCT UNNEST(coverage.years || EXCLUDED.years) ORDER BY 1)",
+                  params={
+                      'last_id': last_id
+                  })
+
+    @staticmethod
+    def update_referral_counts(db, last_id):
+        """
+        Adds the historic data inserted after a row id to the daily referral counts.
+
+        Adding is not idempotent, so it must run in the transaction inserting the data, while holding the upload lock.
+        See `TriageData.rebuild_referral_counts` in `data/build_tables.sql` for the counting rules.
+
+        Args:
+            db (DataBase, Session): The database connection information to use.
+            last_id (int): The largest historic data row id before the data was inserted.
+        """
+        db.insert("INSERT INTO triagedata.dailyreferralcounts AS counts \
+                       (clinic_id, severity, date_received, referrals) \
+                   SELECT clinic_id, severity, date_received, COUNT(*) \
+                   FROM triagedata.historicdata \
+                   WHERE id > %(last_id)s \
+                         AND clinic_id IS NOT NULL AND severity IS NOT NULL AND date_received IS NOT NULL \
+                   GROUP BY clinic_id, severity, date_received \
+                   ON CONFLICT ON CONSTRAINT daily_referral_counts_pk DO UPDATE \
+                       SET referrals = counts.referrals + EXCLUDED.referrals",
+                  params={
+                      'last_id': last_id
+                  })
+        db.insert("INSERT INTO triagedata.dailyunclassifiedreferralcounts AS counts \
+                       (clinic_id, date_received, wait_weeks, referrals) \
+                   SELECT clinic_id, date_received, CEIL(wait_days / 7.0)::integer AS wait_weeks, COUNT(*) \
+                   FROM triagedata.historicdata \
+                   WHERE id > %(last_id)s \
+                         AND clinic_id IS NOT NULL AND severity IS NULL AND date_received IS NOT NULL \
+                         AND wait_days IS NOT NULL \
+                   GROUP BY clinic_id, date_received, wait_weeks \
+                   ON CONFLICT ON CONSTRAINT daily_unclassified_referral_counts_pk DO UPDATE \
+                       SET referrals = counts.referrals + EXCLUDED.referrals",
+                  params={
+                      'last_id': last_id
+                  })
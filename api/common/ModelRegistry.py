@@ -0,0 +1,113 @@
+"""
+The ModelRegistry keeps the active model file of each triage class in memory.
+"""
+
+# External dependencies.
+import threading
+import time
+
+# Internal dependencies
+from api.common.database_interaction import DataBase
+from api.common.config import database_config
+
+
+class ModelRegistry:
+    """
+    ModelRegistry is a thread safe, in memory mapping of `(clinic_id, severity)` to the active model file path.
+    Usage:
+        To create a new registry, create it with `ModelRegistry(refresh_interval)` and resolve active models with
+        `registry.get(clinic_id, severity)`.
+
+    The active models are loaded from the database on first use and on a miss. Changes made by other processes are
+    picked up through the model version counter in the database, which is incremented by every change to the models
+    table and checked at most once every `refresh_interval` seconds.
+
+    Args:
+        refresh_interval (float): The number of seconds between checks of the database model version.
+    """
+
+    # Database connection information
+    DATABASE_DATA = {
+        'user': 'triage_controller',
+        'password': 'password',
+        'database': database_config['database'],
+        'host': database_config['host'],
+        'port': database_config['port']
+    }
+    """
+    This is the database connection information used by ModelRegistry to connect to the database.
+    See `api.common.database_interaction.DataBase` for configuration details and required arguments.
+    """
+
+    def __init__(self, refresh_interval=5):
+        self.refresh_interval = refresh_interval
+        self.__models = {}
+        self.__version = None
+        self.__checked = 0
+        self.__lock = threading.Lock()
+
+    def get(self, clinic_id, severity):
+        """Returns the active model file path of a triage class.
+        Parameters:
+            `clinic_id` (int): The id of the clinic.
+            `severity` (int): The severity of the triage class.
+        Returns:
+            A string file path of the active model.
+        """
+        with self.__lock:
+            if self.__version is None:
+                self.__refresh()
+            elif time.monotonic() - self.__checked >= self.refresh_interval:
+                self.__check_version()
+
+            file_path = self.__models.get((clinic_id, severity))
+            if file_path is None:
+                self.__refresh()
+                file_path = self.__models.get((clinic_id, severity))
+
+        if file_path is None:
+            raise RuntimeError(
+                'Could not find model for clinic %s, triage class %s', clinic_id, severity)
+
+        return file_path
+
+    def invalidate(self, clinic_id=None):
+        """Removes active models from the registry so they are loaded again on their next use.
+        Parameters:
+            `clinic_id` (int): The id of the clinic whose models changed, or None for all clinics.
+        """
+        with self.__lock:
+            if clinic_id is None:
+                self.__models = {}
+            else:
+                self.__models = {key: file_path for key, file_path in self.__models.items() if key[0] != clinic_id}
+
+    def __check_version(self):
+        """Reloads the active models if the database model version changed since they were loaded.
+        """
+        db = DataBase(self.DATABASE_DATA)
+        rows = db.select("SELECT version FROM triagedata.modelversion", prepare='model_version')
+        self.__checked = time.monotonic()
+
+        if not rows or rows[0][0] != self.__version:
+            self.__refresh()
+
+    def __refresh(self):
+        """Loads the active models of all clinics and the model version they correspond to.
+        """
+        db = DataBase(self.DATABASE_DATA)
+        rows = db.select("SELECT modelversion.version, models.clinic_id, models.severity, models.file_path \
+                          FROM triagedata.modelversion \
+                          LEFT JOIN triagedata.models ON models.in_use = true",
+                         prepare='active_models')
+
+        self.__models = {(clinic_id, severity): file_path
+                         for version, clinic_id, severity, file_path in rows if clinic_id is not None}
+        self.__version = rows[0][0] if rows else None
+        self.__checked = time.monotonic()
+
+
+model_registry = ModelRegistry()
+"""
+Process wide registry of active models, shared by all requests.
+"""
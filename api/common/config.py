@@ -4,4 +4,16 @@ database_config = {
     'port': '5432'
 }
 
+database_pool_config = {
+    'min_size': 1,
+    'max_size': 10,
+    'timeout': 30,
+    'health_check_interval': 30
+}
+
 VERSION_PREFIX = '/v1'
+
+historic_data_upload_config = {
+    'chunk_size': 10000,
+    'batch_size': 10000
+}
@@ -4,7 +4,6 @@ The DataFrame is used to generate varying sets of referal predictions for the pu
 
 # External dependencies
 import numpy as np
-import math
 
 
 class DataFrame:
@@ -47,6 +46,19 @@ class DataFrame:
             Returns a list (of length equal to the number of weeks in the given interval) where each
             entry is an integer signifying the number of patient referrals predicted to arrive.
         """
+        # Generate and return sample
+        return self.get_interval_samples(interval, 1)[0].tolist()
+
+    def get_interval_samples(self, interval, n, rng=None):
+        """Returns many sample predictions for referal count of patients, drawn at once.
+        Parameters:
+            `interval` (int): The index of the desired interval.
+            `n` (int): The number of samples.
+            `rng` (numpy.random.Generator): The random generator to draw from. Defaults to the global numpy stream.
+        Returns:
+            Returns an integer matrix of shape (n, number of weeks in the given interval) where each row is a
+            sample of the number of patient referrals predicted to arrive each week.
+        """
         # Check validity of input interval index.
         if interval not in range(0, len(self.intervals)):
             raise ValueError("Invalid interval %s.", interval)
@@ -55,9 +67,19 @@ class DataFrame:
         start = self.intervals[interval][0]
         end = self.intervals[interval][1] + 1
 
-        # Generate and return sample
-        res = [np.round(max(0, np.random.normal(p[0], math.sqrt(p[1])))) for p in self.predictions[start:end]]
-        return res
+        # Split the predictions of the interval into means and variances
+        params = np.array([(p[0], p[1]) for p in self.predictions[start:end]], dtype=float).reshape(-1, 2)
+        means, variances = params[:, 0], params[:, 1]
+
+        # Weeks without variance (such as padding data) always sample their mean
+        samples = np.tile(means, (n, 1))
+        varying = variances > 0
+        if varying.any():
+            normal = np.random.normal if rng is None else rng.normal
+            samples[:, varying] = normal(means[varying], np.sqrt(variances[varying]), size=(n, int(varying.sum())))
+
+        # Generate and return samples
+        return np.round(np.maximum(0, samples)).astype(int)
 
     def __format_intervals(self, intervals, padding_length):
         """Converts intervals from date format (start and end date for an interval) to relative
@@ -0,0 +1,99 @@
+"""
+The DateEncoder builds the one hot encoded prediction dates used by the ML module.
+"""
+
+# External dependencies
+from datetime import datetime, timedelta
+from functools import lru_cache
+import numpy as np
+
+ENCODING_SIZE = 12 + 31
+"""
+Size of a one hot encoded date.
+"""
+
+
+def encode_dates(months, days):
+    """Returns the one hot encoding of many dates at once.
+    Parameters:
+        `months` (array like): The month of each date.
+        `days` (array like): The day of the month of each date.
+    Returns:
+        A matrix with one one hot encoded date per row.
+    """
+    months = np.asarray(months, dtype=int)
+    days = np.asarray(days, dtype=int)
+
+    one_hot_dates = np.zeros((len(months), ENCODING_SIZE))
+    rows = np.arange(len(months))
+    one_hot_dates[rows, months] = 1
+    one_hot_dates[rows, 11 + days] = 1
+
+    return one_hot_dates
+
+
+def decode_date(date_encoding):
+    """Returns the month and day read back from a one hot encoded date.
+    Parameters:
+        `date_encoding` (numpy.ndarray): The one hot encoded date.
+    Returns:
+        A tuple of the month and day.
+    """
+    month = np.argmax(date_encoding[:12]) + 1
+    day = np.argmax(date_encoding[12:]) + 1
+
+    return int(month), int(day)
+
+
+def next_date(month, day, days=7):
+    """Returns the month and day of the next prediction date.
+    Parameters:
+        `month` (int): The month of the previous date, as read by `decode_date`.
+        `day` (int): The day of the month of the previous date, as read by `decode_date`.
+        `days` (int): The number of days between prediction dates (default = 7).
+    Returns:
+        A tuple of the next month and day.
+    """
+    date = datetime(2000, month, day) + timedelta(days=days)
+
+    return date.month, date.day
+
+
+def encode_date_sequence(start_date, weeks, days=7):
+    """Returns the one hot encoded prediction dates for a number of weeks from a start date.
+    The result is the same as encoding the start date and applying `TriageController.gen_next_date` once per week.
+    Sequences are cached, so the returned matrix is read only.
+    Parameters:
+        `start_date` (datetime): The first prediction date.
+        `weeks` (int): The number of prediction dates after the start date.
+        `days` (int): The number of days between prediction dates (default = 7).
+    Returns:
+        A matrix of shape (weeks + 1, 43) with one one hot encoded date per row.
+    """
+    return _encode_date_sequence(start_date.month, start_date.day, weeks, days)
+
+
+@lru_cache(maxsize=256)
+def _encode_date_sequence(month, day, weeks, days):
+    """Returns the one hot encoded prediction dates for a number of weeks from an encoded month and day.
+    Each date follows from the previous encoding as it is read back, which shifts the month and is lossy for December,
+    so the month and day indices are computed week by week. Only the one hot matrix is built in one assignment, the
+    cost of a sequence is paid once per start date and horizon by the cache.
+    """
+    months, month_days = [month], [day]
+    for _ in range(weeks):
+        month, day = next_date(*_decoded_date(month, day), days)
+        months.append(month)
+        month_days.append(day)
+
+    one_hot_dates = encode_dates(months, month_days)
+    one_hot_dates.flags.writeable = False
+
+    return one_hot_dates
+
+
+@lru_cache(maxsize=None)
+def _decoded_date(month, day):
+    """Returns the month and day that `decode_date` reads from the encoding of a month and day.
+    """
+    return decode_date(encode_dates([month], [day])[0])
@@ -0,0 +1,94 @@
+"""
+The ModelCache keeps loaded prediction models in memory so they are not rebuilt for every request.
+"""
+
+# External dependencies
+from collections import OrderedDict
+import os
+import threading
+
+
+class ModelCache:
+    """
+    ModelCache is a thread safe, bounded cache of loaded models with least recently used eviction.
+    Usage:
+        To create a new model cache, create it with `ModelCache(max_size)` and retrieve models with
+        `cache.get(file_path, load_model)`.
+
+    Entries are keyed by the model file path together with the file modification time and size, so a model file
+    that is replaced on disk is loaded again.
+
+    Args:
+        max_size (int): The maximum number of models kept in memory.
+    """
+
+    def __init__(self, max_size=16):
+        if max_size <= 0:
+            raise ValueError('Invalid model cache size %s.', max_size)
+
+        self.max_size = max_size
+        self.__models = OrderedDict()
+        self.__loading = {}
+        self.__lock = threading.Lock()
+
+    def get(self, file_path, load_model):
+        """Returns the model stored in a file, loading it on a cache miss.
+        Parameters:
+            `file_path` (str): The path of the model file.
+            `load_model` (callable): Function loading the model from the file path.
+        Returns:
+            The loaded model. Concurrent requests for the same file wait for a single load.
+        """
+        key = self.__key(file_path)
+
+        with self.__lock:
+            if key in self.__models:
+                self.__models.move_to_end(key)
+                return self.__models[key]
+            key_lock = self.__loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another request may have loaded the model while waiting.
+            with self.__lock:
+                if key in self.__models:
+                    self.__models.move_to_end(key)
+                    return self.__models[key]
+
+            try:
+                model = load_model(file_path)
+            except Exception:
+                with self.__lock:
+                    self.__loading.pop(key, None)
+                raise
+
+            with self.__lock:
+                # Remove older versions of the same file.
+                for stale_key in [k for k in self.__models if k[0] == key[0]]:
+                    del self.__models[stale_key]
+
+                self.__models[key] = model
+                while len(self.__models) > self.max_size:
+                    self.__models.popitem(last=False)
+                self.__loading.pop(key, None)
+
+        return model
+
+    def clear(self):
+        """Removes all models from the cache.
+        """
+        with self.__lock:
+            self.__models.clear()
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__models)
+
+    def __key(self, file_path):
+        """Returns the cache key of a model file.
+        Parameters:
+            `file_path` (str): The path of the model file.
+        Returns:
+            A tuple of the absolute file path, modification time and size.
+        """
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
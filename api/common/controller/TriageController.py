@@ -3,15 +3,21 @@ The TriageController is used to initiate prediction and simulation upon API requ
 """
 
 # External dependencies.
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from collections import deque
 import numpy as np
+import calendar
+import math
+import time
 import triage_ml
 
 # Internal dependencies
 from api.common.database_interaction import DataBase
 from api.common.ClinicData import ClinicData
+from api.common.ModelRegistry import model_registry
 from api.common.controller.DataFrame import DataFrame
+from api.common.controller.DateEncoder import decode_date, encode_date_sequence, encode_dates, next_date
+from api.common.controller.ModelCache import ModelCache
 from sim.resources.minintervalschedule import gen_min_interval_slots
 from api.common.config import database_config
 
@@ -30,6 +36,9 @@ class TriageController:
             'intervals' (list(tuples(str))) List of start and end date strings for each interval.
             'confidence' (int) The desired confidence level of predictions.
             'num_sim_runs' (int) The number of desired simulation runs.
+            'time_budget' (float) Optional wall clock seconds the simulations of all triage classes may take.
+            'session' (Session) Optional request session to run the queries in, see
+                                `api.common.database_interaction.Session`.
         }
         ```
     """
@@ -52,14 +61,28 @@ class TriageController:
     Minimum padding length required by ML module.
     """
 
+    MODEL_CACHE = ModelCache(max_size=32)
+    """
+    Process wide cache of loaded models, shared by all requests.
+    """
+
+    TIME_BUDGET_BATCHES = 10
+    """
+    Number of batches the simulation runs of each interval are split in with a time budget, the budget can stop an
+    interval after its first batch.
+    """
+
     # Constructor
-    def __init__(self, clinic_id, intervals, confidence, num_sim_runs):
+    def __init__(self, clinic_id, intervals, confidence, num_sim_runs, time_budget=None, session=None):
         self.clinic_id = clinic_id
         self.intervals = [{'start': datetime.strptime(interval['start'], DATE_FORMAT),
                            'end': datetime.strptime(interval['end'], DATE_FORMAT)}
                           for interval in intervals]
         self.confidence = confidence
         self.num_sim_runs = num_sim_runs
+        self.time_budget = time_budget
+        self.session = session
+        self.sim_runs = {}
 
     def predict(self):
         """Returns the prediction / simulation results.
@@ -73,45 +96,51 @@ class TriageController:
                 'slots' (int) Predicted slots.
             }
             ```
+            The number of simulation runs used for each interval is stored in `sim_runs` by triage class.
         """
         # Setup results dictionary
         results = {}
+        self.sim_runs = {}
+        batch_size = self.num_sim_runs
+        if self.time_budget is not None:
+            deadline = time.monotonic() + self.time_budget
+            batch_size = max(math.ceil(self.num_sim_runs / self.TIME_BUDGET_BATCHES), 1)
 
         # Setup ClinicData object.
-        clinic_data = ClinicData(self.clinic_id)
-
-        # Predict for each triage class.
-        for triage_class in clinic_data.get_clinic_settings():
-            # Load the proper model.
-            model = triage_ml.models.radius_variance.RadiusVariance(
-                seq_size=30, radius=15, time_interval=triage_ml.data.dataset.TimeInterval.WEEK)
-            model._init_model()
-            model.model.load_weights(self.get_model(triage_class['severity']))
-            dates = list([self.encode_date(self.intervals[0]['start'])])
-            weeks = int(
-                (self.intervals[-1]['end'] - self.intervals[0]['start']).days / 7)
-
-            # Setup model prediction dates.
-            for i in range(weeks):
-                dates.append(self.gen_next_date(dates[-1]))
-            dates = np.stack(dates)
-
-            # Retrieve model padding data (historic referral data).
-            padding_interval = self.__get_padding_interval(
-                self.intervals[0]['start'], self.PADDING_LENGTH)
-            padding_data = self.__sort_padding_data(clinic_data.get_referral_data(triage_class['severity'], padding_interval),
-                                                    padding_interval[0],
-                                                    self.PADDING_LENGTH)
-
-            # Predict future referral arrivals.
-            padding_data_ml = np.array(padding_data)[:, np.newaxis]
-            predictions = model.predict(
-                [padding_data_ml[np.newaxis, :], dates[0]], dates)
-            predictions = [np.array(p)[0] for p in predictions]
-
+        clinic_data = ClinicData(self.clinic_id, self.session)
+        triage_classes = clinic_data.get_clinic_settings()
+
+        # Setup model prediction dates, shared by all triage classes.
+        weeks = int(
+            (self.intervals[-1]['end'] - self.intervals[0]['start']).days / 7)
+        dates = encode_date_sequence(self.intervals[0]['start'], weeks)
+
+        # Retrieve model padding data (historic referral data) for each triage class.
+        padding_interval = self.__get_padding_interval(
+            self.intervals[0]['start'], self.PADDING_LENGTH)
+        severities = [triage_class['severity'] for triage_class in triage_classes]
+        class_padding_data = clinic_data.get_weekly_referral_counts_by_class(severities, padding_interval,
+                                                                             self.PADDING_LENGTH)
+        padding_data = [self.__compensate_padding_counts(class_padding_data[severity]) for severity in severities]
+
+        # Release the request session connection before predicting and simulating.
+        if self.session is not None:
+            self.session.commit()
+
+        # Predict future referral arrivals for all triage classes.
+        class_predictions = self.__predict_referrals(triage_classes, padding_data, dates)
+
+        # Simulate each triage class.
+        for class_index, triage_class in enumerate(triage_classes):
             # Setup DataFrame for simulation.
             prediction_dataframe = DataFrame(
-                [[p, 0] for p in padding_data] + predictions, self.intervals, self.PADDING_LENGTH)
+                [[p, 0] for p in padding_data[class_index]] + class_predictions[class_index],
+                self.intervals, self.PADDING_LENGTH)
+
+            # Share the remaining time budget between the remaining triage classes.
+            time_budget = None
+            if self.time_budget is not None:
+                time_budget = max(deadline - time.monotonic(), 0) / (len(triage_classes) - class_index)
 
             # Run simulation.
             sim_results = gen_min_interval_slots(queue=deque(),
@@ -121,7 +150,10 @@ class TriageController:
                                                  min_ratio=triage_class['proportion'],
                                                  window=triage_class['duration'],
                                                  final_window=2 * triage_class['duration'],
-                                                 confidence=self.confidence)
+                                                 confidence=self.confidence,
+                                                 num_sim_runs=self.num_sim_runs,
+                                                 batch_size=batch_size,
+                                                 time_budget=time_budget)
 
             # Format simulation results
             if sim_results:
@@ -129,17 +161,67 @@ class TriageController:
                                          'start': sim_result[1]['start'].strftime(DATE_FORMAT),
                                          'end': sim_result[1]['end'].strftime(DATE_FORMAT)
                                          } for sim_result in zip(sim_results, self.intervals)]
+                sim_runs = [sim_result.num_sim_runs for sim_result in sim_results]
             else:
                 sim_result_formatted = [{'slots': 0,
                                          'start': interval['start'].strftime(DATE_FORMAT),
                                          'end': interval['end'].strftime(DATE_FORMAT)
                                          } for interval in self.intervals]
+                sim_runs = [0 for interval in self.intervals]
 
             # Append results for triage class to total results.
             results[triage_class['name']] = sim_result_formatted
+            self.sim_runs[triage_class['name']] = sim_runs
 
         return results
 
+    def __predict_referrals(self, triage_classes, padding_data, dates):
+        """Predicts future referral arrivals for each triage class.
+        Triage classes using the same model file are predicted together as a single batch, with one row of padding
+        data and start date per triage class.
+        Parameters:
+            `triage_classes` (list(dict)): The triage class settings.
+            `padding_data` (list(list(int))): The weekly historic referral counts of each triage class.
+            `dates` (numpy.ndarray): The one hot encoded prediction dates.
+        Returns:
+            A list with the predictions of each triage class, in the order of the triage classes.
+        """
+        # Group the triage classes by model file.
+        model_classes = {}
+        for class_index, triage_class in enumerate(triage_classes):
+            model_classes.setdefault(self.get_model(triage_class['severity']), []).append(class_index)
+
+        class_predictions = [None] * len(triage_classes)
+        for file_path, class_indexes in model_classes.items():
+            # Load the proper model.
+            model = self.MODEL_CACHE.get(file_path, self.load_model)
+
+            # Predict for every triage class of the model in one batch, each batch row starting at the first date.
+            padding_data_ml = np.stack([np.array(padding_data[class_index])[:, np.newaxis]
+                                        for class_index in class_indexes])
+            start_dates = np.repeat(dates[:1], len(class_indexes), axis=0)
+            predictions = model.predict([padding_data_ml, start_dates], dates)
+            predictions = [np.array(p) for p in predictions]
+            for batch_index, class_index in enumerate(class_indexes):
+                class_predictions[class_index] = [p[batch_index] for p in predictions]
+
+        return class_predictions
+
+    @staticmethod
+    def load_model(file_path):
+        """Builds a prediction model and loads its weights.
+        Parameters:
+            `file_path` (str): The path of the model weights file.
+        Returns:
+            The loaded model.
+        """
+        model = triage_ml.models.radius_variance.RadiusVariance(
+            seq_size=30, radius=15, time_interval=triage_ml.data.dataset.TimeInterval.WEEK)
+        model._init_model()
+        model.model.load_weights(file_path)
+
+        return model
+
     def encode_date(self, date):
         """Returns a one hot encoded date based on the inputted date.
         This is used by the ML module to make predictions.
@@ -148,11 +230,7 @@ class TriageController:
         Returns:
             A one hot encoded date.
         """
-        one_hot_date = np.zeros(12 + 31)
-        one_hot_date[date.date().month] = 1
-        one_hot_date[11 + date.date().day] = 1
-
-        return one_hot_date
+        return encode_dates([date.date().month], [date.date().day])[0]
 
     def gen_next_date(self, date_encoding, days=7):
         """Generates the next date for the ML prediction module to predict for.
@@ -162,13 +240,9 @@ class TriageController:
         Returns:
             The next prediction date in one hot encoding format.
         """
-        month = np.argmax(date_encoding[:12]) + 1
-        day = np.argmax(date_encoding[12:]) + 1
-        date = datetime.strptime(
-            f'2000/{0 if month < 10 else ""}{month}/{0 if day < 10 else ""}{day}', '%Y/%m/%d')
-        date = date + timedelta(days=days)
+        month, day = next_date(*decode_date(date_encoding), days)
 
-        return self.encode_date(date)
+        return encode_dates([month], [day])[0]
 
     def __get_padding_interval(self, start_date, weeks):
         """Returns the date interval for the padding data.
@@ -186,52 +260,64 @@ class TriageController:
 
         return [start, end]
 
+    @staticmethod
+    def __compensate_padding_counts(weekly_counts):
+        """Returns the weekly referral counts as the original padding bucketing counted them.
+        Parameters:
+            `weekly_counts` (list(int)): The number of referrals received each week.
+        Returns:
+            A list with the padding value of each week, one less than its referrals for a week with referrals.
+        """
+        # The original bucketing started each week it found a referral in at 0 instead of 1, so a week with n
+        # referrals was padded with n - 1. The padding keeps that offset so predictions do not change.
+        return [max(count - 1, 0) for count in weekly_counts]
+
     def __get_historic_data_year(self, start_date):
         """Returns the year of the most recent historic data.
         Parameters:
             `start_date` (datetime): The start date for predictions.
         Returns:
-            An integer year value of the most recent year of historic data available.
+            An integer value of the most recent year with historic data for the clinic on or after the
+            month and day of the start date, in the same month.
         """
-        db = DataBase(self.DATABASE_DATA)
-
-        year = db.select("SELECT EXTRACT(YEAR FROM historicdata.date_received) \
-                         FROM triagedata.historicdata \
-                         WHERE EXTRACT(MONTH FROM historicdata.date_received)= %(month)s AND \
-                               EXTRACT(DAY FROM historicdata.date_received) >= %(day)s \
-                         ORDER BY historicdata.date_received DESC \
-                         FETCH FIRST 1 ROWS ONLY" %
-                         {
-                             'month': start_date.month,
-                             'day': start_date.day
-                         })
-
-        if len(year) != 1:
+        db = self.session if self.session is not None else DataBase(self.DATABASE_DATA)
+
+        coverage = db.select("SELECT min_date_received, max_date_received, years \
+                              FROM triagedata.historiccoverage \
+                              WHERE clinic_id = %(clinic_id)s",
+                             params={
+                                 'clinic_id': self.clinic_id
+                             },
+                             prepare='historic_coverage')
+
+        years = [year for min_date, max_date, covered_years in coverage for year in covered_years
+                 if self.__covers(min_date, max_date, year, start_date)]
+
+        if len(years) == 0:
             raise RuntimeError(
                 'Could not find historic data year for start date: %s', start_date)
 
-        return int(year[0][0])
+        return max(years)
 
-    def __sort_padding_data(self, referral_data, start_date, weeks):
-        """Sorts historic referral data by the week the referrals arrived.
+    @staticmethod
+    def __covers(min_date, max_date, year, start_date):
+        """Returns whether a coverage range has data in a year between the start date's day and the end of its month.
         Parameters:
-            `referral_data` (list(str)): List of historic referral dates.
-            `start_date` (datetime):Start date of the padding.
-            `weeks` (int): Number of weeks in the padding.
+            `min_date` (date): The first date received of the coverage.
+            `max_date` (date): The last date received of the coverage.
+            `year` (int): The year to check.
+            `start_date` (datetime): The start date for predictions.
         Returns:
-            Returns a list where each entry is the number of referrals that
-            arrived in a given week of the padding data.
+            True if the coverage overlaps the days of the month.
         """
-        partitioned_data = {}
-        for referral in referral_data:
-            week = int(
-                (datetime.strptime(referral[2], DATE_FORMAT) - start_date).days / 7)
-            if week in partitioned_data:
-                partitioned_data[week] += 1
-            else:
-                partitioned_data[week] = 0
+        try:
+            first_day = date(year, start_date.month, start_date.day)
+        except ValueError:
+            # February 29th outside of a leap year
+            return False
+        last_day = date(year, start_date.month, calendar.monthrange(year, start_date.month)[1])
 
-        return [partitioned_data[week] if week in partitioned_data else 0 for week in range(weeks)]
+        return min_date <= last_day and first_day <= max_date
 
     def get_model(self, triage_class_severity):
         """Retrieves the model file name to load.
@@ -241,23 +327,4 @@ class TriageController:
             A string file name of the needed model.
         """
 
-        # Establish database connection
-        db = DataBase(self.DATABASE_DATA)
-
-        # Query for referral data from previous year
-        rows = db.select("SELECT file_path \
-                           FROM triagedata.models  \
-                           WHERE clinic_id = %(clinic_id)s \
-                           AND severity = %(severity)s \
-                           AND in_use = %(in_use)s" %
-                         {
-                             'clinic_id': self.clinic_id,
-                             'severity': triage_class_severity,
-                             'in_use': True
-                         })
-
-        if len(rows) == 0:
-            raise RuntimeError(
-                'Could not find model for clinic %s, triage class %s', self.clinic_id, triage_class_severity)
-
-        return rows[0][0]
+        return model_registry.get(self.clinic_id, triage_class_severity)
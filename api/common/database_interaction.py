@@ -3,7 +3,340 @@ database_interaction is aimed to limit code redundancy for PostgreSQL.
 """
 
 # External dependencies
+from contextlib import contextmanager
+from functools import lru_cache
+import hashlib
+import itertools
+import os
+import re
+import threading
+import time
+import weakref
 import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError
+
+# Internal dependencies
+from api.common.config import database_pool_config
+
+
+class ConnectionPool:
+    """
+    ConnectionPool is a thread safe pool of PostgreSQL connections sharing the same connection data.
+
+    Usage:
+        To create a new pool, create it with `ConnectionPool(connection_data)` and borrow connections
+        with `with pool.connection() as connection:`. `DataBase` uses one pool per set of connection data,
+        see `get_pool`.
+
+    Connections idle for longer than `health_check_interval` seconds are checked before being handed out,
+    and broken connections are replaced. A pool used in a forked process drops the connections inherited from
+    its parent without closing them, so the parent's sessions are left untouched. The pool also keeps track of the
+    statements prepared on each of its connections, see `prepared_statements`.
+
+    Args:
+        connection_data (dict): The connection data, see `DataBase`
+        min_size (int): The number of connections opened when the pool is created
+        max_size (int): The maximum number of connections open at once
+        timeout (float): The number of seconds to wait for a connection when all of them are in use
+        health_check_interval (float): The number of idle seconds after which a connection is checked
+    """
+
+    def __init__(self, connection_data, min_size=1, max_size=10, timeout=30., health_check_interval=30.):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError('Invalid connection pool size, min: %s max: %s' % (min_size, max_size))
+
+        self.connection_data = connection_data
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._reset()
+        _pools.add(self)
+
+        for connection in [self.getconn() for _ in range(min_size)]:
+            self.putconn(connection)
+
+    def getconn(self):
+        """
+        Borrows a connection from the pool, opening a new one if none are idle and the pool is not full.
+
+        Returns:
+            connection: An open connection, which must be given back with `putconn`
+
+        Raises:
+            PoolError: If no connection is available within the timeout
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._condition:
+                self._check_fork()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolError('Timed out waiting for a database connection')
+                    self._condition.wait(remaining)
+
+                if not self._idle:
+                    self._size += 1
+                    break
+                connection, idle_since = self._idle.pop()
+
+            # Check the connection outside of the lock, so that a slow connection only holds up its borrower
+            if self._is_healthy(connection, idle_since):
+                return connection
+            self._discard(connection)
+
+        # Connect outside of the lock so that other threads can use the pool meanwhile
+        try:
+            return psycopg2.connect(**self.connection_data)
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def putconn(self, connection, close=False):
+        """
+        Gives a borrowed connection back to the pool.
+
+        Args:
+            connection (connection): The connection borrowed with `getconn`
+            close (bool): Whether to close the connection instead of keeping it for reuse
+        """
+        if self._pid != os.getpid():
+            # The connection belongs to the parent process
+            return
+
+        # Roll back outside of the lock, so that a slow connection only holds up the thread giving it back
+        if not close and not connection.closed:
+            try:
+                # Never hand out a connection in the middle of a transaction
+                if connection.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except psycopg2.Error:
+                close = True
+
+        if close or connection.closed:
+            self._discard(connection)
+            return
+
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a connection for the duration of a with block.
+        Connections that fail with a connection level error are closed instead of being reused.
+        """
+        connection = self.getconn()
+        try:
+            yield connection
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.putconn(connection, close=True)
+            raise
+        except BaseException:
+            self.putconn(connection)
+            raise
+        else:
+            self.putconn(connection)
+
+    def prepared_statements(self, connection):
+        """
+        Returns the names of the statements prepared on a connection of the pool.
+
+        Args:
+            connection (connection): A connection borrowed from the pool
+
+        Returns:
+            set: The prepared statement names, to be updated by the borrower as it prepares statements
+        """
+        with self._condition:
+            return self._statements.setdefault(id(connection), set())
+
+    def close(self):
+        """
+        Closes the idle connections of the pool.
+        Borrowed connections are closed when they are given back.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+
+        for connection, idle_since in idle:
+            self._discard(connection)
+
+    def _is_healthy(self, connection, idle_since):
+        """
+        Returns whether an idle connection can be handed out, must be called without holding the pool lock.
+        """
+        if connection.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with connection.cursor() as cur:
+                cur.execute('SELECT 1')
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, connection):
+        """
+        Frees the place of a connection in the pool, then closes it outside of the lock.
+        """
+        with self._condition:
+            self._size -= 1
+            self._statements.pop(id(connection), None)
+            self._condition.notify()
+
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _check_fork(self):
+        """
+        Drops the connections inherited from the parent process, for platforms without fork hooks.
+        """
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _reset(self):
+        """
+        Forgets all connections without closing them.
+        """
+        self._idle = []
+        self._statements = {}
+        self._size = 0
+        self._pid = os.getpid()
+        self._condition = threading.Condition()
+
+
+_pools = weakref.WeakSet()
+_pools_by_connection_data = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(connection_data):
+    """
+    Returns the pool shared by all users of the same connection data, creating it if needed.
+    The pool size, timeout and health check interval are read from `api.common.config.database_pool_config`.
+
+    Args:
+        connection_data (dict): The connection data, see `DataBase`
+
+    Returns:
+        ConnectionPool: The pool of the connection data
+    """
+    key = tuple(sorted(connection_data.items()))
+    with _pools_lock:
+        pool = _pools_by_connection_data.get(key)
+    if pool is not None:
+        return pool
+
+    # Open the connections of a new pool outside of the lock, so that lookups of other pools are not held up
+    pool = ConnectionPool(connection_data, **database_pool_config)
+    with _pools_lock:
+        shared_pool = _pools_by_connection_data.setdefault(key, pool)
+    if shared_pool is not pool:
+        # Another thread created the pool meanwhile
+        pool.close()
+    return shared_pool
+
+
+def close_pools():
+    """
+    Closes the idle connections of all pools and forgets the pools.
+    """
+    with _pools_lock:
+        pools = list(_pools_by_connection_data.values())
+        _pools_by_connection_data.clear()
+
+    for pool in pools:
+        pool.close()
+
+
+def _after_fork_in_child():
+    """
+    Resets every pool in a forked child process, including locks that may have been held by other threads.
+    """
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    for pool in list(_pools):
+        pool._reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+_PARAMETER = re.compile(r'%(%|\((\w+)\)s)')
+
+
+@lru_cache(maxsize=256)
+def _statement(query, prepare, parameterized):
+    """
+    Translates a query into a server side prepared statement.
+
+    Args:
+        query (str): The query, with parameters written as `%(name)s` if it is parameterized
+        prepare (str): The prefix of the statement name
+        parameterized (bool): Whether the query has parameters, in which case literal percent signs are escaped
+
+    Returns:
+        tuple: The statement name, the PREPARE and EXECUTE queries, and the parameter names in EXECUTE order
+    """
+    names = []
+
+    def number(match):
+        if match.group(2) is None:
+            return '%'
+        if match.group(2) not in names:
+            names.append(match.group(2))
+        return '$%s' % (names.index(match.group(2)) + 1)
+
+    # The query text is part of the name, so a changed query is never executed as an older statement
+    name = '%s_%s' % (prepare, hashlib.md5(query.encode()).hexdigest()[:12])
+    definition = 'PREPARE %s AS %s' % (name, _PARAMETER.sub(number, query) if parameterized else query)
+    execute = 'EXECUTE %s' % name
+    if names:
+        execute += ' (%s)' % ', '.join(['%s'] * len(names))
+
+    return name, definition, execute, tuple(names)
+
+
+_stream_names = itertools.count()
+
+
+def _execute(cursor, query, params=None, prepared_statements=None, prepare=None):
+    """
+    Executes a query, as a named prepared statement of the connection when a statement name prefix is given.
+
+    Args:
+        cursor (cursor): The cursor to execute the query with
+        query (str): The query, with parameters written as `%(name)s`
+        params (dict): The parameter values of the query
+        prepared_statements (set): The names of the statements already prepared on the cursor connection
+        prepare (str): The prefix of the statement name, or None to execute the query without preparing it
+    """
+    if prepare is None:
+        if params is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query, params)
+        return
+
+    name, definition, execute, names = _statement(query, prepare, params is not None)
+    if name not in prepared_statements:
+        cursor.execute(definition)
+        prepared_statements.add(name)
+    if names:
+        cursor.execute(execute, [params[n] for n in names])
+    else:
+        cursor.execute(execute)
 
 
 class DataBase:
@@ -21,85 +354,290 @@ class DataBase:
         password (str): The password for the respective user
         host (str): The host IP of the data base
         port (str): The connection port for the database
+
+    Connections are borrowed from the pool of the connection data, see `get_pool`.
+
+    Query values are passed separately from the query string as `params`, and written in the query as `%(name)s`.
+    Queries run often can be given a `prepare` name prefix, in which case they are planned once per pooled
+    connection as a server side prepared statement and only executed afterwards.
     """
 
     def __init__(self, connection_data):
         self.connection_data = connection_data
 
-    def select(self, select_string):
+    def select(self, select_string, params=None, prepare=None):
         """
         Returns the query results from the database for the select_string.
 
         Args:
             select_string (str): A string representing the database query
+            params (dict): The values of the query parameters
+            prepare (str): The prefix of the prepared statement name, or None to not prepare the query
 
         Returns:
             list: A list of tuples of query results from the database
         """
-        # Establish database connection
-        with psycopg2.connect(**self.connection_data) as db:
+        pool = get_pool(self.connection_data)
+        # Borrow a database connection
+        with pool.connection() as connection, connection as db:
             # Establish a cursor to interact with the database
             with db.cursor() as cur:
                 # Query for restults based on the query string (select_string)
-                cur.execute(select_string)
+                _execute(cur, select_string, params, pool.prepared_statements(connection), prepare)
                 # Store the results
                 results = cur.fetchall()
-        # Close the database connection
-        db.close()
         return results
 
-    def insert(self, insert_string, returning=False):
+    def stream(self, select_string, params=None, size=1000):
+        """
+        Yields the query results from the database for the select_string in chunks.
+        The results are read from a server side cursor, so only one chunk is held in memory at a time. The connection
+        is borrowed until the results are exhausted or the generator is closed.
+
+        Args:
+            select_string (str): A string representing the database query
+            params (dict): The values of the query parameters
+            size (int): The number of rows in each chunk
+
+        Yields:
+            list: A list of at most size tuples of query results from the database
+        """
+        # Borrow a database connection
+        with get_pool(self.connection_data).connection() as connection, connection as db:
+            # Establish a server side cursor to read the results from
+            with db.cursor(name='stream_%s' % next(_stream_names)) as cur:
+                cur.itersize = size
+                _execute(cur, select_string, params)
+                rows = cur.fetchmany(size)
+                while rows:
+                    yield rows
+                    rows = cur.fetchmany(size)
+
+    def insert(self, insert_string, returning=False, params=None, prepare=None):
         """
         Insert data into the database
 
         Args:
             insert_string (str): A string representing the data to insert
+            params (dict): The values of the query parameters
+            prepare (str): The prefix of the prepared statement name, or None to not prepare the query
         """
-        return self._modify_data(insert_string, returning)
+        return self._modify_data(insert_string, returning, params, prepare)
 
-    def update(self, update_string, returning=False):
+    def update(self, update_string, returning=False, params=None, prepare=None):
         """
         Update data in the database
 
         Args:
             update_string (str): A string representing the data to update
+            params (dict): The values of the query parameters
+            prepare (str): The prefix of the prepared statement name, or None to not prepare the query
         """
-        return self._modify_data(update_string, returning)
+        return self._modify_data(update_string, returning, params, prepare)
 
-    def _modify_data(self, query_string, returning=False):
+    def _modify_data(self, query_string, returning=False, params=None, prepare=None):
         """
         Modify data in the database
 
         Args:
             query_string (str): A string representing the data to modify
+            params (dict): The values of the query parameters
+            prepare (str): The prefix of the prepared statement name, or None to not prepare the query
         """
-        # Establish database connection
-        with psycopg2.connect(**self.connection_data) as db:
+        pool = get_pool(self.connection_data)
+        # Borrow a database connection
+        with pool.connection() as connection, connection as db:
             # Establish a cursor to interact with the database
             with db.cursor() as cur:
                 # Insert the desired data into the db
-                cur.execute(query_string)
+                _execute(cur, query_string, params, pool.prepared_statements(connection), prepare)
                 db.commit()
                 if returning:
                     val = cur.fetchone()[0]
-        # Close the database connection
-        db.close()
         if returning:
             return val
 
-    def insert_data_from_file(self, table, data_column_order, data_file, seperator):
+    def insert_csv_from_file(self, table, data_column_order, data_file):
         """
-        Insert a large amount of data into the database from a file
+        Insert a large amount of data into the database from a csv file, unquoted empty values are inserted as NULL
 
         Args:
             table (str): The table to insert the data into
-            data_header_order (tuple, str): A tuple representing which data attributes the data_file tuples have
-            data_file (file): A file with the data to upload to the database
-            seperator (str): the file character seperators
+            data_column_order (tuple, str): A tuple representing which data attributes the data_file rows have
+            data_file (file): A csv file with the data to upload to the database
         """
-        # Establish database connection
-        with psycopg2.connect(**self.connection_data) as db:
+        copy_string = "COPY %s (%s) FROM STDIN WITH (FORMAT csv)" % (table, ', '.join(data_column_order))
+        # Borrow a database connection
+        with get_pool(self.connection_data).connection() as connection, connection as db:
             # Establish a cursor to interact with the database
             with db.cursor() as cur:
-                cur.copy_from(data_file, table, sep=seperator, columns=data_column_order)
-        db.close()
+                cur.copy_expert(copy_string, data_file)
+
+
+class Session:
+    """
+    Session is a unit of work running the queries of one request in a single transaction on a single connection.
+
+    Usage:
+        To create a new session, create it with `Session(connection_data, read_only)` and use it as a context manager,
+        `with Session(connection_data) as session:`. The session has the same query methods as `DataBase`, so it can
+        be handed to collaborators in place of their own `DataBase`. Copying from files is not part of a session.
+
+    The connection is borrowed from the pool on the first query and given back by `commit` or `rollback`, after
+    which the next query starts a new transaction. A read only session runs each transaction as a repeatable read,
+    so all of its queries read the same snapshot of the database. Leaving the with block commits the open
+    transaction, or rolls it back if an exception was raised.
+
+    Args:
+        connection_data (dict): The connection data, see `DataBase`
+        read_only (bool): Whether the queries of the session only read from the database
+    """
+
+    def __init__(self, connection_data, read_only=False):
+        self.connection_data = connection_data
+        self.read_only = read_only
+        self._connection = None
+        self._prepared_statements = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def select(self, select_string, params=None, prepare=None):
+        """
+        Returns the query results from the database for the select_string.
+
+        Args:
+            select_string (str): A string representing the database query
+            params (dict): The values of the query parameters
+            prepare (str): The prefix of the prepared statement name, or None to not prepare the query
+
+        Returns:
+            list: A list of tuples of query results from the database
+        """
+        with self._cursor() as cur:
+            _execute(cur, select_string, params, self._prepared_statements, prepare)
+            return cur.fetchall()
+
+    def stream(self, select_string, params=None, size=1000):
+        """
+        Yields the query results from the database for the select_string in chunks, as part of the session
+        transaction. See `DataBase.stream`.
+
+        Args:
+            select_string (str): A string representing the database query
+            params (dict): The values of the query parameters
+            size (int): The number of rows in each chunk
+
+        Yields:
+            list: A list of at most size tuples of query results from the database
+        """
+        with self._cursor(name='stream_%s' % next(_stream_names)) as cur:
+            cur.itersize = size
+            _execute(cur, select_string, params)
+            rows = cur.fetchmany(size)
+            while rows:
+                yield rows
+                rows = cur.fetchmany(size)
+
+    def insert(self, insert_string, returning=False, params=None, prepare=None):
+        """
+        Insert data into the database, as part of the session transaction
+
+        Args:
+            insert_string (str): A string representing the data to insert
+            params (dict): The values of the query parameters
+            prepare (str): The prefix of the prepared statement name, or None to not prepare the query
+        """
+        return self._modify_data(insert_string, returning, params, prepare)
+
+    def update(self, update_string, returning=False, params=None, prepare=None):
+        """
+        Update data in the database, as part of the session transaction
+
+        Args:
+            update_string (str): A string representing the data to update
+            params (dict): The values of the query parameters
+            prepare (str): The prefix of the prepared statement name, or None to not prepare the query
+        """
+        return self._modify_data(update_string, returning, params, prepare)
+
+    def _modify_data(self, query_string, returning=False, params=None, prepare=None):
+        """
+        Modify data in the database, as part of the session transaction
+
+        Args:
+            query_string (str): A string representing the data to modify
+            params (dict): The values of the query parameters
+            prepare (str): The prefix of the prepared statement name, or None to not prepare the query
+        """
+        if self.read_only:
+            raise RuntimeError('Cannot modify data in a read only session')
+
+        with self._cursor() as cur:
+            _execute(cur, query_string, params, self._prepared_statements, prepare)
+            if returning:
+                return cur.fetchone()[0]
+
+    def commit(self):
+        """
+        Commits the open transaction, if any, and gives the connection back to the pool.
+        """
+        self._release(self._connection.commit if self._connection is not None else None)
+
+    def rollback(self):
+        """
+        Rolls back the open transaction, if any, and gives the connection back to the pool.
+        """
+        self._release(self._connection.rollback if self._connection is not None else None)
+
+    def _release(self, end_transaction):
+        """
+        Ends the open transaction and gives the connection back to the pool, closing it if the transaction could
+        not be ended.
+        """
+        if end_transaction is None:
+            return
+
+        connection, self._connection = self._connection, None
+        try:
+            end_transaction()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            get_pool(self.connection_data).putconn(connection, close=True)
+            raise
+        except BaseException:
+            get_pool(self.connection_data).putconn(connection)
+            raise
+        get_pool(self.connection_data).putconn(connection)
+
+    @contextmanager
+    def _cursor(self, name=None):
+        """
+        Returns a cursor on the session connection, borrowing a connection and starting a transaction if needed.
+        Named cursors are server side cursors.
+        Connections that fail with a connection level error are closed and the transaction is lost.
+        """
+        if self._connection is None:
+            pool = get_pool(self.connection_data)
+            self._connection = pool.getconn()
+            self._prepared_statements = pool.prepared_statements(self._connection)
+            if self.read_only:
+                try:
+                    with self._connection.cursor() as cur:
+                        cur.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+                except BaseException:
+                    self.rollback()
+                    raise
+
+        try:
+            with self._connection.cursor(name) as cur:
+                yield cur
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            connection, self._connection = self._connection, None
+            get_pool(self.connection_data).putconn(connection, close=True)
+            raise
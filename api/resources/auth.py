@@ -89,9 +89,9 @@ class Auth(Resource):
         """
         db = DataBase(self.DATABASE_DATA)
         query = "SELECT clinic_id, admin, password, salt FROM triagedata.users "
-        query += "WHERE username='%s' " % username
+        query += "WHERE username=%(username)s "
 
-        result = db.select(query)
+        result = db.select(query, params={'username': username}, prepare='user_credentials')
 
         if len(result) > 0:
             user_data = [user for user in result if user[2] == hashlib.sha512((password + user[3]).encode()).hexdigest()]
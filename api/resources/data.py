@@ -3,14 +3,18 @@ This module handles all required interaction with the `/data` endpoint
 """
 
 # External dependencies
-from flask import request
+from flask import request, Response, stream_with_context
 from webargs.flaskparser import parser
-from webargs import fields
+from webargs import fields, validate
 import ast
+import csv
+import io
+import json
 
 # Internal dependencies
 from api.resources.AuthResource import AuthResource
 from api.common.ClinicData import ClinicData
+from api.common.database_interaction import Session
 
 
 class Data(AuthResource):
@@ -18,6 +22,11 @@ class Data(AuthResource):
     The `Data` class handles all of the requests relative to retrieving Data for the API.
     """
 
+    STREAM_CHUNK_SIZE = 1000
+    """
+    Number of referral rows read from the database and written to the response at a time when streaming.
+    """
+
     # API input schema
     path_arg_schema_get = {
         "clinic_id": fields.Int(required=True),
@@ -32,13 +41,19 @@ class Data(AuthResource):
     """
 
     url_arg_schema_get = {
-        "interval": fields.Raw(required=True)
+        "interval": fields.Raw(required=True),
+        "format": fields.String(validate=validate.OneOf(['json', 'jsonl', 'csv'])),
+        "resolution": fields.String(validate=validate.OneOf(['day', 'week', 'month']))
     }
     """
     The required schema to handle a get request
 
     Args:
         intervals (tuple): 2-ary tuple with start and end date for desired data retrieval.
+        format (str): The response format. `json` (default) returns a single list, `jsonl` and `csv` stream one
+                      referral per line with constant memory use.
+        resolution (str): Optional period length, `day`, `week` or `month`, to return referral counts per period
+                          instead of referrals.
     """
 
     def get(self, clinic_id, triage_class):
@@ -56,6 +71,17 @@ class Data(AuthResource):
             2. Triage class severity
             3. Referral arrival date
             4. Patient seen date
+
+            With the `jsonl` and `csv` formats, a chunked response with one tuple per line is streamed instead.
+
+            With a resolution, a dictionary of counts is returned instead, with
+            ```
+            {
+                resolution (str) The period length.
+                counts (list) The referral counts of each period, see `ClinicData.get_referral_counts`.
+                lateness (list) The number of referrals seen by weeks waited, see `ClinicData.get_referral_lateness`.
+            }
+            ```
         """
         # Validate input arguments.
         path_args = parser.parse(self.path_arg_schema_get, request, location="path")
@@ -66,6 +92,71 @@ class Data(AuthResource):
         if type(url_args['interval']) != list or len(url_args['interval']) != 2:
             raise RuntimeError('Invalid Interval Input')
 
+        response_format = url_args.get('format', 'json')
+
+        if 'resolution' in url_args:
+            return self._get_counts(path_args['clinic_id'], path_args['triage_class'], url_args['interval'],
+                                    url_args['resolution'])
+
         clinic_data = ClinicData(path_args['clinic_id'])
 
-        return clinic_data.get_referral_data(path_args['triage_class'], url_args['interval'])
+        if response_format == 'json':
+            return clinic_data.get_referral_data(path_args['triage_class'], url_args['interval'])
+
+        chunks = clinic_data.stream_referral_data(path_args['triage_class'], url_args['interval'],
+                                                  self.STREAM_CHUNK_SIZE)
+        if response_format == 'csv':
+            return Response(stream_with_context(self._csv_lines(chunks)), mimetype='text/csv')
+        return Response(stream_with_context(self._json_lines(chunks)), mimetype='application/x-ndjson')
+
+    @staticmethod
+    def _get_counts(clinic_id, triage_class, interval, resolution):
+        """
+        Counts the historic data of a triage class per period, reading every count from the same snapshot.
+
+        Args:
+            clinic_id (int): The id of the clinic being referenced.
+            triage_class (int): The triage class severity level.
+            interval (list): The start and end date for desired data retrieval.
+            resolution (str): The period length.
+
+        Returns:
+            A dictionary of counts, see `Data.get`.
+        """
+        with Session(ClinicData.DATABASE_DATA, read_only=True) as session:
+            clinic_data = ClinicData(clinic_id, session)
+            return {
+                'resolution': resolution,
+                'counts': clinic_data.get_referral_counts(triage_class, interval, resolution),
+                'lateness': clinic_data.get_referral_lateness(triage_class, interval)
+            }
+
+    @staticmethod
+    def _json_lines(chunks):
+        """
+        Formats chunks of historic data as JSON lines.
+
+        Args:
+            chunks (generator): The chunks of historic data tuples.
+
+        Returns:
+            A generator of strings with one JSON list per line for each chunk.
+        """
+        for rows in chunks:
+            yield ''.join(json.dumps(row) + '\n' for row in rows)
+
+    @staticmethod
+    def _csv_lines(chunks):
+        """
+        Formats chunks of historic data as CSV lines.
+
+        Args:
+            chunks (generator): The chunks of historic data tuples.
+
+        Returns:
+            A generator of strings with one CSV line per tuple for each chunk.
+        """
+        for rows in chunks:
+            lines = io.StringIO()
+            csv.writer(lines, lineterminator='\n').writerows(rows)
+            yield lines.getvalue()
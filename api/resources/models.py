@@ -11,6 +11,7 @@ from webargs import fields
 # Internal dependencies
 from api.resources.AuthResource import AuthResource
 from api.common.database_interaction import DataBase
+from api.common.ModelRegistry import model_registry
 from api.common.config import database_config
 
 
@@ -103,12 +104,15 @@ class Models(AuthResource):
         # Establish database connection
         db = DataBase(self.DATABASE_DATA)
         # Update database data
-        query = "UPDATE triagedata.models SET in_use = (CASE WHEN id=%s THEN true ELSE false END)" % model_id
-        query += "WHERE (SELECT COUNT(*) FROM triagedata.models WHERE id=%s)=1" % model_id
-        query += " AND severity=(SELECT severity FROM triagedata.models WHERE id=%s)" % model_id
-        query += " AND clinic_id=%s" % clinic_id
+        query = "UPDATE triagedata.models SET in_use = (CASE WHEN id=%(model_id)s THEN true ELSE false END)"
+        query += "WHERE (SELECT COUNT(*) FROM triagedata.models WHERE id=%(model_id)s)=1"
+        query += " AND severity=(SELECT severity FROM triagedata.models WHERE id=%(model_id)s)"
+        query += " AND clinic_id=%(clinic_id)s"
 
-        db.update(query)
+        db.update(query, params={'model_id': model_id, 'clinic_id': clinic_id})
+
+        # Other processes pick up the change through the database model version
+        model_registry.invalidate(clinic_id)
 
     def get_clinic_models(self, clinic_id):
         """
@@ -125,7 +129,9 @@ class Models(AuthResource):
         db = DataBase(self.DATABASE_DATA)
         rows = db.select("SELECT id, accuracy, to_char(created,'DD-MM-YYYY'), in_use \
                            FROM triagedata.models \
-                           WHERE clinic_id=%s" % (clinic_id))
+                           WHERE clinic_id=%(clinic_id)s",
+                         params={'clinic_id': clinic_id},
+                         prepare='clinic_models')
         if not rows:
             msg = f'Could not retrieve models for clinic-id: {clinic_id}'
             raise RuntimeError(msg)
@@ -5,12 +5,13 @@ This module handles all required interaction with the `/predict` endpoint
 # External dependencies
 from flask import request
 from webargs.flaskparser import parser
-from webargs import fields
+from webargs import fields, validate
 import ast
 
 # Internal dependencies
 from api.resources.AuthResource import AuthResource
 from api.common.controller.TriageController import TriageController
+from api.common.database_interaction import Session
 from api.common.config import database_config
 
 
@@ -34,10 +35,11 @@ class Predict(AuthResource):
     # API input schema
     arg_schema_get = {
         "clinic-id": fields.Int(required=True),
-        "intervals": fields.String(missing="[]"),
-        "confidence": fields.Float(missing=0.95),
-        "num-sim-runs": fields.Int(missing=100),
-        "waitlist": fields.Raw(missing=[])
+        "intervals": fields.String(load_default="[]"),
+        "confidence": fields.Float(load_default=0.95),
+        "num-sim-runs": fields.Int(load_default=1000, validate=validate.Range(min=1)),
+        "time-budget": fields.Float(load_default=None, validate=validate.Range(min=0)),
+        "waitlist": fields.Raw(load_default=[])
     }
     """
     The required schema to handle a get request
@@ -48,7 +50,8 @@ class Predict(AuthResource):
         end_date (str): The end date of the predictions.
         intervals (list): Date intervals for predictions to be grouped by.
         confidence (float): Required prediction confidence.
-        num_sim_runs (int): Number of simulations to run.
+        num_sim_runs (int): Number of simulations to run, or the most to run with a time budget (default = 1000).
+        time_budget (float): Optional wall clock seconds the simulations may take.
         waitlist (file): Current wait list of patients for the clinic.
     """
 
@@ -66,6 +69,8 @@ class Predict(AuthResource):
             {
                 url (str) The request url.
                 predictions (dict) Dictionary containing the interval predictions for each class.
+                sim_runs (dict) Dictionary containing the number of simulation runs used for each interval of each
+                                class.
             }
             ```
 
@@ -85,14 +90,19 @@ class Predict(AuthResource):
                             location='querystring')
         args['intervals'] = ast.literal_eval(args['intervals'])
 
-        triage_controller = TriageController(args['clinic-id'],
-                                             args['intervals'],
-                                             args['confidence'],
-                                             args['num-sim-runs'])
-        predictions = triage_controller.predict()
+        # Run the queries of the request in a single read only snapshot.
+        with Session(self.DATABASE_DATA, read_only=True) as session:
+            triage_controller = TriageController(args['clinic-id'],
+                                                 args['intervals'],
+                                                 args['confidence'],
+                                                 args['num-sim-runs'],
+                                                 args['time-budget'],
+                                                 session)
+            predictions = triage_controller.predict()
 
         # API response
         return {
             'url': request.url,
-            'predictions': predictions
+            'predictions': predictions,
+            'sim_runs': triage_controller.sim_runs
         }
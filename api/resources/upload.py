@@ -12,8 +12,9 @@ import uuid
 # Internal dependencies
 from api.resources.AuthResource import AuthResource
 from api.common.database_interaction import DataBase
+from api.common.HistoricDataUpload import HistoricDataUpload
 from api.resources.models import Models
-from api.common.config import database_config
+from api.common.config import database_config, historic_data_upload_config
 
 FILE_STORAGE_PATH = 'uploads/'
 
@@ -59,28 +60,28 @@ class PastAppointments(AuthResource):
         # Figure out how to validate inputs
         mime_type = request.files.get('upload_data').mimetype
         if mime_type == 'text/csv':
-            self.upload_csv_data(request.files.get('upload_data'))
+            report = self.upload_csv_data(request.files.get('upload_data'))
         else:
             raise FileError("Bad upload file type received.")
-        return {'status': 200}
+        return {'status': 200, 'upload': report}
 
     def upload_csv_data(self, upload_file):
         """
-        Saves The information from a csv file directly into the database.
+        Saves The information from a csv file into the database.
 
         The file is not expected to contain headers.
         Expected rows contain: 'clinic_id', 'severity', 'date_received', 'date_seen'
 
+        The file is staged, validated and merged in bounded transactions, see
+        `api.common.HistoricDataUpload.HistoricDataUpload` for details.
+
         Args:
             upload_file (file, csv): The csv file to import into the database.
+
+        Returns:
+            The report of the upload, with the progress of every chunk and the rejected rows.
         """
-        db = DataBase(self.DATABASE_DATA)
-        db.insert_data_from_file(
-                'triagedata.historicdata',
-                ('clinic_id', 'severity', 'date_received', 'date_seen'),
-                upload_file,
-                ','
-            )
+        return HistoricDataUpload(self.DATABASE_DATA, **historic_data_upload_config).load(upload_file)
 
 
 class Model(AuthResource):
@@ -148,9 +149,16 @@ class Model(AuthResource):
         """
         db = DataBase(self.DATABASE_DATA)
         query = "INSERT INTO triagedata.models (file_path, clinic_id, severity, accuracy, in_use) "
-        query += "VALUES ('%s', %s, %s, %s, %s) " % (file_path, clinic_id, severity, accuracy, in_use)
+        query += "VALUES (%(file_path)s, %(clinic_id)s, %(severity)s, %(accuracy)s, %(in_use)s) "
         query += "RETURNING id"
-        return db.insert(query, returning=True)
+        return db.insert(query, returning=True,
+                         params={
+                             'file_path': file_path,
+                             'clinic_id': clinic_id,
+                             'severity': severity,
+                             'accuracy': accuracy,
+                             'in_use': in_use
+                         })
 
     def save_weight_file_locally(self, data_file, clinic_id, severity):
         """
@@ -4,7 +4,6 @@ Requires triage-ml package to be installed
 """
 
 import pytest
-from datetime import datetime
 from api.common.controller.TriageController import TriageController
 
 
@@ -114,125 +113,6 @@ class TestTriageController:
 
         assert actual_response == expected_response_mock
 
-    def test_sort_referral_data_empty(self):
-        """
-        Test Type: Unit
-        Test Purpose: Tests that empty historic data can be sorted by triage class.
-        """
-
-        test_triage_controller = TriageController(self.intervals_multiple_mock,
-                                                  self.clinic_settings_mock,
-                                                  self.padding_length_large_mock)
-
-        expected_response = {
-            1: [],
-            2: [],
-            3: []
-        }
-
-        actual_response = test_triage_controller.sort_referral_data([], self.clinic_settings_mock)
-
-        assert actual_response == expected_response
-
-    def test_sort_referral_data_singleton(self):
-        """
-        Test Type: Unit
-        Test Purpose: Tests that singleton historic data can be sorted by triage class.
-        """
-
-        test_triage_controller = TriageController(self.intervals_multiple_mock,
-                                                  self.clinic_settings_mock,
-                                                  self.padding_length_large_mock)
-        referral_data_mock = [
-            {
-                'date_recieved': datetime.strptime('2019-01-01', '%Y-%m-%d'),
-                'date_seen': datetime.strptime('2019-01-02', '%Y-%m-%d')
-            }
-        ]
-        expected_response = {
-            1: ['2019-01-01'],
-            2: [],
-            3: []
-        }
-
-        actual_response = test_triage_controller.sort_referral_data(referral_data_mock, self.clinic_settings_mock)
-
-        assert actual_response == expected_response
-
-    def test_sort_referral_data_multiple_same_class(self):
-        """
-        Test Type: Unit
-        Test Purpose: Tests that multiple historic data can be sorted into a single triage class.
-        """
-
-        test_triage_controller = TriageController(self.intervals_multiple_mock,
-                                                  self.clinic_settings_mock,
-                                                  self.padding_length_large_mock)
-        referral_data_mock = [
-            {
-                'date_recieved': datetime.strptime('2019-01-01', '%Y-%m-%d'),
-                'date_seen': datetime.strptime('2019-01-01', '%Y-%m-%d')
-            },
-            {
-                'date_recieved': datetime.strptime('2019-01-02', '%Y-%m-%d'),
-                'date_seen': datetime.strptime('2019-01-04', '%Y-%m-%d')
-            },
-            {
-                'date_recieved': datetime.strptime('2019-01-03', '%Y-%m-%d'),
-                'date_seen': datetime.strptime('2019-01-17', '%Y-%m-%d')
-            },
-            {
-                'date_recieved': datetime.strptime('2019-01-10', '%Y-%m-%d'),
-                'date_seen': datetime.strptime('2019-12-31', '%Y-%m-%d')
-            }
-        ]
-        expected_response = {
-            1: ['2019-01-01', '2019-01-02', '2019-01-03', '2019-01-10'],
-            2: [],
-            3: []
-        }
-
-        actual_response = test_triage_controller.sort_referral_data(referral_data_mock, self.clinic_settings_mock)
-
-        assert actual_response == expected_response
-
-    def test_sort_referral_data_multiple_all_classes(self):
-        """
-        Test Type: Unit
-        Test Purpose: Tests that multiple historic data can be sorted into multiple triage classes.
-        """
-
-        test_triage_controller = TriageController(self.intervals_multiple_mock,
-                                                  self.clinic_settings_mock,
-                                                  self.padding_length_large_mock)
-        referral_data_mock = [
-            {
-                'date_recieved': datetime.strptime('2019-01-01', '%Y-%m-%d'),
-                'date_seen': datetime.strptime('2019-01-01', '%Y-%m-%d')
-            },
-            {
-                'date_recieved': datetime.strptime('2019-01-15', '%Y-%m-%d'),
-                'date_seen': datetime.strptime('2019-01-23', '%Y-%m-%d')
-            },
-            {
-                'date_recieved': datetime.strptime('2019-01-02', '%Y-%m-%d'),
-                'date_seen': datetime.strptime('2019-01-26', '%Y-%m-%d')
-            },
-            {
-                'date_recieved': datetime.strptime('2019-01-03', '%Y-%m-%d'),
-                'date_seen': datetime.strptime('2019-03-17', '%Y-%m-%d')
-            }
-        ]
-        expected_response = {
-            1: ['2019-01-01', '2019-01-15'],
-            2: ['2019-01-02'],
-            3: ['2019-01-03']
-        }
-
-        actual_response = test_triage_controller.sort_referral_data(referral_data_mock, self.clinic_settings_mock)
-
-        assert actual_response == expected_response
-
     def test_get_predictions(self):
         """
         Test Type: Acceptance
@@ -160,6 +160,150 @@ class TestClinicData:
         ]
         assert clinic_data.get_referral_data(self.triage_class_mock, self.interval_mock) == expected_result
 
+    def test_get_referral_data_clinic_scoped(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that referral data is only queried for the clinic.
+        """
+
+        database_clinic_settings_response_mock = [[3, 1, 'Urgent', 2, 0.8]]
+        mocker.patch('api.common.database_interaction.DataBase.select',
+                     return_value=database_clinic_settings_response_mock)
+
+        clinic_data = ClinicData(self.clinic_id_mock)
+
+        select = mocker.patch('api.common.database_interaction.DataBase.select',
+                              return_value=[])
+        clinic_data.get_referral_data(self.triage_class_mock, self.interval_mock)
+
+        query = ' '.join(select.call_args[0][0].split())
+        assert query.count('historicdata.clinic_id = %(clinic_id)s') == 2
+        assert select.call_args[1]['params']['clinic_id'] == self.clinic_id_mock
+
+    def test_stream_referral_data(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that referral data is streamed in chunks.
+        """
+
+        database_clinic_settings_response_mock = [[3, 1, 'Urgent', 2, 0.8]]
+        mocker.patch('api.common.database_interaction.DataBase.select',
+                     return_value=database_clinic_settings_response_mock)
+
+        clinic_data = ClinicData(self.clinic_id_mock)
+
+        database_chunks_mock = [[('2020-01-01', '2020-01-14'), ('2020-05-01', '2020-05-14')],
+                                [('2020-11-01', '2020-11-14')]]
+        stream = mocker.patch('api.common.database_interaction.DataBase.stream',
+                              return_value=iter(database_chunks_mock))
+
+        assert list(clinic_data.stream_referral_data(self.triage_class_mock, self.interval_mock, 2)) == [
+            [(1, 1, '2020-01-01', '2020-01-14'), (1, 1, '2020-05-01', '2020-05-14')],
+            [(1, 1, '2020-11-01', '2020-11-14')]
+        ]
+        assert stream.call_args[1]['size'] == 2
+
+    def test_get_referral_counts(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that referral counts are returned per period.
+        """
+
+        database_clinic_settings_response_mock = [[3, 1, 'Urgent', 2, 0.8]]
+        mocker.patch('api.common.database_interaction.DataBase.select',
+                     return_value=database_clinic_settings_response_mock)
+
+        clinic_data = ClinicData(self.clinic_id_mock)
+
+        database_counts_mock = [('2020-01-01', 4, 3, 2), ('2020-02-01', 1, 0, 0)]
+        select = mocker.patch('api.common.database_interaction.DataBase.select',
+                              return_value=database_counts_mock)
+
+        assert clinic_data.get_referral_counts(self.triage_class_mock, self.interval_mock, 'month') == [
+            {'start': '2020-01-01', 'received': 4, 'seen': 3, 'on_time': 2},
+            {'start': '2020-02-01', 'received': 1, 'seen': 0, 'on_time': 0}
+        ]
+        assert select.call_args[1]['params']['resolution'] == 'month'
+        assert select.call_args[1]['params']['duration'] == 14
+
+    def test_get_referral_lateness(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that the number of referrals seen is returned by weeks waited.
+        """
+
+        database_clinic_settings_response_mock = [[3, 1, 'Urgent', 2, 0.8]]
+        mocker.patch('api.common.database_interaction.DataBase.select',
+                     return_value=database_clinic_settings_response_mock)
+
+        clinic_data = ClinicData(self.clinic_id_mock)
+
+        mocker.patch('api.common.database_interaction.DataBase.select',
+                     return_value=[(0, 5), (3, 1)])
+
+        assert clinic_data.get_referral_lateness(self.triage_class_mock, self.interval_mock) == [
+            {'weeks': 0, 'seen': 5},
+            {'weeks': 3, 'seen': 1}
+        ]
+
+    def test_get_weekly_referral_counts_by_class_empty(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that weeks without referrals are counted as 0.
+        """
+
+        database_clinic_settings_response_mock = [[3, 1, 'Urgent', 2, 0.8]]
+        mocker.patch('api.common.database_interaction.DataBase.select',
+                     return_value=database_clinic_settings_response_mock)
+
+        clinic_data = ClinicData(self.clinic_id_mock)
+
+        mocker.patch('api.common.database_interaction.DataBase.select',
+                     return_value=[])
+
+        assert clinic_data.get_weekly_referral_counts_by_class([self.triage_class_mock], self.interval_mock, 4) == {
+            self.triage_class_mock: [0, 0, 0, 0]
+        }
+
+    def test_get_weekly_referral_counts_by_class(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that the weekly counts of many triage classes are retrieved with one query.
+        """
+
+        database_clinic_settings_response_mock = [[3, 1, 'Urgent', 2, 0.8], [3, 2, 'Standard', 4, 0.7]]
+        mocker.patch('api.common.database_interaction.DataBase.select',
+                     return_value=database_clinic_settings_response_mock)
+
+        clinic_data = ClinicData(self.clinic_id_mock)
+
+        database_weekly_counts_mock = [(1, 0, 3), (2, 1, 4), (1, 2, 5)]
+        mock_select = mocker.patch('api.common.database_interaction.DataBase.select',
+                                   return_value=database_weekly_counts_mock)
+
+        assert clinic_data.get_weekly_referral_counts_by_class([1, 2], self.interval_mock, 3) == {
+            1: [3, 0, 5],
+            2: [0, 4, 0]
+        }
+        mock_select.assert_called_once()
+        assert clinic_data.get_weekly_referral_counts_by_class([], self.interval_mock, 3) == {}
+
+    def test_session_used(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that the queries run in the request session when one is given.
+        """
+
+        mock_database_select = mocker.patch('api.common.database_interaction.DataBase.select')
+        mock_session = mocker.MagicMock()
+        mock_session.select.return_value = [(3, 1, 'Urgent', 2, 0.8)]
+
+        clinic_data = ClinicData(self.clinic_id_mock, mock_session)
+        clinic_data.get_referral_data(self.triage_class_mock, self.interval_mock)
+
+        assert mock_session.select.call_count == 2
+        mock_database_select.assert_not_called()
+
     def test_update_triage_class_database_error(self, mocker):
         """
         Test Type: Unit
@@ -96,3 +96,88 @@ class TestDataAPI:
 
         assert response.status_code == 200
         assert json.loads(response.data) == return_data_mock
+
+    def test_get_stream_jsonl(self, mocker):
+        """
+        Test Type: Acceptance
+        Test Purpose: Tests that historic data is streamed as JSON lines.
+        """
+        mocker.patch('api.common.ClinicData.ClinicData.__init__', return_value=None)
+
+        return_data_mock = [
+            [(1, 1, '2020-01-01', '2020-01-14'), (1, 1, '2020-05-01', '2020-05-14')],
+            [(1, 1, '2020-11-01', '2020-11-14')]
+        ]
+        mocker.patch('api.common.ClinicData.ClinicData.stream_referral_data', return_value=iter(return_data_mock))
+
+        input_mock = {'interval': json.dumps(['2020-01-01', '2021-01-01']), 'format': 'jsonl'}
+        response = self.test_client.get(self.endpoint, headers={'token': self.token}, query_string=input_mock)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert [json.loads(line) for line in response.data.decode().splitlines()] == [
+            [1, 1, '2020-01-01', '2020-01-14'],
+            [1, 1, '2020-05-01', '2020-05-14'],
+            [1, 1, '2020-11-01', '2020-11-14']
+        ]
+
+    def test_get_stream_csv(self, mocker):
+        """
+        Test Type: Acceptance
+        Test Purpose: Tests that historic data is streamed as CSV lines.
+        """
+        mocker.patch('api.common.ClinicData.ClinicData.__init__', return_value=None)
+
+        return_data_mock = [
+            [(1, 1, '2020-01-01', '2020-01-14')],
+            [(1, 1, '2020-11-01', None)]
+        ]
+        mocker.patch('api.common.ClinicData.ClinicData.stream_referral_data', return_value=iter(return_data_mock))
+
+        input_mock = {'interval': json.dumps(['2020-01-01', '2021-01-01']), 'format': 'csv'}
+        response = self.test_client.get(self.endpoint, headers={'token': self.token}, query_string=input_mock)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert response.data.decode() == '1,1,2020-01-01,2020-01-14\n1,1,2020-11-01,\n'
+
+    def test_get_invalid_format(self, mocker):
+        """
+        Test Type: Acceptance
+        Test Purpose: Tests that an unknown response format is rejected.
+        """
+        input_mock = {'interval': json.dumps(['2020-01-01', '2021-01-01']), 'format': 'xml'}
+        response = self.test_client.get(self.endpoint, headers={'token': self.token}, query_string=input_mock)
+
+        assert response.status_code == 422
+
+    def test_get_resolution(self, mocker):
+        """
+        Test Type: Acceptance
+        Test Purpose: Tests that historic data is counted per period when a resolution is given.
+        """
+        mocker.patch('api.common.ClinicData.ClinicData.__init__', return_value=None)
+
+        counts_mock = [{'start': '2020-01-06', 'received': 4, 'seen': 3, 'on_time': 2}]
+        lateness_mock = [{'weeks': 0, 'seen': 2}, {'weeks': 3, 'seen': 1}]
+        counts = mocker.patch('api.common.ClinicData.ClinicData.get_referral_counts', return_value=counts_mock)
+        mocker.patch('api.common.ClinicData.ClinicData.get_referral_lateness', return_value=lateness_mock)
+        get_referral_data = mocker.patch('api.common.ClinicData.ClinicData.get_referral_data')
+
+        input_mock = {'interval': json.dumps(['2020-01-01', '2021-01-01']), 'resolution': 'week'}
+        response = self.test_client.get(self.endpoint, headers={'token': self.token}, query_string=input_mock)
+
+        assert response.status_code == 200
+        assert json.loads(response.data) == {'resolution': 'week', 'counts': counts_mock, 'lateness': lateness_mock}
+        counts.assert_called_with(1, ['2020-01-01', '2021-01-01'], 'week')
+        get_referral_data.assert_not_called()
+
+    def test_get_invalid_resolution(self, mocker):
+        """
+        Test Type: Acceptance
+        Test Purpose: Tests that an unknown resolution is rejected.
+        """
+        input_mock = {'interval': json.dumps(['2020-01-01', '2021-01-01']), 'resolution': 'year'}
+        response = self.test_client.get(self.endpoint, headers={'token': self.token}, query_string=input_mock)
+
+        assert response.status_code == 422
@@ -2,6 +2,7 @@
 This module handles testing for the DataFrame.
 """
 
+import numpy as np
 import pytest
 from datetime import datetime as dt
 from api.common.controller.DataFrame import DataFrame
@@ -127,3 +128,48 @@ class TestDataFrame:
 
         for sample in zip(interval_sample, self.predictions_mock):
             assert sample[0] >= 0
+
+    def test_get_interval_samples_success(self):
+        """
+        Test Type: Unit
+        Test Purpose: Test that interval samples are drawn as an integer matrix with one row per sample.
+        """
+
+        dataframe = DataFrame(self.predictions_mock,
+                              self.intervals_singleton_mock,
+                              self.padding_length_empty_mock)
+
+        interval_samples = dataframe.get_interval_samples(0, 100, np.random.default_rng(0))
+
+        assert interval_samples.shape == (100, dataframe.get_interval_size(0))
+        assert interval_samples.dtype.kind == 'i'
+        assert (interval_samples >= 0).all()
+
+    def test_get_interval_samples_seeded(self):
+        """
+        Test Type: Unit
+        Test Purpose: Test that interval samples are reproducible from a seeded generator.
+        """
+
+        dataframe = DataFrame(self.predictions_mock,
+                              self.intervals_singleton_mock,
+                              self.padding_length_empty_mock)
+
+        first = dataframe.get_interval_samples(0, 10, np.random.default_rng(42))
+        second = dataframe.get_interval_samples(0, 10, np.random.default_rng(42))
+
+        assert (first == second).all()
+
+    def test_get_interval_samples_padding_without_variance(self):
+        """
+        Test Type: Unit
+        Test Purpose: Test that padding data without variance always samples its value.
+        """
+
+        dataframe = DataFrame([(3, 0), (-1, 0)] + self.predictions_mock,
+                              self.intervals_singleton_mock,
+                              2)
+
+        padding_samples = dataframe.get_interval_samples(0, 5, np.random.default_rng(0))
+
+        assert padding_samples.tolist() == [[3, 0]] * 5
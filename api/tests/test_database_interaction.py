@@ -1,7 +1,29 @@
 import pytest
-from psycopg2 import ProgrammingError, DatabaseError
-from api.common.database_interaction import DataBase
-from io import BytesIO
+from psycopg2 import ProgrammingError, DatabaseError, OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+from psycopg2.pool import PoolError
+from api.common.database_interaction import DataBase, ConnectionPool, Session, get_pool, close_pools
+import api.common.database_interaction as database_interaction
+from io import StringIO
+import threading
+
+
+def lock_is_free(lock):
+    """
+    Returns whether another thread can acquire a lock without waiting.
+    """
+    result = []
+
+    def try_acquire():
+        acquired = lock.acquire(blocking=False)
+        if acquired:
+            lock.release()
+        result.append(acquired)
+
+    thread = threading.Thread(target=try_acquire)
+    thread.start()
+    thread.join()
+    return result[0]
 
 
 class TestDatabaseInteraction:
@@ -11,6 +33,12 @@ class TestDatabaseInteraction:
         """
         self.database = DataBase({})
 
+    def setup_method(self):
+        """
+        Test setup that occurs before each test, so that connections are not shared between tests.
+        """
+        close_pools()
+
     def test_select_connection_error(self, mocker):
         """
         Test Type: Unit
@@ -18,6 +46,7 @@ class TestDatabaseInteraction:
         """
         query_string = 'bad QuEry 5$3'
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect.side_effect = DatabaseError
 
         with pytest.raises(DatabaseError):
@@ -30,6 +59,7 @@ class TestDatabaseInteraction:
         """
         query_string = 'bad QuEry 5$3'
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect().__enter__().cursor().__enter__().fetchall.side_effect = ProgrammingError()
 
         with pytest.raises(ProgrammingError):
@@ -37,7 +67,7 @@ class TestDatabaseInteraction:
 
         mock_connect().__enter__().cursor().__enter__().execute.assert_called_with(query_string)
         mock_connect().__enter__().cursor().__enter__().fetchall.assert_called()
-        mock_connect().__enter__().close.assert_not_called()
+        mock_connect().close.assert_not_called()
 
     def test_select_no_rows_found(self, mocker):
         """
@@ -47,12 +77,13 @@ class TestDatabaseInteraction:
         query_string = 'SELECT * FROM table;'
         expected = []
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect().__enter__().cursor().__enter__().fetchall.return_value = expected
 
         assert self.database.select(query_string) == expected
         mock_connect().__enter__().cursor().__enter__().execute.assert_called_with(query_string)
         mock_connect().__enter__().cursor().__enter__().fetchall.assert_called()
-        mock_connect().__enter__().close.assert_called()
+        mock_connect().close.assert_not_called()
 
     def test_select_singleton(self, mocker):
         """
@@ -62,12 +93,13 @@ class TestDatabaseInteraction:
         query_string = 'SELECT * FROM table;'
         expected = [('test1', 'test2', 'test3')]
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect().__enter__().cursor().__enter__().fetchall.return_value = expected
 
         assert self.database.select(query_string) == expected
         mock_connect().__enter__().cursor().__enter__().execute.assert_called_with(query_string)
         mock_connect().__enter__().cursor().__enter__().fetchall.assert_called()
-        mock_connect().__enter__().close.assert_called()
+        mock_connect().close.assert_not_called()
 
     def test_select_multiple_rows(self, mocker):
         """
@@ -77,12 +109,13 @@ class TestDatabaseInteraction:
         query_string = 'SELECT * FROM table;'
         expected = [('test1', 'test2', 'test3'), ('test1', 'test2', 'test3'), ('test1', 'test2', 'test3')]
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect().__enter__().cursor().__enter__().fetchall.return_value = expected
 
         assert self.database.select(query_string) == expected
         mock_connect().__enter__().cursor().__enter__().execute.assert_called_with(query_string)
         mock_connect().__enter__().cursor().__enter__().fetchall.assert_called()
-        mock_connect().__enter__().close.assert_called()
+        mock_connect().close.assert_not_called()
 
     def test_insert_connection_error(self, mocker):
         """
@@ -91,6 +124,7 @@ class TestDatabaseInteraction:
         """
         query_string = 'bad QuEry 5$3'
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect.side_effect = DatabaseError
 
         with pytest.raises(DatabaseError):
@@ -103,6 +137,7 @@ class TestDatabaseInteraction:
         """
         query_string = 'bad QuEry 5$3'
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect().__enter__().cursor().__enter__().execute.side_effect = ProgrammingError()
 
         with pytest.raises(ProgrammingError):
@@ -110,7 +145,7 @@ class TestDatabaseInteraction:
 
         mock_connect().__enter__().cursor().__enter__().execute.assert_called_with(query_string)
         mock_connect().__enter__().commit.assert_not_called()
-        mock_connect().__enter__().close.assert_not_called()
+        mock_connect().close.assert_not_called()
 
     def test_insert_success(self, mocker):
         """
@@ -119,11 +154,12 @@ class TestDatabaseInteraction:
         """
         query_string = "INSERT INTO table ('test') VALUES ('test');"
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
 
         self.database.insert(query_string)
         mock_connect().__enter__().cursor().__enter__().execute.assert_called_with(query_string)
         mock_connect().__enter__().commit.assert_called()
-        mock_connect().__enter__().close.assert_called()
+        mock_connect().close.assert_not_called()
 
     def test_update_connection_error(self, mocker):
         """
@@ -132,6 +168,7 @@ class TestDatabaseInteraction:
         """
         query_string = 'bad QuEry 5$3'
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect.side_effect = DatabaseError
 
         with pytest.raises(DatabaseError):
@@ -144,6 +181,7 @@ class TestDatabaseInteraction:
         """
         query_string = 'bad QuEry 5$3'
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect().__enter__().cursor().__enter__().execute.side_effect = ProgrammingError()
 
         with pytest.raises(ProgrammingError):
@@ -151,7 +189,7 @@ class TestDatabaseInteraction:
 
         mock_connect().__enter__().cursor().__enter__().execute.assert_called_with(query_string)
         mock_connect().__enter__().commit.assert_not_called()
-        mock_connect().__enter__().close.assert_not_called()
+        mock_connect().close.assert_not_called()
 
     def test_update_success(self, mocker):
         """
@@ -160,11 +198,12 @@ class TestDatabaseInteraction:
         """
         query_string = "UPDATE table SET 'test'='this_will_work' WHERE table.testing = 'true';"
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
 
         self.database.update(query_string)
         mock_connect().__enter__().cursor().__enter__().execute.assert_called_with(query_string)
         mock_connect().__enter__().commit.assert_called()
-        mock_connect().__enter__().close.assert_called()
+        mock_connect().close.assert_not_called()
 
     def test_modify_data_connection_error(self, mocker):
         """
@@ -173,6 +212,7 @@ class TestDatabaseInteraction:
         """
         query_string = 'bad QuEry 5$3'
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect.side_effect = DatabaseError
 
         with pytest.raises(DatabaseError):
@@ -185,6 +225,7 @@ class TestDatabaseInteraction:
         """
         query_string = 'bad QuEry 5$3'
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect().__enter__().cursor().__enter__().execute.side_effect = ProgrammingError()
 
         with pytest.raises(ProgrammingError):
@@ -193,7 +234,7 @@ class TestDatabaseInteraction:
         mock_connect().__enter__().cursor().__enter__().execute.assert_called_with(query_string)
         mock_connect().__enter__().cursor().__enter__().fetchone.assert_not_called()
         mock_connect().__enter__().commit.assert_not_called()
-        mock_connect().__enter__().close.assert_not_called()
+        mock_connect().close.assert_not_called()
 
     def test_modify_data_success_no_return(self, mocker):
         """
@@ -202,12 +243,13 @@ class TestDatabaseInteraction:
         """
         query_string = "UPDATE table SET 'test'='this_will_work' WHERE table.testing = 'true';"
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
 
         result = self.database._modify_data(query_string)
         mock_connect().__enter__().cursor().__enter__().execute.assert_called_with(query_string)
         mock_connect().__enter__().cursor().__enter__().fetchone.assert_not_called()
         mock_connect().__enter__().commit.assert_called()
-        mock_connect().__enter__().close.assert_called()
+        mock_connect().close.assert_not_called()
         assert result is None
 
     def test_modify_data_success_return(self, mocker):
@@ -218,87 +260,454 @@ class TestDatabaseInteraction:
         expected = ('update', 'results')
         query_string = "UPDATE table SET 'test'='this_will_work' WHERE table.testing = 'true';"
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect().__enter__().cursor().__enter__().fetchone.return_value = [expected]
 
         result = self.database._modify_data(query_string, True)
         mock_connect().__enter__().cursor().__enter__().execute.assert_called_with(query_string)
         mock_connect().__enter__().cursor().__enter__().fetchone.assert_called()
         mock_connect().__enter__().commit.assert_called()
-        mock_connect().__enter__().close.assert_called()
+        mock_connect().close.assert_not_called()
         assert result == expected
 
-    def test_insert_data_from_file_connection_error(self, mocker):
+    def test_insert_csv_from_file_connection_error(self, mocker):
         """
         Test Type: Unit
         Test Purpose: Tests that an error is thrown if a the database connection fails.
         """
         mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
         mock_connect.side_effect = DatabaseError
 
         with pytest.raises(DatabaseError):
-            self.database.insert_data_from_file("table", ("column_name"), BytesIO(b"test\nfile"), ",")
+            self.database.insert_csv_from_file("table", ("col",), StringIO("test\nfile"))
 
-    def test_insert_data_from_file_bad_table(self, mocker):
+    def test_insert_csv_from_file_bad_table(self, mocker):
         """
         Test Type: Unit
-        Test Purpose: Tests that an error is thrown if a bad table is passed.
+        Test Purpose: Tests that an error is thrown if a bad table or column is passed.
         """
-        mock_file = BytesIO(b"test\nfile")
+        mock_file = StringIO("test\nfile")
         mock_connect = mocker.patch('psycopg2.connect')
-        mock_connect().__enter__().cursor().__enter__().copy_from.side_effect = ProgrammingError()
+        mock_connect().closed = 0
+        mock_connect().__enter__().cursor().__enter__().copy_expert.side_effect = ProgrammingError()
 
         with pytest.raises(ProgrammingError):
-            self.database.insert_data_from_file("bad_table", ("col"), mock_file, ",")
+            self.database.insert_csv_from_file("bad_table", ("col", "bad_column"), mock_file)
 
-        mock_connect().__enter__().cursor().__enter__().copy_from.assert_called_with(
-                mock_file, "bad_table", sep=",", columns=("col")
+        mock_connect().__enter__().cursor().__enter__().copy_expert.assert_called_with(
+                "COPY bad_table (col, bad_column) FROM STDIN WITH (FORMAT csv)", mock_file
             )
-        mock_connect().__enter__().close.assert_not_called()
+        mock_connect().close.assert_not_called()
 
-    def test_insert_data_from_file_bad_columns(self, mocker):
+    def test_insert_csv_from_file_success(self, mocker):
         """
         Test Type: Unit
-        Test Purpose: Tests that an error is thrown if a bad column is passed.
+        Test Purpose: Tests a successful data insertion from a csv file.
         """
-        mock_file = BytesIO(b"test\nfile")
         mock_connect = mocker.patch('psycopg2.connect')
-        mock_connect().__enter__().cursor().__enter__().copy_from.side_effect = ProgrammingError()
+        mock_connect().closed = 0
+        mock_file = StringIO("test\nfile")
 
-        with pytest.raises(ProgrammingError):
-            self.database.insert_data_from_file("table", ("col", "bad_column"), mock_file, ",")
-
-        mock_connect().__enter__().cursor().__enter__().copy_from.assert_called_with(
-                mock_file, "table", sep=",", columns=("col", "bad_column")
+        self.database.insert_csv_from_file("table", ("col",), mock_file)
+        mock_connect().__enter__().cursor().__enter__().copy_expert.assert_called_with(
+                "COPY table (col) FROM STDIN WITH (FORMAT csv)", mock_file
             )
-        mock_connect().__enter__().close.assert_not_called()
+        mock_connect().close.assert_not_called()
+
+    def test_connection_reused(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that consecutive queries share a single pooled connection.
+        """
+        mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect.return_value.closed = 0
+
+        self.database.select('SELECT 1;')
+        self.database.insert('INSERT INTO table VALUES (1);')
+        self.database.select('SELECT 1;')
+
+        assert mock_connect.call_count == 1
+        mock_connect.return_value.close.assert_not_called()
+
+    def test_pool_shared_by_connection_data(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that databases with the same connection data share a pool.
+        """
+        mocker.patch('psycopg2.connect')
+
+        assert get_pool({'user': 'a', 'port': '1'}) is get_pool({'port': '1', 'user': 'a'})
+        assert get_pool({'user': 'a'}) is not get_pool({'user': 'b'})
+
+    def test_pool_opens_min_size(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that the pool opens its minimum number of connections when created.
+        """
+        mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect.return_value.closed = 0
+
+        ConnectionPool({}, min_size=2, max_size=3)
+        assert mock_connect.call_count == 2
+
+    def test_pool_invalid_size(self):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that a pool cannot be created with an invalid size.
+        """
+        with pytest.raises(ValueError):
+            ConnectionPool({}, min_size=2, max_size=1)
+
+        with pytest.raises(ValueError):
+            ConnectionPool({}, min_size=0, max_size=0)
+
+    def test_pool_timeout(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that an error is thrown if no connection is available within the timeout.
+        """
+        mocker.patch('psycopg2.connect')
+        pool = ConnectionPool({}, min_size=0, max_size=1, timeout=0.01)
+
+        connection = pool.getconn()
+        with pytest.raises(PoolError):
+            pool.getconn()
+
+        pool.putconn(connection)
+
+    def test_pool_connect_error_frees_slot(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that a failed connection attempt does not use up the pool size.
+        """
+        mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect.side_effect = [DatabaseError, mocker.MagicMock()]
+        pool = ConnectionPool({}, min_size=0, max_size=1, timeout=0.01)
+
+        with pytest.raises(DatabaseError):
+            pool.getconn()
+
+        assert pool.getconn() is not None
+
+    def test_pool_closed_connection_replaced(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that a connection closed while idle is replaced with a new connection.
+        """
+        broken, replacement = mocker.MagicMock(closed=0), mocker.MagicMock(closed=0)
+        mocker.patch('psycopg2.connect', side_effect=[broken, replacement])
+        pool = ConnectionPool({}, min_size=1, max_size=1)
+
+        broken.closed = 2
+        assert pool.getconn() is replacement
+
+    def test_pool_health_check(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that connections idle for longer than the health check interval are checked before use.
+        """
+        broken, replacement = mocker.MagicMock(closed=0), mocker.MagicMock(closed=0)
+        broken.cursor().__enter__().execute.side_effect = OperationalError()
+        mocker.patch('psycopg2.connect', side_effect=[broken, replacement])
+        pool = ConnectionPool({}, min_size=1, max_size=1, health_check_interval=0)
+
+        assert pool.getconn() is replacement
+        broken.cursor().__enter__().execute.assert_called_with('SELECT 1')
+        broken.close.assert_called()
+
+    def test_pool_health_check_outside_lock(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that the health check query does not block other threads using the pool.
+        """
+        connection = mocker.MagicMock(closed=0)
+        mocker.patch('psycopg2.connect', return_value=connection)
+        pool = ConnectionPool({}, min_size=1, max_size=1, health_check_interval=0)
+        lock_free = []
+        connection.cursor().__enter__().execute.side_effect = lambda query: lock_free.append(
+            lock_is_free(pool._condition))
+
+        assert pool.getconn() is connection
+        assert lock_free == [True]
+
+    def test_pool_rollback_outside_lock(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that rolling back a returned connection does not block other threads using the pool.
+        """
+        connection = mocker.MagicMock(closed=0)
+        mocker.patch('psycopg2.connect', return_value=connection)
+        pool = ConnectionPool({}, min_size=0, max_size=1)
+        lock_free = []
+        connection.rollback.side_effect = lambda: lock_free.append(lock_is_free(pool._condition))
+
+        connection.info.transaction_status = TRANSACTION_STATUS_INTRANS
+        pool.putconn(pool.getconn())
+        assert lock_free == [True]
+        assert pool.getconn() is connection
+
+    def test_pool_created_outside_lock(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that opening the connections of a new pool does not block lookups of other pools.
+        """
+        lock_free = []
+
+        def connect(**connection_data):
+            lock_free.append(not database_interaction._pools_lock.locked())
+            return mocker.MagicMock(closed=0)
+
+        mocker.patch('psycopg2.connect', side_effect=connect)
+
+        pool = get_pool({'user': 'a'})
+        assert lock_free == [True]
+        assert get_pool({'user': 'a'}) is pool
+
+    def test_pool_rollback_on_return(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that a connection given back in the middle of a transaction is rolled back.
+        """
+        connection = mocker.MagicMock(closed=0)
+        mocker.patch('psycopg2.connect', return_value=connection)
+        pool = ConnectionPool({}, min_size=0, max_size=1)
+
+        connection.info.transaction_status = TRANSACTION_STATUS_INTRANS
+        pool.putconn(pool.getconn())
+        connection.rollback.assert_called()
+
+        connection.rollback.reset_mock()
+        connection.info.transaction_status = TRANSACTION_STATUS_IDLE
+        pool.putconn(pool.getconn())
+        connection.rollback.assert_not_called()
+
+    def test_pool_connection_error_discards(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that a connection failing with a connection error is closed instead of being reused.
+        """
+        mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect.return_value.closed = 0
+        mock_connect().__enter__().cursor().__enter__().execute.side_effect = OperationalError()
+
+        with pytest.raises(OperationalError):
+            self.database.select('SELECT 1;')
+
+        mock_connect().close.assert_called()
+
+    def test_pool_reset_after_fork(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that connections inherited from a parent process are not used or closed by a child.
+        """
+        inherited, child = mocker.MagicMock(closed=0), mocker.MagicMock(closed=0)
+        mocker.patch('psycopg2.connect', side_effect=[inherited, child])
+        pool = ConnectionPool({}, min_size=1, max_size=1)
+
+        # Simulate a fork by making the pool belong to another process
+        pool._pid = -1
+        assert pool.getconn() is child
+        inherited.close.assert_not_called()
+
+    def test_session_single_connection(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that the queries of a session share a single connection and transaction.
+        """
+        mock_connect = mocker.patch('psycopg2.connect')
+        connection = mock_connect.return_value
+        connection.closed = 0
+        connection.cursor().__enter__().fetchall.return_value = [(1,)]
+        connection.cursor().__enter__().fetchone.return_value = [2]
+
+        with Session({}) as session:
+            assert session.select('SELECT 1;') == [(1,)]
+            assert session.insert('INSERT INTO table VALUES (2) RETURNING id;', True) == 2
+            connection.commit.assert_not_called()
+
+        assert mock_connect.call_count == 1
+        connection.commit.assert_called_once()
+        connection.close.assert_not_called()
+
+    def test_session_read_only_snapshot(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that a read only session starts a repeatable read transaction before its first query.
+        """
+        mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect.return_value.closed = 0
+
+        with Session({}, read_only=True) as session:
+            session.select('SELECT 1;')
+            session.select('SELECT 2;')
+
+        executed = [c.args[0] for c in mock_connect().cursor().__enter__().execute.call_args_list]
+        assert executed == ['SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY', 'SELECT 1;', 'SELECT 2;']
+
+    def test_session_read_only_modify_error(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that an error is thrown if a read only session modifies data.
+        """
+        mocker.patch('psycopg2.connect')
+
+        with pytest.raises(RuntimeError):
+            with Session({}, read_only=True) as session:
+                session.update('UPDATE table SET test = 1;')
 
-    def test_insert_data_from_file_bad_file(self, mocker):
+    def test_session_rollback_on_error(self, mocker):
         """
         Test Type: Unit
-        Test Purpose: Tests that an error is thrown if a bad file is passed.
+        Test Purpose: Tests that the session transaction is rolled back if an error is raised within the session.
         """
-        mock_file = BytesIO(b"test, test2\nfile")
         mock_connect = mocker.patch('psycopg2.connect')
-        mock_connect().__enter__().cursor().__enter__().copy_from.side_effect = ProgrammingError()
+        mock_connect.return_value.closed = 0
+        mock_connect().cursor().__enter__().execute.side_effect = ProgrammingError()
 
         with pytest.raises(ProgrammingError):
-            self.database.insert_data_from_file("table", ("col"), mock_file, ",")
+            with Session({}) as session:
+                session.insert('bad QuEry 5$3')
 
-        mock_connect().__enter__().cursor().__enter__().copy_from.assert_called_with(
-                mock_file, "table", sep=",", columns=("col")
-            )
-        mock_connect().__enter__().close.assert_not_called()
+        mock_connect().rollback.assert_called()
+        mock_connect().commit.assert_not_called()
 
-    def test_insert_data_from_file_success(self, mocker):
+    def test_session_commit_releases_connection(self, mocker):
         """
         Test Type: Unit
-        Test Purpose: Tests a successful data insertion from a file statement.
+        Test Purpose: Tests that committing gives the connection back to the pool until the next query.
         """
         mock_connect = mocker.patch('psycopg2.connect')
-        mock_file = BytesIO(b"test\nfile")
+        mock_connect.return_value.closed = 0
+        pool = get_pool({})
 
-        self.database.insert_data_from_file("table", ("col"), mock_file, ",")
-        mock_connect().__enter__().cursor().__enter__().copy_from.assert_called_with(
-                mock_file, "table", sep=",", columns=("col")
-            )
-        mock_connect().__enter__().close.assert_called()
+        with Session({}) as session:
+            session.select('SELECT 1;')
+            assert len(pool._idle) == 0
+            session.commit()
+            assert len(pool._idle) == 1
+            session.select('SELECT 1;')
+
+        assert len(pool._idle) == 1
+        assert mock_connect().commit.call_count == 2
+
+    def test_select_params(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that query parameters are passed to the database separately from the query.
+        """
+        query_string = 'SELECT * FROM table WHERE id = %(id)s;'
+        mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
+
+        self.database.select(query_string, params={'id': 3})
+        mock_connect().__enter__().cursor().__enter__().execute.assert_called_with(query_string, {'id': 3})
+
+    def test_select_prepared(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that a prepared query is prepared once per connection and then only executed.
+        """
+        query_string = "SELECT * FROM table WHERE id = %(id)s AND name = %(name)s AND other_id = %(id)s LIKE 'a%%';"
+        mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
+        execute = mock_connect().__enter__().cursor().__enter__().execute
+
+        self.database.select(query_string, params={'id': 3, 'name': 'test'}, prepare='test')
+        self.database.select(query_string, params={'id': 4, 'name': 'test'}, prepare='test')
+
+        queries = [c.args[0] for c in execute.call_args_list]
+        assert len(queries) == 3
+        name = queries[0].split()[1]
+        assert name.startswith('test_')
+        assert queries[0] == \
+            "PREPARE %s AS SELECT * FROM table WHERE id = $1 AND name = $2 AND other_id = $1 LIKE 'a%%';" % name
+        assert execute.call_args_list[1].args == ('EXECUTE %s (%%s, %%s)' % name, [3, 'test'])
+        assert execute.call_args_list[2].args == ('EXECUTE %s (%%s, %%s)' % name, [4, 'test'])
+
+    def test_select_prepared_no_params(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that a prepared query without parameters is executed without parameters.
+        """
+        query_string = "SELECT * FROM table WHERE name LIKE 'a%';"
+        mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
+        execute = mock_connect().__enter__().cursor().__enter__().execute
+
+        self.database.select(query_string, prepare='test')
+
+        name = execute.call_args_list[0].args[0].split()[1]
+        assert execute.call_args_list[0].args == ('PREPARE %s AS %s' % (name, query_string),)
+        assert execute.call_args_list[1].args == ('EXECUTE %s' % name,)
+
+    def test_prepared_statements_per_connection(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that statements are prepared again on a connection replacing a closed one.
+        """
+        first, second = mocker.MagicMock(closed=0), mocker.MagicMock(closed=0)
+        mocker.patch('psycopg2.connect', side_effect=[first, second])
+
+        self.database.update('UPDATE table SET id = %(id)s;', params={'id': 1}, prepare='test')
+        first.closed = 1
+        self.database.update('UPDATE table SET id = %(id)s;', params={'id': 2}, prepare='test')
+
+        assert first.__enter__().cursor().__enter__().execute.call_count == 2
+        assert second.__enter__().cursor().__enter__().execute.call_count == 2
+        second.__enter__().commit.assert_called()
+
+    def test_session_prepared(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that sessions share the prepared statements of their pooled connection.
+        """
+        mock_connect = mocker.patch('psycopg2.connect')
+        connection = mock_connect.return_value
+        connection.closed = 0
+        execute = connection.cursor().__enter__().execute
+
+        self.database.select('SELECT %(id)s;', params={'id': 1}, prepare='test')
+        with Session({}) as session:
+            session.select('SELECT %(id)s;', params={'id': 2}, prepare='test')
+
+        assert execute.call_count == 1
+        assert execute.call_args.args[1] == [2]
+
+    def test_stream(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that query results are read in chunks from a server side cursor.
+        """
+        query_string = 'SELECT * FROM table WHERE id = %(id)s;'
+        mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
+        cursor = mock_connect().__enter__().cursor
+        cursor().__enter__().fetchmany.side_effect = [[(1,), (2,)], [(3,)], []]
+        pool = get_pool({})
+
+        chunks = self.database.stream(query_string, params={'id': 3}, size=2)
+        assert next(chunks) == [(1,), (2,)]
+        assert len(pool._idle) == 0
+        assert list(chunks) == [[(3,)]]
+        assert len(pool._idle) == 1
+
+        assert cursor.call_args[1]['name'].startswith('stream_')
+        cursor().__enter__().execute.assert_called_with(query_string, {'id': 3})
+        cursor().__enter__().fetchmany.assert_called_with(2)
+
+    def test_stream_closed(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that the connection is given back to the pool when a stream is closed early.
+        """
+        mock_connect = mocker.patch('psycopg2.connect')
+        mock_connect().closed = 0
+        mock_connect().__enter__().cursor().__enter__().fetchmany.return_value = [(1,)]
+        pool = get_pool({})
+
+        chunks = self.database.stream('SELECT 1;')
+        next(chunks)
+        chunks.close()
+
+        assert len(pool._idle) == 1
@@ -0,0 +1,96 @@
+"""
+This module handles testing for the DateEncoder.
+"""
+
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from api.common.controller.DateEncoder import decode_date, encode_date_sequence, encode_dates
+
+
+def encode_date_reference(date):
+    """
+    One hot date encoding as originally implemented by the TriageController.
+    """
+
+    one_hot_date = np.zeros(12 + 31)
+    one_hot_date[date.date().month] = 1
+    one_hot_date[11 + date.date().day] = 1
+
+    return one_hot_date
+
+
+def gen_next_date_reference(date_encoding, days=7):
+    """
+    Next prediction date as originally implemented by the TriageController.
+    """
+
+    month = np.argmax(date_encoding[:12]) + 1
+    day = np.argmax(date_encoding[12:]) + 1
+    date = datetime.strptime(
+        f'2000/{0 if month < 10 else ""}{month}/{0 if day < 10 else ""}{day}', '%Y/%m/%d')
+    date = date + timedelta(days=days)
+
+    return encode_date_reference(date)
+
+
+class TestDateEncoder:
+    """
+    The `TestDateEncoder` class contains unit tests for the DateEncoder.
+    """
+
+    def test_encode_dates_success(self):
+        """
+        Test Type: Unit
+        Test Purpose: Test that dates are one hot encoded as single dates are.
+        """
+
+        dates = [datetime(2020, 1, 1), datetime(2020, 6, 15), datetime(2020, 12, 31)]
+
+        encoded = encode_dates([date.month for date in dates], [date.day for date in dates])
+
+        assert encoded.shape == (3, 43)
+        for row, date in zip(encoded, dates):
+            assert (row == encode_date_reference(date)).all()
+
+    def test_decode_date_success(self):
+        """
+        Test Type: Unit
+        Test Purpose: Test that dates are read back from their encoding as the prediction dates are generated.
+        """
+
+        assert decode_date(encode_date_reference(datetime(2020, 3, 9))) == (4, 9)
+        assert decode_date(encode_date_reference(datetime(2020, 12, 9))) == (1, 1)
+
+    def test_encode_date_sequence_matches_reference(self):
+        """
+        Test Type: Unit
+        Test Purpose: Test that date sequences match repeatedly generating the next date for every start date.
+        """
+
+        for offset in range(366):
+            start_date = datetime(2020, 1, 1) + timedelta(days=offset)
+            dates = [encode_date_reference(start_date)]
+            try:
+                for _ in range(60):
+                    dates.append(gen_next_date_reference(dates[-1]))
+            except ValueError:
+                with pytest.raises(ValueError):
+                    encode_date_sequence(start_date, 60)
+                continue
+
+            assert (encode_date_sequence(start_date, 60) == np.stack(dates)).all()
+
+    def test_encode_date_sequence_cached(self):
+        """
+        Test Type: Unit
+        Test Purpose: Test that date sequences are cached by start date and weeks, and cannot be modified.
+        """
+
+        first = encode_date_sequence(datetime(2020, 1, 1), 10)
+        second = encode_date_sequence(datetime(2021, 1, 1), 10)
+
+        assert first is second
+        assert first.shape == (11, 43)
+        with pytest.raises(ValueError):
+            first[0, 0] = 1
@@ -0,0 +1,255 @@
+"""
+This module handles testing for the HistoricDataUpload.
+"""
+
+import csv
+import hashlib
+import io
+import pytest
+from api.common.HistoricDataUpload import HistoricDataUpload
+from werkzeug.datastructures import FileStorage
+
+
+class TestHistoricDataUpload:
+    """
+    The `TestHistoricDataUpload` class contains unit tests for the staged loading of past appointments.
+    """
+
+    def setup_class(self):
+        """
+        Test setup that occurs once before all tests are run.
+        """
+
+        self.connection_data = {'user': 'historic_data_handler'}
+        self.contents = b"1,1,2019-01-02,2019-01-09\n" \
+                        b"1,2,2019-01-03,2019-01-05\n" \
+                        b"1,1,2019-01-04\n" \
+                        b"1,,2019-01-07,2019-02-01\n" \
+                        b"1,2,2019-01-08,2019-01-10\n"
+        self.upload_id = hashlib.sha256(self.contents).hexdigest()
+
+    def upload_file(self):
+        """
+        Returns a new upload of the test contents.
+        """
+        return FileStorage(io.BytesIO(self.contents), filename="data.csv", content_type="text/csv")
+
+    def mock_session(self, mocker):
+        """
+        Replaces the sessions of the upload and returns the session used in every with block.
+        """
+        session_class = mocker.patch('api.common.HistoricDataUpload.Session')
+        session = session_class.return_value.__enter__.return_value
+        session_class.return_value.__exit__.return_value = False
+        return session
+
+    def test_load_stages_chunks(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that the upload is staged in chunks, each copied separately, before being validated.
+        """
+        mocker.patch('api.common.database_interaction.DataBase.select', return_value=[])
+        mocker.patch('api.common.database_interaction.DataBase.insert')
+        mocker.patch('api.common.database_interaction.DataBase.update')
+        staged = []
+        copy = mocker.patch('api.common.database_interaction.DataBase.insert_csv_from_file',
+                            side_effect=lambda table, columns, data_file: staged.append(list(csv.reader(data_file))))
+        session = self.mock_session(mocker)
+        session.update.return_value = None
+        session.select.side_effect = [[(0,)], [(0, 2, 0, 2), (1, 2, 1, 1), (2, 1, 0, 1)], [(3, 'Expected 4 values')],
+                                      [(5, 1, 4)]]
+
+        report = HistoricDataUpload(self.connection_data, chunk_size=2).load(self.upload_file())
+
+        assert copy.call_count == 3
+        assert copy.call_args_list[0][0][0] == 'triagedata.historicdatastaging'
+        assert [len(chunk) for chunk in staged] == [2, 2, 1]
+        assert staged[0][0] == [self.upload_id, '1', '0', '1', '1', '2019-01-02', '2019-01-09', '']
+        assert staged[1][0] == [self.upload_id, '3', '1', '', '', '', '', 'Expected 4 values, found 3']
+        assert staged[1][1] == [self.upload_id, '4', '1', '1', '', '2019-01-07', '2019-02-01', '']
+        assert 'SET rejection = checked.rejection' in session.update.call_args_list[0][0][0]
+        assert report == {
+            'upload_id': self.upload_id,
+            'duplicate': False,
+            'chunks': [{'chunk': 0, 'rows': 2, 'rejected': 0, 'merged': 2},
+                       {'chunk': 1, 'rows': 2, 'rejected': 1, 'merged': 1},
+                       {'chunk': 2, 'rows': 1, 'rejected': 0, 'merged': 1}],
+            'merged_rows': 4,
+            'rejected_rows': 1,
+            'rejected': [{'line': 3, 'reason': 'Expected 4 values'}]
+        }
+
+    def test_load_stages_null_values(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that the NULL values of text format files are staged as NULL, for unclassified and unseen
+                      referrals.
+        """
+        mocker.patch('api.common.database_interaction.DataBase.select', return_value=[])
+        mocker.patch('api.common.database_interaction.DataBase.insert')
+        mocker.patch('api.common.database_interaction.DataBase.update')
+        staged = []
+        mocker.patch('api.common.database_interaction.DataBase.insert_csv_from_file',
+                     side_effect=lambda table, columns, data_file: staged.append(data_file.getvalue()))
+        session = self.mock_session(mocker)
+        session.update.return_value = None
+        session.select.side_effect = [[(0,)], [(0, 3, 0, 3)], [], [(3, 0, 3)]]
+        contents = b"1,\\N,2019-01-02,2019-01-09\n" \
+                   b"1,2,2019-01-03,\\N\n" \
+                   b"1, ,2019-01-04,\n"
+        upload_file = FileStorage(io.BytesIO(contents), filename="data.csv", content_type="text/csv")
+
+        HistoricDataUpload(self.connection_data).load(upload_file)
+
+        upload_id = hashlib.sha256(contents).hexdigest()
+        assert staged == ['%s,1,0,1,,2019-01-02,2019-01-09,\r\n'
+                          '%s,2,0,1,2,2019-01-03,,\r\n'
+                          '%s,3,0,1,,2019-01-04,,\r\n' % (upload_id, upload_id, upload_id)]
+
+    def test_staged_row_null_values(self):
+        """
+        Test Type: Unit
+        Test Purpose: Test that empty and \\N values are staged as NULL.
+        """
+        row = HistoricDataUpload._staged_row('checksum', 1, 0, ['1', '\\N', '2020-01-01', ''])
+
+        assert row == ['checksum', 1, 0, '1', None, '2020-01-01', None, None]
+
+    def test_load_duplicate(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that a file that was already merged is reported as a duplicate and not merged again.
+        """
+        mocker.patch('api.common.database_interaction.DataBase.select', return_value=[(5, True, True)])
+        copy = mocker.patch('api.common.database_interaction.DataBase.insert_csv_from_file')
+        session = self.mock_session(mocker)
+
+        report = HistoricDataUpload(self.connection_data).load(self.upload_file())
+
+        assert report['duplicate']
+        assert report['merged_rows'] == 0
+        copy.assert_not_called()
+        session.update.assert_not_called()
+
+    def test_load_resumes_merge(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that an upload interrupted while merging is merged from the staged rows, without staging.
+        """
+        mocker.patch('api.common.database_interaction.DataBase.select', return_value=[(5, False, True)])
+        copy = mocker.patch('api.common.database_interaction.DataBase.insert_csv_from_file')
+        session = self.mock_session(mocker)
+        session.update.side_effect = [None, None, 5, None, None, None, None, None, None]
+        session.select.side_effect = [[(0,)], [(0,)], [(0, 5, 1, 4)], [], [(5, 1, 4)]]
+
+        report = HistoricDataUpload(self.connection_data).load(self.upload_file())
+
+        copy.assert_not_called()
+        assert not any('SET rejection' in c[0][0] for c in session.update.call_args_list)
+        merges = [c for c in session.update.call_args_list if 'INSERT INTO triagedata.historicdata' in c[0][0]]
+        assert [c[1]['params']['last_line'] for c in merges] == [0, 5]
+        assert report['merged_rows'] == 4
+
+    def test_load_restages_lost_rows(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that an upload whose staged rows were lost by a database restart is staged again, without
+                      merging the rows it merged before the restart again.
+        """
+        mocker.patch('api.common.database_interaction.DataBase.select', return_value=[(5, False, False)])
+        insert = mocker.patch('api.common.database_interaction.DataBase.insert')
+        mocker.patch('api.common.database_interaction.DataBase.update')
+        copy = mocker.patch('api.common.database_interaction.DataBase.insert_csv_from_file')
+        session = self.mock_session(mocker)
+        session.update.return_value = None
+        session.select.side_effect = [[(0,)], [(0, 5, 1, 4)], [(3, 'Expected 4 values')], [(5, 1, 4)]]
+
+        report = HistoricDataUpload(self.connection_data).load(self.upload_file())
+
+        copy.assert_called_once()
+        assert 'DO UPDATE SET staged_rows = NULL' in ' '.join(insert.call_args[0][0].split())
+        updates = [' '.join(c[0][0].split()) for c in session.update.call_args_list]
+        assert 'SET rejection = checked.rejection' in updates[0]
+        assert 'SET merged = true' in updates[1]
+        assert 'LIMIT (SELECT merged_rows FROM triagedata.historicdatauploads' in updates[1]
+        assert report['merged_rows'] == 4
+        assert not report['duplicate']
+
+    def test_merge_batch(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that the partitions of a batch are created before it is inserted, and that it is counted in
+                      the transaction merging it, holding the upload lock.
+        """
+        session = self.mock_session(mocker)
+        session.update.side_effect = [None, None, 7]
+        session.select.return_value = [(42,)]
+
+        assert HistoricDataUpload(self.connection_data, batch_size=3)._merge_batch('checksum', 2) == 7
+
+        updates = [' '.join(c[0][0].split()) for c in session.update.call_args_list]
+        assert len(updates) == 3
+        assert 'LOCK TABLE triagedata.dailyreferralcounts' in updates[0]
+        assert updates[1].startswith('SELECT triagedata.partition_historic_dates(ARRAY(')
+        assert 'LIMIT %(batch_size)s' in updates[1]
+        assert 'INSERT INTO triagedata.historicdata' in updates[2]
+        assert 'LIMIT %(batch_size)s' in updates[2]
+        assert all(c[1]['params'] == {'upload_id': 'checksum', 'last_line': 2, 'batch_size': 3}
+                   for c in session.update.call_args_list[1:])
+        queries = [' '.join(c[0][0].split()) for c in session.insert.call_args_list]
+        assert 'INSERT INTO triagedata.historiccoverage' in queries[0]
+        assert 'INSERT INTO triagedata.dailyreferralcounts' in queries[1]
+        assert 'INSERT INTO triagedata.dailyunclassifiedreferralcounts' in queries[2]
+        assert all(c[1]['params'] == {'last_id': 42} for c in session.insert.call_args_list)
+
+    def test_merge_batch_empty(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that nothing is counted once there are no staged rows left to merge.
+        """
+        session = self.mock_session(mocker)
+        session.update.return_value = None
+        session.select.return_value = [(42,)]
+
+        assert HistoricDataUpload(self.connection_data)._merge_batch('checksum', 2) is None
+        session.insert.assert_not_called()
+
+    def test_merge_batch_rolls_back(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that a batch is not committed if the referral counts cannot be updated.
+        """
+        mocker.patch('api.common.database_interaction.Session.update', return_value=7)
+        mocker.patch('api.common.database_interaction.Session.select', return_value=[(42,)])
+        mocker.patch('api.common.database_interaction.Session.insert', side_effect=RuntimeError('Database error'))
+        commit = mocker.patch('api.common.database_interaction.Session.commit')
+        rollback = mocker.patch('api.common.database_interaction.Session.rollback')
+
+        with pytest.raises(RuntimeError):
+            HistoricDataUpload(self.connection_data)._merge_batch('checksum', 0)
+
+        commit.assert_not_called()
+        rollback.assert_called_once()
+
+    def test_complete_lost_rows_error(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that an upload is not marked as merged if some of its valid rows were never merged.
+        """
+        session = self.mock_session(mocker)
+        session.select.side_effect = [[], [], [(5, 1, 2)]]
+
+        with pytest.raises(RuntimeError):
+            HistoricDataUpload(self.connection_data)._complete('checksum')
+
+        session.update.assert_not_called()
+
+    def test_invalid_sizes_error(self):
+        """
+        Test Type: Unit
+        Test Purpose: Test that the chunk and batch sizes must be positive.
+        """
+        with pytest.raises(ValueError):
+            HistoricDataUpload(self.connection_data, chunk_size=0)
+        with pytest.raises(ValueError):
+            HistoricDataUpload(self.connection_data, batch_size=-1)
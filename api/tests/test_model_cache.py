@@ -0,0 +1,136 @@
+"""
+This module handles testing for the ModelCache.
+"""
+
+import os
+import threading
+import time
+import pytest
+from api.common.controller.ModelCache import ModelCache
+
+
+class TestModelCache:
+    """
+    The `TestModelCache` class contains unit tests for the ModelCache.
+    """
+
+    def setup_method(self):
+        """
+        Test setup that occurs before each test is run.
+        """
+
+        self.loaded = []
+
+    def load_model_mock(self, file_path):
+        """
+        Mock model loader that records the files it loads.
+        """
+
+        self.loaded.append(file_path)
+        return {'file_path': file_path, 'load': len(self.loaded)}
+
+    def write_model(self, tmp_path, name, content=b'weights'):
+        """
+        Writes a mock model file and returns its path.
+        """
+
+        file_path = tmp_path / name
+        file_path.write_bytes(content)
+        return str(file_path)
+
+    def test_invalid_size_error(self):
+        """
+        Test Type: Unit
+        Test Purpose: Test that a cache without capacity is rejected.
+        """
+
+        with pytest.raises(ValueError):
+            ModelCache(max_size=0)
+
+    def test_get_loads_once(self, tmp_path):
+        """
+        Test Type: Unit
+        Test Purpose: Test that a model is loaded on a miss and reused on a hit.
+        """
+
+        cache = ModelCache(max_size=2)
+        file_path = self.write_model(tmp_path, 'model.h5')
+
+        first = cache.get(file_path, self.load_model_mock)
+        second = cache.get(file_path, self.load_model_mock)
+
+        assert first is second
+        assert self.loaded == [file_path]
+
+    def test_get_evicts_least_recently_used(self, tmp_path):
+        """
+        Test Type: Unit
+        Test Purpose: Test that the least recently used model is evicted when the cache is full.
+        """
+
+        cache = ModelCache(max_size=2)
+        paths = [self.write_model(tmp_path, f'model_{i}.h5') for i in range(3)]
+
+        cache.get(paths[0], self.load_model_mock)
+        cache.get(paths[1], self.load_model_mock)
+        cache.get(paths[0], self.load_model_mock)
+        cache.get(paths[2], self.load_model_mock)
+        cache.get(paths[0], self.load_model_mock)
+        cache.get(paths[1], self.load_model_mock)
+
+        assert len(cache) == 2
+        assert self.loaded == [paths[0], paths[1], paths[2], paths[1]]
+
+    def test_get_reloads_modified_file(self, tmp_path):
+        """
+        Test Type: Unit
+        Test Purpose: Test that a model file replaced on disk is loaded again and the old version is dropped.
+        """
+
+        cache = ModelCache(max_size=4)
+        file_path = self.write_model(tmp_path, 'model.h5')
+        first = cache.get(file_path, self.load_model_mock)
+
+        self.write_model(tmp_path, 'model.h5', b'new weights')
+        stat = os.stat(file_path)
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        second = cache.get(file_path, self.load_model_mock)
+
+        assert first is not second
+        assert len(cache) == 1
+
+    def test_get_missing_file_error(self, tmp_path):
+        """
+        Test Type: Unit
+        Test Purpose: Test that a missing model file is reported and not cached.
+        """
+
+        cache = ModelCache()
+
+        with pytest.raises(FileNotFoundError):
+            cache.get(str(tmp_path / 'missing.h5'), self.load_model_mock)
+        assert len(cache) == 0
+
+    def test_get_concurrent_requests_load_once(self, tmp_path):
+        """
+        Test Type: Unit
+        Test Purpose: Test that concurrent requests for the same model share a single load.
+        """
+
+        cache = ModelCache()
+        file_path = self.write_model(tmp_path, 'model.h5')
+
+        def slow_load_model(path):
+            time.sleep(0.05)
+            return self.load_model_mock(path)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get(file_path, slow_load_model)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert self.loaded == [file_path]
+        assert all(result is results[0] for result in results)
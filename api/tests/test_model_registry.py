@@ -0,0 +1,99 @@
+"""
+This module handles testing for the ModelRegistry.
+"""
+
+import pytest
+from api.common.ModelRegistry import ModelRegistry
+
+
+class TestModelRegistry:
+    """
+    The `TestModelRegistry` class contains unit tests for the ModelRegistry.
+    """
+
+    def setup_class(self):
+        """
+        Test setup that occurs once before all tests are run.
+        """
+
+        self.active_models_mock = [(1, 3, 1, 'uploads/3/1/a.h5'),
+                                   (1, 3, 2, 'uploads/3/2/b.h5')]
+        self.updated_models_mock = [(2, 3, 1, 'uploads/3/1/c.h5'),
+                                    (2, 3, 2, 'uploads/3/2/b.h5')]
+
+    def test_get_loads_active_models_once(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that the active models are loaded once and then resolved from memory.
+        """
+
+        select = mocker.patch('api.common.database_interaction.DataBase.select',
+                              return_value=self.active_models_mock)
+        registry = ModelRegistry(refresh_interval=60)
+
+        assert registry.get(3, 1) == 'uploads/3/1/a.h5'
+        assert registry.get(3, 2) == 'uploads/3/2/b.h5'
+        assert select.call_count == 1
+
+    def test_get_missing_model_error(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that a missing model is refreshed from the database before an error is raised.
+        """
+
+        select = mocker.patch('api.common.database_interaction.DataBase.select',
+                              return_value=[(1, None, None, None)])
+        registry = ModelRegistry(refresh_interval=60)
+
+        with pytest.raises(RuntimeError):
+            registry.get(3, 1)
+        assert select.call_count == 2
+
+    def test_get_after_invalidate_reloads(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that invalidated models are loaded again on their next use.
+        """
+
+        select = mocker.patch('api.common.database_interaction.DataBase.select',
+                              return_value=self.active_models_mock)
+        registry = ModelRegistry(refresh_interval=60)
+        registry.get(3, 1)
+
+        select.return_value = self.updated_models_mock
+        registry.invalidate(3)
+
+        assert registry.get(3, 1) == 'uploads/3/1/c.h5'
+        assert select.call_count == 2
+
+    def test_get_reloads_on_version_change(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that a model version change made by another process reloads the active models.
+        """
+
+        select = mocker.patch('api.common.database_interaction.DataBase.select',
+                              return_value=self.active_models_mock)
+        registry = ModelRegistry(refresh_interval=0)
+        registry.get(3, 1)
+
+        select.side_effect = [[(2,)], self.updated_models_mock]
+
+        assert registry.get(3, 1) == 'uploads/3/1/c.h5'
+        assert select.call_count == 3
+
+    def test_get_keeps_models_without_version_change(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Test that an unchanged model version keeps the active models in memory.
+        """
+
+        select = mocker.patch('api.common.database_interaction.DataBase.select',
+                              return_value=self.active_models_mock)
+        registry = ModelRegistry(refresh_interval=0)
+        registry.get(3, 1)
+
+        select.return_value = [(1,)]
+
+        assert registry.get(3, 1) == 'uploads/3/1/a.h5'
+        assert select.call_count == 2
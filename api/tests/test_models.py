@@ -285,3 +285,15 @@ class TestModelsUnit:
         mocker.patch('api.common.database_interaction.DataBase.update')
 
         self.models.set_active_model(3, 1)
+
+    def test_set_active_triage_model_invalidates_registry(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that the active model registry is invalidated for the clinic after an update.
+        """
+        mocker.patch('api.common.database_interaction.DataBase.update')
+        invalidate = mocker.patch('api.common.ModelRegistry.ModelRegistry.invalidate')
+
+        self.models.set_active_model(3, 1)
+
+        invalidate.assert_called_once_with(3)
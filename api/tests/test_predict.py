@@ -0,0 +1,97 @@
+"""
+This module handles testing for the simulation options of the Predict class.
+"""
+
+import sys
+from unittest.mock import MagicMock
+import json
+import pytest
+
+# The triage-ml package requires tensorflow, the triage controller is replaced in these tests.
+try:
+    import triage_ml  # noqa: F401
+except ImportError:
+    sys.modules['triage_ml'] = MagicMock()
+
+from api.triage_api import create_app  # noqa: E402
+from api.common.config import VERSION_PREFIX  # noqa: E402
+from api.tests.common import generate_token  # noqa: E402
+
+
+class TestPredictTimeBudgetAPI:
+    """
+    The `TestPredictTimeBudgetAPI` class contains acceptance tests for the simulation options of the predict API.
+    """
+
+    def setup_class(self):
+        """
+        Test setup that occurs once before all tests are run.
+        """
+
+        self.token = generate_token('username', 3)
+        self.endpoint = VERSION_PREFIX + '/predict'
+        self.test_client = create_app().test_client()
+        self.input_mock = {
+            "clinic-id": 3,
+            "intervals": str([{'start': '2020-01-01', 'end': '2020-02-01'}])
+        }
+        self.predictions_mock = {
+            'Urgent': [{'slots': 5, 'start': '2020-01-01', 'end': '2020-02-01'}]
+        }
+
+    def mock_controller(self, mocker, sim_runs):
+        """
+        Replaces the triage controller of the predict API and returns the mocked class.
+        """
+        controller = mocker.patch('api.resources.predict.TriageController')
+        controller.return_value.predict.return_value = self.predictions_mock
+        controller.return_value.sim_runs = sim_runs
+        return controller
+
+    def test_get_time_budget(self, mocker):
+        """
+        Test Type: Acceptance
+        Test Purpose: Tests that the time budget is passed to the controller and the runs used are returned.
+        """
+
+        controller = self.mock_controller(mocker, {'Urgent': [300]})
+        input_mock = dict(self.input_mock, **{'num-sim-runs': 500, 'time-budget': 2.5})
+
+        response = self.test_client.get(self.endpoint, headers={'token': self.token}, query_string=input_mock)
+
+        assert response.status_code == 200
+        assert controller.call_args[0][3] == 500
+        assert controller.call_args[0][4] == 2.5
+        response_data = json.loads(response.data)
+        assert response_data['predictions'] == self.predictions_mock
+        assert response_data['sim_runs'] == {'Urgent': [300]}
+
+    def test_get_default_simulation_options(self, mocker):
+        """
+        Test Type: Acceptance
+        Test Purpose: Tests that predictions run the simulation default number of runs without a time budget.
+        """
+
+        controller = self.mock_controller(mocker, {'Urgent': [1000]})
+
+        response = self.test_client.get(self.endpoint, headers={'token': self.token}, query_string=self.input_mock)
+
+        assert response.status_code == 200
+        assert controller.call_args[0][3] == 1000
+        assert controller.call_args[0][4] is None
+        assert json.loads(response.data)['sim_runs'] == {'Urgent': [1000]}
+
+    @pytest.mark.parametrize('time_budget', ['soon', -1])
+    def test_get_invalid_time_budget(self, mocker, time_budget):
+        """
+        Test Type: Acceptance
+        Test Purpose: Tests that a time budget must be a number of seconds >= 0.
+        """
+
+        controller = self.mock_controller(mocker, {})
+        input_mock = dict(self.input_mock, **{'time-budget': time_budget})
+
+        response = self.test_client.get(self.endpoint, headers={'token': self.token}, query_string=input_mock)
+
+        assert response.status_code == 422
+        controller.assert_not_called()
@@ -0,0 +1,136 @@
+"""
+This module handles unit testing for the TriageController with stub prediction models.
+"""
+
+import sys
+from unittest.mock import MagicMock
+import numpy as np
+from datetime import date, datetime
+
+# The triage-ml package requires tensorflow, predictions are tested with stub models instead.
+try:
+    import triage_ml  # noqa: F401
+except ImportError:
+    sys.modules['triage_ml'] = MagicMock()
+
+from api.common.controller.DateEncoder import encode_date_sequence  # noqa: E402
+from api.common.controller.TriageController import TriageController  # noqa: E402
+
+
+class StubModel:
+    """
+    Prediction model recording its calls, predicting the first padding value of each batch row with a variance of 1.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, inputs, dates):
+        self.calls.append((inputs, dates))
+        padding_data = inputs[0]
+        return [np.stack([padding_data[:, 0, 0], np.ones(len(padding_data))], axis=1) for _ in dates]
+
+
+class TestTriageControllerPredict:
+    """
+    The `TestTriageControllerPredict` class contains tests for predictions with stub models.
+    """
+
+    def setup_class(self):
+        """
+        Test setup that occurs once before all tests are run.
+        """
+
+        self.intervals_mock = [{'start': '2020-01-06', 'end': '2020-01-20'},
+                               {'start': '2020-01-20', 'end': '2020-02-03'}]
+        self.triage_classes_mock = [{'severity': 1, 'name': 'Urgent', 'duration': 2, 'proportion': 0.8}]
+        self.coverage_mock = [(date(2019, 1, 1), date(2019, 12, 31), [2019])]
+
+    def mock_prediction(self, mocker, weekly_counts=None):
+        """
+        Replaces the database, the clinic data and the model of the controller and returns the model.
+        """
+        model = StubModel()
+        clinic_data = mocker.patch('api.common.controller.TriageController.ClinicData').return_value
+        clinic_data.get_clinic_settings.return_value = self.triage_classes_mock
+        clinic_data.get_weekly_referral_counts_by_class.return_value = {
+            1: weekly_counts or [3] * TriageController.PADDING_LENGTH
+        }
+        mocker.patch('api.common.database_interaction.DataBase.select', return_value=self.coverage_mock)
+        mocker.patch('api.common.controller.TriageController.model_registry.get', return_value='a.h5')
+        mocker.patch.object(TriageController.MODEL_CACHE, 'get', return_value=model)
+        return model
+
+    def test_predict_referrals_batches_by_model_file(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that triage classes sharing a model file are predicted in one call, each class getting
+                      back the predictions of its own batch row.
+        """
+
+        models = {'a.h5': StubModel(), 'b.h5': StubModel()}
+        model_files = {1: 'a.h5', 2: 'b.h5', 3: 'a.h5'}
+        mocker.patch.object(TriageController, 'get_model', side_effect=lambda severity: model_files[severity])
+        mocker.patch.object(TriageController.MODEL_CACHE, 'get', side_effect=lambda file_path, load: models[file_path])
+        triage_controller = TriageController(3, self.intervals_mock, 95, 200)
+        triage_classes = [{'severity': severity} for severity in (1, 2, 3)]
+        padding_data = [[severity] * TriageController.PADDING_LENGTH for severity in (1, 2, 3)]
+        dates = encode_date_sequence(datetime(2020, 1, 6), 2)
+
+        class_predictions = triage_controller._TriageController__predict_referrals(triage_classes, padding_data, dates)
+
+        assert len(models['a.h5'].calls) == 1
+        assert len(models['b.h5'].calls) == 1
+        (padding_data_ml, start_dates), predicted_dates = models['a.h5'].calls[0]
+        assert padding_data_ml.shape == (2, TriageController.PADDING_LENGTH, 1)
+        assert padding_data_ml[:, 0, 0].tolist() == [1, 3]
+        assert start_dates.shape == (2, len(dates[0]))
+        assert (start_dates == dates[0]).all()
+        assert predicted_dates is dates
+        assert models['b.h5'].calls[0][0][0].shape == (1, TriageController.PADDING_LENGTH, 1)
+        assert models['b.h5'].calls[0][0][1].shape == (1, len(dates[0]))
+        assert [[p.tolist() for p in predictions] for predictions in class_predictions] == \
+            [[[severity, 1.]] * len(dates) for severity in (1, 2, 3)]
+
+    def test_predict_padding_counts(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that the models are padded with one less than the referrals of each week with referrals,
+                      as the original padding bucketing counted them.
+        """
+
+        weekly_counts = [0, 1, 4] * (TriageController.PADDING_LENGTH // 3)
+        model = self.mock_prediction(mocker, weekly_counts)
+        triage_controller = TriageController(3, self.intervals_mock, 95, 200)
+
+        triage_controller.predict()
+
+        (padding_data_ml, _), _ = model.calls[0]
+        assert padding_data_ml[0, :, 0].tolist() == [0, 0, 3] * (TriageController.PADDING_LENGTH // 3)
+
+    def test_predict_sim_runs(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that every interval runs all simulations without a time budget.
+        """
+
+        self.mock_prediction(mocker)
+        triage_controller = TriageController(3, self.intervals_mock, 95, 200)
+
+        triage_controller.predict()
+
+        assert triage_controller.sim_runs == {'Urgent': [200, 200]}
+
+    def test_predict_time_budget_reduces_sim_runs(self, mocker):
+        """
+        Test Type: Unit
+        Test Purpose: Tests that an exhausted time budget stops every interval after its first batch of simulations.
+        """
+
+        self.mock_prediction(mocker)
+        triage_controller = TriageController(3, self.intervals_mock, 95, 200, time_budget=0)
+
+        triage_controller.predict()
+
+        batch_size = 200 // TriageController.TIME_BUDGET_BATCHES
+        assert triage_controller.sim_runs == {'Urgent': [batch_size, batch_size]}
@@ -74,7 +74,8 @@ class TestUploadPastAppointmentsAPI:
         Test Type: Acceptance
         Test Purpose: Tests Requirement INT-7, DAT-1, DAT-4
         """
-        mocker.patch('api.resources.upload.PastAppointments.upload_csv_data')
+        report = {'upload_id': 'checksum', 'merged_rows': 1}
+        mocker.patch('api.resources.upload.PastAppointments.upload_csv_data', return_value=report)
         upload_file_mock = FileStorage(io.BytesIO(b"file contents"), filename="data.csv", content_type="text/csv")
         input_mock = {
             'clinic_id': 1,
@@ -84,6 +85,7 @@ class TestUploadPastAppointmentsAPI:
         response = self.test_client.put(self.endpoint, headers={'token': self.token}, data=input_mock)
 
         assert response.status_code == 200
+        assert response.get_json()['upload'] == report
 
     def test_upload_requires_header_with_token(self, mocker):
         """
@@ -307,8 +309,7 @@ class TestPastAppointmentsUnit:
         Test Purpose: Tests that an error is thrown if a the database connection fails.
         """
         upload_file_mock = FileStorage(io.BytesIO(b"file contents"), filename="data.csv", content_type="text/csv")
-        mocker.patch('api.common.database_interaction.DataBase.insert_data_from_file',
-                     side_effect=RuntimeError('Database error'))
+        mocker.patch('api.common.database_interaction.DataBase.select', side_effect=RuntimeError('Database error'))
 
         with pytest.raises(RuntimeError):
             self.pastappointments.upload_csv_data(upload_file_mock)
@@ -319,7 +320,10 @@ class TestPastAppointmentsUnit:
         Test Purpose: Tests that an error is thrown if a the file upload fails.
         """
         upload_file_mock = FileStorage(io.BytesIO(b"file contents"), filename="data.csv", content_type="text/csv")
-        mocker.patch('api.common.database_interaction.DataBase.insert_data_from_file',
+        mocker.patch('api.common.database_interaction.DataBase.select', return_value=[])
+        mocker.patch('api.common.database_interaction.DataBase.insert')
+        mocker.patch('api.common.database_interaction.DataBase.update')
+        mocker.patch('api.common.database_interaction.DataBase.insert_csv_from_file',
                      side_effect=RuntimeError('File error'))
 
         with pytest.raises(RuntimeError):
@@ -328,12 +332,14 @@ class TestPastAppointmentsUnit:
     def test_upload_csv_data_successful(self, mocker):
         """
         Test Type: Unit
-        Test Purpose: Tests that a successful file upload.
+        Test Purpose: Tests that a successful file upload returns the report of the upload.
         """
         upload_file_mock = FileStorage(io.BytesIO(b"file contents"), filename="data.csv", content_type="text/csv")
-        mocker.patch('api.common.database_interaction.DataBase.insert_data_from_file')
+        report = {'upload_id': 'checksum', 'merged_rows': 1}
+        load = mocker.patch('api.resources.upload.HistoricDataUpload.load', return_value=report)
 
-        assert self.pastappointments.upload_csv_data(upload_file_mock) is None
+        assert self.pastappointments.upload_csv_data(upload_file_mock) == report
+        load.assert_called_once_with(upload_file_mock)
 
 
 class TestModelUnit:
@@ -36,11 +36,63 @@ CREATE TABLE TriageData.TriageClasses (
             REFERENCES TriageData.Clinic(id)
 );
 CREATE TABLE TriageData.HistoricData (
-    id              SERIAL PRIMARY KEY,
+    id              SERIAL,
     clinic_id       integer,
     severity        integer,
     date_received   DATE,
     date_seen       DATE,
+    wait_days       integer GENERATED ALWAYS AS (date_seen - date_received) STORED,
+    CONSTRAINT fk_clinic
+        FOREIGN KEY(clinic_id)
+            REFERENCES TriageData.Clinic(id)
+) PARTITION BY RANGE (date_received);
+CREATE TABLE TriageData.HistoricData_Default PARTITION OF TriageData.HistoricData DEFAULT;
+CREATE UNLOGGED TABLE TriageData.HistoricDataStaging (
+    upload_id       varchar(64),
+    line            integer,
+    chunk           integer NOT NULL,
+    clinic_id       text,
+    severity        text,
+    date_received   text,
+    date_seen       text,
+    rejection       text,
+    merged          boolean NOT NULL DEFAULT false,
+    CONSTRAINT historic_data_staging_pk PRIMARY KEY (upload_id, line)
+);
+CREATE TABLE TriageData.HistoricDataUploads (
+    id              varchar(64) PRIMARY KEY,
+    staged_rows     integer,
+    rejected_rows   integer,
+    merged_rows     integer NOT NULL DEFAULT 0,
+    created         timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed       timestamp
+);
+CREATE TABLE TriageData.HistoricCoverage (
+    clinic_id           integer,
+    severity            integer,
+    min_date_received   DATE NOT NULL,
+    max_date_received   DATE NOT NULL,
+    years               integer[] NOT NULL,
+    CONSTRAINT fk_clinic
+        FOREIGN KEY(clinic_id)
+            REFERENCES TriageData.Clinic(id)
+);
+CREATE TABLE TriageData.DailyReferralCounts (
+    clinic_id       integer,
+    severity        integer,
+    date_received   DATE,
+    referrals       integer NOT NULL,
+    CONSTRAINT daily_referral_counts_pk PRIMARY KEY (clinic_id, severity, date_received),
+    CONSTRAINT fk_clinic
+        FOREIGN KEY(clinic_id)
+            REFERENCES TriageData.Clinic(id)
+);
+CREATE TABLE TriageData.DailyUnclassifiedReferralCounts (
+    clinic_id       integer,
+    date_received   DATE,
+    wait_weeks      integer,
+    referrals       integer NOT NULL,
+    CONSTRAINT daily_unclassified_referral_counts_pk PRIMARY KEY (clinic_id, date_received, wait_weeks),
     CONSTRAINT fk_clinic
         FOREIGN KEY(clinic_id)
             REFERENCES TriageData.Clinic(id)
@@ -68,6 +120,175 @@ CREATE TABLE TriageData.Schedules (
         FOREIGN KEY(clinic_id)
             REFERENCES TriageData.Clinic(id)
 );
+CREATE TABLE TriageData.ModelVersion (
+    id          boolean PRIMARY KEY DEFAULT true,
+    version     bigint NOT NULL DEFAULT 0,
+    CONSTRAINT single_row
+        CHECK (id)
+);
+INSERT INTO TriageData.ModelVersion DEFAULT VALUES;
+
+-------------------------------------------------------------------------------
+--  Increment the model version on every change to the models so that API
+--  processes caching the active models know to reload them
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION TriageData.increment_model_version() RETURNS trigger
+    LANGUAGE plpgsql
+    SECURITY DEFINER
+    SET search_path = TriageData
+AS $$
+BEGIN
+    UPDATE TriageData.ModelVersion SET version = version + 1;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER model_version_trigger
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON TriageData.Models
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION TriageData.increment_model_version();
+
+-------------------------------------------------------------------------------
+--  Parse a staged upload date, returning NULL if it is not a valid date
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION TriageData.to_date_or_null(value text) RETURNS date
+    LANGUAGE plpgsql
+    STABLE
+AS $$
+BEGIN
+    RETURN value::date;
+EXCEPTION
+    WHEN invalid_datetime_format OR datetime_field_overflow THEN
+        RETURN NULL;
+END;
+$$;
+
+-------------------------------------------------------------------------------
+--  The historic data is partitioned by the date the referrals were received,
+--  by year or by quarter. Referrals outside of every partition, or without a
+--  date received, are kept in the default partition until a partition is
+--  created for them. Usage:
+--      SELECT TriageData.create_historic_data_partition('2021-01-01');
+--      SELECT TriageData.create_historic_data_partition('2021-04-01', 'quarter');
+--      SELECT TriageData.partition_historic_data();    -- partitions the default partition rows
+--  Old periods are archived without a long DELETE by detaching them, after
+--  which the aggregates are rebuilt:
+--      ALTER TABLE TriageData.HistoricData DETACH PARTITION TriageData.historicdata_2015;
+--      SELECT TriageData.rebuild_historic_coverage();
+--      SELECT TriageData.rebuild_referral_counts();
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION TriageData.create_historic_data_partition(partition_date date, granularity text DEFAULT 'year')
+    RETURNS void
+    LANGUAGE plpgsql
+    SECURITY DEFINER
+    SET search_path = TriageData
+AS $$
+DECLARE
+    start_date      date;
+    end_date        date;
+    partition_name  text;
+BEGIN
+    IF granularity NOT IN ('year', 'quarter') THEN
+        RAISE EXCEPTION 'Invalid historic data partition granularity: %', granularity;
+    END IF;
+
+    start_date := date_trunc(granularity, partition_date);
+    end_date := start_date + ('1 ' || granularity)::interval;
+    partition_name := 'historicdata_'
+        || to_char(start_date, CASE granularity WHEN 'year' THEN 'YYYY' ELSE 'YYYY"q"Q' END);
+    IF to_regclass('TriageData.' || partition_name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    EXECUTE format('CREATE TABLE TriageData.%I (LIKE TriageData.HistoricData INCLUDING ALL)', partition_name);
+    -- Rows of the period in the default partition would prevent attaching the new partition
+    EXECUTE format('WITH moved AS (
+                        DELETE FROM TriageData.HistoricData_Default
+                        WHERE date_received >= %L AND date_received < %L
+                        RETURNING id, clinic_id, severity, date_received, date_seen)
+                    INSERT INTO TriageData.%I (id, clinic_id, severity, date_received, date_seen)
+                    SELECT id, clinic_id, severity, date_received, date_seen FROM moved',
+                   start_date, end_date, partition_name);
+    EXECUTE format('ALTER TABLE TriageData.HistoricData ATTACH PARTITION TriageData.%I FOR VALUES FROM (%L) TO (%L)',
+                   partition_name, start_date, end_date);
+END;
+$$;
+
+CREATE FUNCTION TriageData.partition_historic_data(granularity text DEFAULT 'year') RETURNS void
+    LANGUAGE plpgsql
+    SECURITY DEFINER
+    SET search_path = TriageData
+AS $$
+DECLARE
+    partition_date  date;
+BEGIN
+    FOR partition_date IN
+        SELECT DISTINCT date_trunc(granularity, date_received)::date
+        FROM TriageData.HistoricData_Default
+        WHERE date_received IS NOT NULL
+    LOOP
+        PERFORM TriageData.create_historic_data_partition(partition_date, granularity);
+    END LOOP;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION TriageData.create_historic_data_partition(date, text) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION TriageData.partition_historic_data(text) FROM PUBLIC;
+
+CREATE FUNCTION TriageData.rebuild_historic_coverage() RETURNS void
+    LANGUAGE sql
+AS $$
+    -- Wait for uploads in progress, which take the same lock
+    LOCK TABLE TriageData.DailyReferralCounts IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM TriageData.HistoricCoverage;
+
+    INSERT INTO TriageData.HistoricCoverage (clinic_id, severity, min_date_received, max_date_received, years)
+    SELECT clinic_id, severity, MIN(date_received), MAX(date_received),
+           ARRAY_AGG(DISTINCT EXTRACT(YEAR FROM date_received)::integer
+                     ORDER BY EXTRACT(YEAR FROM date_received)::integer)
+    FROM TriageData.HistoricData
+    WHERE date_received IS NOT NULL
+    GROUP BY clinic_id, severity;
+$$;
+
+-------------------------------------------------------------------------------
+--  Rebuild the daily referral counts from the historic data, for backfills
+--  and data loaded without the API. Referrals without a severity are counted
+--  by the whole weeks they waited to be seen, rounded up, so that they can be
+--  matched to the duration of any triage class. Usage:
+--      SELECT TriageData.rebuild_referral_counts();     -- every clinic
+--      SELECT TriageData.rebuild_referral_counts(1);    -- a single clinic
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION TriageData.rebuild_referral_counts(rebuild_clinic_id integer DEFAULT NULL) RETURNS void
+    LANGUAGE sql
+AS $$
+    -- Wait for uploads in progress, which take the same lock
+    LOCK TABLE TriageData.DailyReferralCounts IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM TriageData.DailyReferralCounts
+    WHERE rebuild_clinic_id IS NULL OR clinic_id = rebuild_clinic_id;
+    DELETE FROM TriageData.DailyUnclassifiedReferralCounts
+    WHERE rebuild_clinic_id IS NULL OR clinic_id = rebuild_clinic_id;
+
+    INSERT INTO TriageData.DailyReferralCounts (clinic_id, severity, date_received, referrals)
+    SELECT clinic_id, severity, date_received, COUNT(*)
+    FROM TriageData.HistoricData
+    WHERE (rebuild_clinic_id IS NULL OR clinic_id = rebuild_clinic_id)
+          AND clinic_id IS NOT NULL AND severity IS NOT NULL AND date_received IS NOT NULL
+    GROUP BY clinic_id, severity, date_received;
+
+    INSERT INTO TriageData.DailyUnclassifiedReferralCounts (clinic_id, date_received, wait_weeks, referrals)
+    SELECT clinic_id, date_received, CEIL(wait_days / 7.0)::integer, COUNT(*)
+    FROM TriageData.HistoricData
+    WHERE (rebuild_clinic_id IS NULL OR clinic_id = rebuild_clinic_id)
+          AND clinic_id IS NOT NULL AND severity IS NULL AND date_received IS NOT NULL AND wait_days IS NOT NULL
+    GROUP BY clinic_id, date_received, CEIL(wait_days / 7.0)::integer;
+$$;
 
 -------------------------------------------------------------------------------
 --  Create required indexes on various attributes
@@ -77,6 +298,12 @@ CREATE INDEX username_idx ON TriageData.Users (username);
 CREATE INDEX clinic_schedule_idx ON TriageData.Schedules (clinic_id);
 CREATE INDEX clinic_models_idx ON TriageData.Models (clinic_id);
 CREATE INDEX clinic_triage_classes_idx ON TriageData.TriageClasses (clinic_id);
+CREATE INDEX historic_data_id_idx ON TriageData.HistoricData (id);
+CREATE INDEX clinic_historic_data_idx ON TriageData.HistoricData (clinic_id, severity, date_received);
+CREATE INDEX clinic_unclassified_historic_data_idx ON TriageData.HistoricData (clinic_id, date_received)
+    INCLUDE (wait_days)
+    WHERE severity IS NULL;
+CREATE UNIQUE INDEX clinic_historic_coverage_idx ON TriageData.HistoricCoverage (clinic_id, (COALESCE(severity, -1)));
 
 -------------------------------------------------------------------------------
 --  User Roles to limit API access for various endpoints.
@@ -115,6 +342,10 @@ CREATE USER predict_handler WITH
     NOREPLICATION
     CONNECTION LIMIT -1;
 GRANT SELECT ON TriageData.TriageClasses TO predict_handler;
+GRANT SELECT ON TriageData.HistoricData TO predict_handler;
+GRANT SELECT ON TriageData.HistoricCoverage TO predict_handler;
+GRANT SELECT ON TriageData.DailyReferralCounts TO predict_handler;
+GRANT SELECT ON TriageData.DailyUnclassifiedReferralCounts TO predict_handler;
 
 DROP USER IF EXISTS historic_data_handler;
 CREATE USER historic_data_handler WITH
@@ -125,7 +356,14 @@ CREATE USER historic_data_handler WITH
     INHERIT
     NOREPLICATION
     CONNECTION LIMIT -1;
-GRANT INSERT, DELETE ON TriageData.HistoricData TO historic_data_handler;
+GRANT SELECT, INSERT, DELETE ON TriageData.HistoricData TO historic_data_handler;
+GRANT SELECT, INSERT, UPDATE ON TriageData.HistoricCoverage TO historic_data_handler;
+GRANT SELECT, INSERT, UPDATE ON TriageData.DailyReferralCounts TO historic_data_handler;
+GRANT SELECT, INSERT, UPDATE ON TriageData.DailyUnclassifiedReferralCounts TO historic_data_handler;
+GRANT EXECUTE ON FUNCTION TriageData.partition_historic_data(text) TO historic_data_handler;
+GRANT SELECT, INSERT, UPDATE, DELETE ON TriageData.HistoricDataStaging TO historic_data_handler;
+GRANT SELECT, INSERT, UPDATE ON TriageData.HistoricDataUploads TO historic_data_handler;
+GRANT SELECT ON TriageData.Clinic TO historic_data_handler;
 GRANT USAGE ON ALL SEQUENCES IN SCHEMA TriageData TO historic_data_handler;
 
 DROP USER IF EXISTS auth_handler;
@@ -150,6 +388,8 @@ CREATE USER triage_controller WITH
     CONNECTION LIMIT -1;
 GRANT SELECT ON TriageData.HistoricData TO triage_controller;
 GRANT SELECT ON TriageData.Models TO triage_controller;
+GRANT SELECT ON TriageData.ModelVersion TO triage_controller;
+GRANT SELECT ON TriageData.HistoricCoverage TO triage_controller;
 
 DROP USER IF EXISTS clinic_data;
 CREATE USER clinic_data WITH
@@ -161,6 +401,8 @@ CREATE USER clinic_data WITH
     NOREPLICATION
     CONNECTION LIMIT -1;
 GRANT SELECT ON TriageData.HistoricData TO clinic_data;
+GRANT SELECT ON TriageData.DailyReferralCounts TO clinic_data;
+GRANT SELECT ON TriageData.DailyUnclassifiedReferralCounts TO clinic_data;
 GRANT SELECT, INSERT, UPDATE ON TriageData.TriageClasses TO clinic_data;
 
 CREATE GROUP api_handlers;
@@ -8512,4 +8754,27 @@ INSERT INTO triagedata.historicdata (clinic_id, severity, date_received, date_se
 INSERT INTO triagedata.historicdata (clinic_id, severity, date_received, date_seen) VALUES (1,0,'2018-12-23','2018-12-23');
 INSERT INTO triagedata.historicdata (clinic_id, severity, date_received, date_seen) VALUES (1,0,'2018-12-23','2018-12-23');
 INSERT INTO triagedata.historicdata (clinic_id, severity, date_received, date_seen) VALUES (1,0,'2018-12-24','2018-12-24');
-INSERT INTO triagedata.historicdata (clinic_id, severity, date_received, date_seen) VALUES (1,0,'2018-12-24','2018-12-24');
\ No newline at end of file
+INSERT INTO triagedata.historicdata (clinic_id, severity, date_received, date_seen) VALUES (1,0,'2018-12-24','2018-12-24');
+
+--
+-- Partitions for Name: historicdata; Type: TABLE DATA; Schema: triagedata; Owner: admin
+--
+
+SELECT triagedata.partition_historic_data();
+
+--
+-- Data for Name: historiccoverage; Type: TABLE DATA; Schema: triagedata; Owner: admin
+--
+
+INSERT INTO triagedata.historiccoverage (clinic_id, severity, min_date_received, max_date_received, years)
+SELECT clinic_id, severity, MIN(date_received), MAX(date_received),
+       ARRAY_AGG(DISTINCT EXTRACT(YEAR FROM date_received)::integer ORDER BY EXTRACT(YEAR FROM date_received)::integer)
+FROM triagedata.historicdata
+WHERE date_received IS NOT NULL
+GROUP BY clinic_id, severity;
+
+--
+-- Data for Name: dailyreferralcounts, dailyunclassifiedreferralcounts; Type: TABLE DATA; Schema: triagedata; Owner: admin
+--
+
+SELECT triagedata.rebuild_referral_counts();
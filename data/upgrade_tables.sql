@@ -0,0 +1,368 @@
+-------------------------------------------------------------------------------
+--  Upgrades a database built by an earlier build_tables.sql, with a single
+--  unpartitioned historic data table, to the layout of build_tables.sql. It
+--  creates the model version, upload staging, coverage and referral count
+--  tables with their functions, triggers and grants, copies the historic data
+--  into yearly partitions and backfills the coverage and the referral counts.
+--  Everything runs in a single transaction, during which the historic data
+--  cannot be read or written. Run once as the owner of the TriageData schema:
+--      psql -U admin -d triage -f data/upgrade_tables.sql
+-------------------------------------------------------------------------------
+
+BEGIN;
+
+LOCK TABLE TriageData.HistoricData IN ACCESS EXCLUSIVE MODE;
+ALTER TABLE TriageData.HistoricData RENAME TO HistoricData_Unpartitioned;
+
+-------------------------------------------------------------------------------
+--  Create the partitioned table, keeping the row ids and their sequence
+-------------------------------------------------------------------------------
+
+CREATE TABLE TriageData.HistoricData (
+    id              integer NOT NULL DEFAULT nextval('TriageData.historicdata_id_seq'),
+    clinic_id       integer,
+    severity        integer,
+    date_received   DATE,
+    date_seen       DATE,
+    wait_days       integer GENERATED ALWAYS AS (date_seen - date_received) STORED,
+    CONSTRAINT fk_clinic
+        FOREIGN KEY(clinic_id)
+            REFERENCES TriageData.Clinic(id),
+    CONSTRAINT reasonable_date
+        CHECK (date_received <= date_seen)
+) PARTITION BY RANGE (date_received);
+CREATE TABLE TriageData.HistoricData_Default PARTITION OF TriageData.HistoricData DEFAULT;
+ALTER SEQUENCE TriageData.historicdata_id_seq OWNED BY TriageData.HistoricData.id;
+
+-------------------------------------------------------------------------------
+--  Create the tables added since, see build_tables.sql
+-------------------------------------------------------------------------------
+
+CREATE UNLOGGED TABLE TriageData.HistoricDataStaging (
+    upload_id       varchar(64),
+    line            integer,
+    chunk           integer NOT NULL,
+    clinic_id       text,
+    severity        text,
+    date_received   text,
+    date_seen       text,
+    rejection       text,
+    merged          boolean NOT NULL DEFAULT false,
+    CONSTRAINT historic_data_staging_pk PRIMARY KEY (upload_id, line)
+);
+CREATE TABLE TriageData.HistoricDataUploads (
+    id              varchar(64) PRIMARY KEY,
+    staged_rows     integer,
+    rejected_rows   integer,
+    merged_rows     integer NOT NULL DEFAULT 0,
+    created         timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed       timestamp
+);
+CREATE TABLE TriageData.HistoricCoverage (
+    clinic_id           integer,
+    severity            integer,
+    min_date_received   DATE NOT NULL,
+    max_date_received   DATE NOT NULL,
+    years               integer[] NOT NULL,
+    CONSTRAINT fk_clinic
+        FOREIGN KEY(clinic_id)
+            REFERENCES TriageData.Clinic(id)
+);
+CREATE TABLE TriageData.DailyReferralCounts (
+    clinic_id       integer,
+    severity        integer,
+    date_received   DATE,
+    referrals       integer NOT NULL,
+    CONSTRAINT daily_referral_counts_pk PRIMARY KEY (clinic_id, severity, date_received),
+    CONSTRAINT fk_clinic
+        FOREIGN KEY(clinic_id)
+            REFERENCES TriageData.Clinic(id)
+);
+CREATE TABLE TriageData.DailyUnclassifiedReferralCounts (
+    clinic_id       integer,
+    date_received   DATE,
+    wait_weeks      integer,
+    referrals       integer NOT NULL,
+    CONSTRAINT daily_unclassified_referral_counts_pk PRIMARY KEY (clinic_id, date_received, wait_weeks),
+    CONSTRAINT fk_clinic
+        FOREIGN KEY(clinic_id)
+            REFERENCES TriageData.Clinic(id)
+);
+CREATE TABLE TriageData.ModelVersion (
+    id          boolean PRIMARY KEY DEFAULT true,
+    version     bigint NOT NULL DEFAULT 0,
+    CONSTRAINT single_row
+        CHECK (id)
+);
+INSERT INTO TriageData.ModelVersion DEFAULT VALUES;
+
+-------------------------------------------------------------------------------
+--  Increment the model version on every change to the models so that API
+--  processes caching the active models know to reload them
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION TriageData.increment_model_version() RETURNS trigger
+    LANGUAGE plpgsql
+    SECURITY DEFINER
+    SET search_path = TriageData
+AS $$
+BEGIN
+    UPDATE TriageData.ModelVersion SET version = version + 1;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER model_version_trigger
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON TriageData.Models
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION TriageData.increment_model_version();
+
+-------------------------------------------------------------------------------
+--  Parse a staged upload date, returning NULL if it is not a valid date
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION TriageData.to_date_or_null(value text) RETURNS date
+    LANGUAGE plpgsql
+    STABLE
+AS $$
+BEGIN
+    RETURN value::date;
+EXCEPTION
+    WHEN invalid_datetime_format OR datetime_field_overflow THEN
+        RETURN NULL;
+END;
+$$;
+
+-------------------------------------------------------------------------------
+--  Historic data partitions, see build_tables.sql for their usage
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION TriageData.create_historic_data_partition(partition_date date, granularity text DEFAULT 'year')
+    RETURNS void
+    LANGUAGE plpgsql
+    SECURITY DEFINER
+    SET search_path = TriageData
+AS $$
+DECLARE
+    start_date      date;
+    end_date        date;
+    partition_name  text;
+BEGIN
+    IF granularity NOT IN ('year', 'quarter') THEN
+        RAISE EXCEPTION 'Invalid historic data partition granularity: %', granularity;
+    END IF;
+
+    start_date := date_trunc(granularity, partition_date);
+    end_date := start_date + ('1 ' || granularity)::interval;
+    partition_name := 'historicdata_'
+        || to_char(start_date, CASE granularity WHEN 'year' THEN 'YYYY' ELSE 'YYYY"q"Q' END);
+    IF to_regclass('TriageData.' || partition_name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    EXECUTE format('CREATE TABLE TriageData.%I (LIKE TriageData.HistoricData INCLUDING ALL)', partition_name);
+    -- Rows of the period in the default partition would prevent attaching the new partition
+    EXECUTE format('WITH moved AS (
+                        DELETE FROM TriageData.HistoricData_Default
+                        WHERE date_received >= %L AND date_received < %L
+                        RETURNING id, clinic_id, severity, date_received, date_seen)
+                    INSERT INTO TriageData.%I (id, clinic_id, severity, date_received, date_seen)
+                    SELECT id, clinic_id, severity, date_received, date_seen FROM moved',
+                   start_date, end_date, partition_name);
+    EXECUTE format('ALTER TABLE TriageData.HistoricData ATTACH PARTITION TriageData.%I FOR VALUES FROM (%L) TO (%L)',
+                   partition_name, start_date, end_date);
+END;
+$$;
+
+CREATE FUNCTION TriageData.partition_historic_data(granularity text DEFAULT 'year') RETURNS void
+    LANGUAGE plpgsql
+    SECURITY DEFINER
+    SET search_path = TriageData
+AS $$
+DECLARE
+    partition_date  date;
+BEGIN
+    FOR partition_date IN
+        SELECT DISTINCT date_trunc(granularity, date_received)::date
+        FROM TriageData.HistoricData_Default
+        WHERE date_received IS NOT NULL
+    LOOP
+        PERFORM TriageData.create_historic_data_partition(partition_date, granularity);
+    END LOOP;
+END;
+$$;
+
+CREATE FUNCTION TriageData.historic_data_partition_bounds() RETURNS TABLE (start_date date, end_date date)
+    LANGUAGE sql
+    STABLE
+AS $$
+    SELECT CASE bounds[1] WHEN 'MINVALUE' THEN '-infinity' ELSE btrim(bounds[1], '''') END::date,
+           CASE bounds[2] WHEN 'MAXVALUE' THEN 'infinity' ELSE btrim(bounds[2], '''') END::date
+    FROM pg_catalog.pg_inherits
+    JOIN pg_catalog.pg_class ON pg_class.oid = pg_inherits.inhrelid
+    CROSS JOIN LATERAL regexp_match(pg_catalog.pg_get_expr(pg_class.relpartbound, pg_class.oid),
+                                    '^FOR VALUES FROM \((.*)\) TO \((.*)\)$') AS bounds
+    WHERE pg_inherits.inhparent = 'TriageData.HistoricData'::regclass AND bounds IS NOT NULL;
+$$;
+
+CREATE FUNCTION TriageData.historic_data_partition_granularity() RETURNS text
+    LANGUAGE sql
+    STABLE
+AS $$
+    -- The granularity of the latest partition, or yearly partitions if there are none yet
+    SELECT COALESCE((SELECT CASE WHEN end_date > start_date + interval '3 months' THEN 'year' ELSE 'quarter' END
+                     FROM TriageData.historic_data_partition_bounds()
+                     WHERE start_date > '-infinity' AND end_date < 'infinity'
+                     ORDER BY start_date DESC
+                     LIMIT 1),
+                    'year');
+$$;
+
+CREATE FUNCTION TriageData.partition_historic_dates(dates date[]) RETURNS void
+    LANGUAGE plpgsql
+    SECURITY DEFINER
+    SET search_path = TriageData
+AS $$
+DECLARE
+    granularity_in_use      text := TriageData.historic_data_partition_granularity();
+    partition_date          date;
+    partition_granularity   text;
+BEGIN
+    FOR partition_date, partition_granularity IN
+        WITH bounds AS (
+            SELECT start_date, end_date FROM TriageData.historic_data_partition_bounds()
+        )
+        SELECT DISTINCT periods.start_date, periods.granularity
+        FROM UNNEST(dates) AS dates (date_received)
+        -- A period of the granularity in use, or a quarter where that period would overlap an existing partition
+        CROSS JOIN LATERAL (
+            SELECT date_trunc(candidates.granularity, dates.date_received)::date AS start_date, candidates.granularity
+            FROM (VALUES (1, granularity_in_use), (2, 'quarter')) AS candidates (preference, granularity)
+            WHERE NOT EXISTS (SELECT 1 FROM bounds
+                              WHERE bounds.start_date < date_trunc(candidates.granularity, dates.date_received)
+                                                        + ('1 ' || candidates.granularity)::interval
+                                    AND bounds.end_date > date_trunc(candidates.granularity, dates.date_received))
+            ORDER BY candidates.preference
+            LIMIT 1) AS periods
+        WHERE dates.date_received IS NOT NULL
+    LOOP
+        PERFORM TriageData.create_historic_data_partition(partition_date, partition_granularity);
+    END LOOP;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION TriageData.create_historic_data_partition(date, text) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION TriageData.partition_historic_data(text) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION TriageData.partition_historic_dates(date[]) FROM PUBLIC;
+
+-------------------------------------------------------------------------------
+--  Rebuild the coverage and the referral counts from the historic data, see
+--  build_tables.sql for their usage
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION TriageData.rebuild_historic_coverage() RETURNS void
+    LANGUAGE sql
+AS $$
+    -- Wait for uploads in progress, which take the same lock
+    LOCK TABLE TriageData.DailyReferralCounts IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM TriageData.HistoricCoverage;
+
+    INSERT INTO TriageData.HistoricCoverage (clinic_id, severity, min_date_received, max_date_received, years)
+    SELECT clinic_id, severity, MIN(date_received), MAX(date_received),
+           ARRAY_AGG(DISTINCT EXTRACT(YEAR FROM date_received)::integer
+                     ORDER BY EXTRACT(YEAR FROM date_received)::integer)
+    FROM TriageData.HistoricData
+    WHERE date_received IS NOT NULL
+    GROUP BY clinic_id, severity;
+$$;
+
+CREATE FUNCTION TriageData.rebuild_referral_counts(rebuild_clinic_id integer DEFAULT NULL) RETURNS void
+    LANGUAGE sql
+AS $$
+    -- Wait for uploads in progress, which take the same lock
+    LOCK TABLE TriageData.DailyReferralCounts IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM TriageData.DailyReferralCounts
+    WHERE rebuild_clinic_id IS NULL OR clinic_id = rebuild_clinic_id;
+    DELETE FROM TriageData.DailyUnclassifiedReferralCounts
+    WHERE rebuild_clinic_id IS NULL OR clinic_id = rebuild_clinic_id;
+
+    INSERT INTO TriageData.DailyReferralCounts (clinic_id, severity, date_received, referrals)
+    SELECT clinic_id, severity, date_received, COUNT(*)
+    FROM TriageData.HistoricData
+    WHERE (rebuild_clinic_id IS NULL OR clinic_id = rebuild_clinic_id)
+          AND clinic_id IS NOT NULL AND severity IS NOT NULL AND date_received IS NOT NULL
+    GROUP BY clinic_id, severity, date_received;
+
+    INSERT INTO TriageData.DailyUnclassifiedReferralCounts (clinic_id, date_received, wait_weeks, referrals)
+    SELECT clinic_id, date_received, CEIL(wait_days / 7.0)::integer, COUNT(*)
+    FROM TriageData.HistoricData
+    WHERE (rebuild_clinic_id IS NULL OR clinic_id = rebuild_clinic_id)
+          AND clinic_id IS NOT NULL AND severity IS NULL AND date_received IS NOT NULL AND wait_days IS NOT NULL
+    GROUP BY clinic_id, date_received, CEIL(wait_days / 7.0)::integer;
+$$;
+
+-------------------------------------------------------------------------------
+--  Copy the historic data, creating its partitions first so that every row
+--  is routed to its partition directly
+-------------------------------------------------------------------------------
+
+SELECT TriageData.create_historic_data_partition(years.year_start)
+FROM (SELECT DISTINCT date_trunc('year', date_received)::date AS year_start
+      FROM TriageData.HistoricData_Unpartitioned
+      WHERE date_received IS NOT NULL) AS years;
+
+INSERT INTO TriageData.HistoricData (id, clinic_id, severity, date_received, date_seen)
+SELECT id, clinic_id, severity, date_received, date_seen
+FROM TriageData.HistoricData_Unpartitioned;
+
+DROP TABLE TriageData.HistoricData_Unpartitioned;
+
+-------------------------------------------------------------------------------
+--  Indexes, the historic data ones created on every partition
+-------------------------------------------------------------------------------
+
+CREATE INDEX historic_data_id_idx ON TriageData.HistoricData (id);
+CREATE INDEX clinic_historic_data_idx ON TriageData.HistoricData (clinic_id, severity, date_received);
+CREATE INDEX clinic_unclassified_historic_data_idx ON TriageData.HistoricData (clinic_id, date_received)
+    INCLUDE (wait_days)
+    WHERE severity IS NULL;
+CREATE UNIQUE INDEX clinic_historic_coverage_idx ON TriageData.HistoricCoverage (clinic_id, (COALESCE(severity, -1)));
+
+-------------------------------------------------------------------------------
+--  Backfill the coverage and the referral counts of the copied historic data
+-------------------------------------------------------------------------------
+
+SELECT TriageData.rebuild_historic_coverage();
+SELECT TriageData.rebuild_referral_counts();
+
+-------------------------------------------------------------------------------
+--  Role grants on the new tables and functions, the ones on the partitioned
+--  historic data also cover its partitions
+-------------------------------------------------------------------------------
+
+GRANT SELECT ON TriageData.HistoricData TO predict_handler;
+GRANT SELECT ON TriageData.HistoricCoverage TO predict_handler;
+GRANT SELECT ON TriageData.DailyReferralCounts TO predict_handler;
+GRANT SELECT ON TriageData.DailyUnclassifiedReferralCounts TO predict_handler;
+
+GRANT SELECT, INSERT, DELETE ON TriageData.HistoricData TO historic_data_handler;
+GRANT SELECT, INSERT, UPDATE ON TriageData.HistoricCoverage TO historic_data_handler;
+GRANT SELECT, INSERT, UPDATE ON TriageData.DailyReferralCounts TO historic_data_handler;
+GRANT SELECT, INSERT, UPDATE ON TriageData.DailyUnclassifiedReferralCounts TO historic_data_handler;
+GRANT EXECUTE ON FUNCTION TriageData.partition_historic_dates(date[]) TO historic_data_handler;
+GRANT SELECT, INSERT, UPDATE, DELETE ON TriageData.HistoricDataStaging TO historic_data_handler;
+GRANT SELECT, INSERT, UPDATE ON TriageData.HistoricDataUploads TO historic_data_handler;
+GRANT SELECT ON TriageData.Clinic TO historic_data_handler;
+GRANT USAGE ON ALL SEQUENCES IN SCHEMA TriageData TO historic_data_handler;
+
+GRANT SELECT ON TriageData.HistoricData TO triage_controller;
+GRANT SELECT ON TriageData.ModelVersion TO triage_controller;
+GRANT SELECT ON TriageData.HistoricCoverage TO triage_controller;
+
+GRANT SELECT ON TriageData.HistoricData TO clinic_data;
+GRANT SELECT ON TriageData.DailyReferralCounts TO clinic_data;
+GRANT SELECT ON TriageData.DailyUnclassifiedReferralCounts TO clinic_data;
+
+COMMIT;
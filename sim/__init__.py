@@ -1,2 +1,2 @@
 # Import here what should be exported by the sim module
-from .resources import (gen_min_interval_slots, simulate_allocations)
+from .resources import (gen_min_interval_slots, simulate_allocations, simulate_allocations_batch)
@@ -1,4 +1,5 @@
 # Import here what should be exported by the sim module
 from .minintervalschedule import gen_min_interval_slots
-from .simulateallocations import simulate_allocations
+from .simulateallocations import simulate_allocations, simulate_allocations_batch
 from .success_ratio import success_ratio, success_ratio_already_overdue
+from .uniform_success_ratio import uniform_success_ratios
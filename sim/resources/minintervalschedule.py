@@ -1,10 +1,17 @@
 from collections import deque
-from .types import AllocationResult
-from .simulateallocations import simulate_allocations
+from contextlib import nullcontext
+from concurrent.futures import Executor, ProcessPoolExecutor
+from .types import AllocationResult, Queue, queue_arrays
+from .simulateallocations import simulate_allocations_batch
+from .uniform_success_ratio import uniform_success_ratios
 import numpy as np
-from typing import List, Tuple, Union
+from typing import Callable, ContextManager, List, Tuple, Union
 import math
-from .success_ratio import success_ratio, success_ratio_already_overdue
+import os
+import time
+
+# the standard normal quantile of a two sided 95% confidence interval
+_Z_95 = 1.96
 
 # Dataframe Interface with mock returns
 # when invoking, pass your own dataframe and how you want to generate samples
@@ -31,16 +38,21 @@ class SimulationResults:
         The expected number of minimum slots needed calculated from the simulation
     interval_range : Tuple[int, int]
         The relative date range of that the expected slot corresponds to
+    num_sim_runs : int
+        The number of simulation runs the expected slots were calculated from
 
     """
-    def __init__(self, expected_slots: float, interval_range: Tuple[int, int]):
+    def __init__(self, expected_slots: float, interval_range: Tuple[int, int], num_sim_runs: int = None):
         self.expected_slots = expected_slots
         self.interval_range = interval_range
+        self.num_sim_runs = num_sim_runs
 
 
 def gen_min_interval_slots(data_frame: DataFrame, window: float, min_ratio: float, final_window: float,
                            confidence: float, start: int, end: int, num_sim_runs: int = 1000,
-                           queue: deque = None) -> Union[None, List[SimulationResults]]:
+                           queue: Queue = None, executor: Executor = None, max_workers: int = None,
+                           seed: int = None, reuse_samples: bool = False, tolerance: float = None,
+                           batch_size: int = 100, time_budget: float = None) -> Union[None, List[SimulationResults]]:
     """
     Get the optimal patient schedule.
     Throws an error if num sim runs is <= 0
@@ -55,12 +67,54 @@ def gen_min_interval_slots(data_frame: DataFrame, window: float, min_ratio: floa
     :param confidence: The level of statistical confidence to calculate the margin of error results on
     :param start: The index of the first interval
     :param end: The index of the end of the last relevant interval
-    :param num_sim_runs: The number of times to run the simulation > 0
+    :param num_sim_runs: The number of times to run the simulation > 0, or the most times to run it with a tolerance
     :param queue: The number of priority elements to process (must be processed before newer arrivals)
+    :param executor: A process pool to split the simulation runs of each interval across. The data frame must be
+           picklable
+    :param max_workers: The number of chunks to split the simulation runs of each interval in. If no executor is
+           given and this is greater than 1, a process pool with this many workers is used for the call
+    :param seed: The seed of the random streams of the samples. Workers get independent streams, and data frames
+           without a `get_interval_samples` method sample from the global numpy stream outside of workers
+    :param reuse_samples: Whether the remainder queues are simulated on the same sampled arrivals as the ones used to
+           find the allocation. If False, new arrivals are sampled for the remainder queues
+    :param tolerance: If given, the simulation of each interval is run in batches and stops once the confidence
+           interval of the allocation percentile is at most this many slots wide
+    :param batch_size: The number of simulation runs per batch when there is a tolerance or a time budget
+    :param time_budget: If given, the wall clock seconds the simulation may take. The intervals share the budget
+           and each one runs batches of simulations while its share lasts, at least one batch and at most
+           num_sim_runs runs
     :return: the results of the simulation, or None if schedule is infeasible
     """
 
-    # parameter checking
+    _check_parameters(window=window, min_ratio=min_ratio, final_window=final_window, confidence=confidence,
+                      start=start, num_sim_runs=num_sim_runs, max_workers=max_workers, tolerance=tolerance,
+                      batch_size=batch_size, time_budget=time_budget)
+
+    # setup default values
+    if queue is None:
+        queue = deque()
+
+    # simulate each interval
+    with _interval_executor(executor, max_workers) as executor:
+        expected_slots = _simulate_intervals(queue=queue, data_frame=data_frame, window=window, min_ratio=min_ratio,
+                                             final_window=final_window, confidence=confidence,
+                                             num_sim_runs=num_sim_runs, executor=executor,
+                                             num_chunks=max_workers or os.cpu_count() or 1, seed=seed,
+                                             reuse_samples=reuse_samples, tolerance=tolerance,
+                                             batch_size=batch_size, time_budget=time_budget)
+    # only occurs when the very first start queue contains arrivals past the final deadline
+    if expected_slots is None:
+        return None
+    relevant_expected_slots = expected_slots[start:end + 1]
+    return relevant_expected_slots
+
+
+def _check_parameters(window: float, min_ratio: float, final_window: float, confidence: float, start: int,
+                      num_sim_runs: int, max_workers: Union[int, None], tolerance: Union[float, None],
+                      batch_size: int, time_budget: Union[float, None]):
+    """
+    Check the parameters of `gen_min_interval_slots`, raising a ValueError for the first invalid one
+    """
     if num_sim_runs <= 0:
         raise ValueError('Invalid simulation run value specified')
     elif final_window < window or min_ratio == 1.:
@@ -71,30 +125,71 @@ def gen_min_interval_slots(data_frame: DataFrame, window: float, min_ratio: floa
         raise ValueError('confidence must be a number beween 0 inclusive and 100 exclusive')
     elif start < 0:
         raise ValueError('invalid value for the starting index of the first interval. Must be an integer >= 0')
+    elif max_workers is not None and max_workers <= 0:
+        raise ValueError('max_workers must be an integer > 0')
+    elif tolerance is not None and tolerance < 0:
+        raise ValueError('tolerance must be a number of slots >= 0')
+    elif batch_size <= 0:
+        raise ValueError('batch_size must be an integer > 0')
+    elif time_budget is not None and time_budget < 0:
+        raise ValueError('time_budget must be a number of seconds >= 0')
 
-    # setup default values
-    if queue == None:
-        queue = deque()
 
-    # simulate each interval
+def _interval_executor(executor: Union[Executor, None], max_workers: Union[int, None]) -> ContextManager:
+    """
+    Get the executor to split the simulation runs of each interval across
+
+    :param executor: the process pool given by the caller, which is used as is and left open
+    :param max_workers: the number of chunks to split the simulation runs in
+    :return: a context manager of the given executor, or of a process pool with max_workers workers that is shut down
+             on exit if no executor was given and max_workers is greater than 1, or of None to run in this process
+    """
+    if executor is None and max_workers is not None and max_workers > 1:
+        return ProcessPoolExecutor(max_workers=max_workers)
+    return nullcontext(executor)
+
+
+def _simulate_intervals(queue: Queue, data_frame: DataFrame, window: float, min_ratio: float, final_window: float,
+                        confidence: float, num_sim_runs: int, executor: Union[Executor, None], num_chunks: int,
+                        seed: Union[int, None], reuse_samples: bool, tolerance: Union[float, None],
+                        batch_size: int, time_budget: Union[float, None]) -> Union[None, List[SimulationResults]]:
+    """
+    Simulate every interval in turn, each one starting from the remainder queue of the previous one.
+    With a time budget, each remaining interval gets an equal share of the remaining time.
+
+    :return: the results of every interval, or None if the schedule of an interval is infeasible
+    """
+    if time_budget is not None:
+        deadline = time.monotonic() + time_budget
     expected_slots: List[SimulationResults] = []
+    interval_seeds = np.random.SeedSequence(seed).spawn(len(data_frame.intervals))
     for interval in range(len(data_frame.intervals)):
+        interval_deadline = None
+        if time_budget is not None:
+            now = time.monotonic()
+            interval_deadline = now + max(deadline - now, 0) / (len(data_frame.intervals) - interval)
         interval_schedule = _opt_interval_schedule(queue=queue, data_frame=data_frame, interval=interval,
                                                    min_ratio=min_ratio, window=window, final_window=final_window,
-                                                   num_sim_runs=num_sim_runs, confidence=confidence)
-        # only occurs when the very first start queue contains arrivals past the final deadline
+                                                   num_sim_runs=num_sim_runs, confidence=confidence,
+                                                   executor=executor, num_chunks=num_chunks,
+                                                   seed_sequence=interval_seeds[interval],
+                                                   reuse_samples=reuse_samples, tolerance=tolerance,
+                                                   batch_size=batch_size, deadline=interval_deadline)
         if not interval_schedule:
             return None
-        sim_result = SimulationResults(interval_schedule.allocation, data_frame.intervals[interval])
+        sim_result = SimulationResults(interval_schedule.allocation, data_frame.intervals[interval],
+                                       interval_schedule.num_sim_runs)
         expected_slots.append(sim_result)
         queue = interval_schedule.remainder_queue
-    relevant_expected_slots = expected_slots[start:end + 1]
-    return relevant_expected_slots
+    return expected_slots
 
 
-def _opt_interval_schedule(queue: deque, data_frame: DataFrame, interval: int, min_ratio: float,
-                           window: float, final_window: float, num_sim_runs: int, confidence: float)\
-        -> Union[AllocationResult, None]:
+def _opt_interval_schedule(queue: Queue, data_frame: DataFrame, interval: int, min_ratio: float,
+                           window: float, final_window: float, num_sim_runs: int, confidence: float,
+                           executor: Executor = None, num_chunks: int = 1,
+                           seed_sequence: np.random.SeedSequence = None,
+                           reuse_samples: bool = False, tolerance: float = None, batch_size: int = 100,
+                           deadline: float = None) -> Union[AllocationResult, None]:
     """
     Get the optimal schedule for a specific interval
 
@@ -106,45 +201,228 @@ def _opt_interval_schedule(queue: deque, data_frame: DataFrame, interval: int, m
     :param window: the time in which an arrival must be processed by, and if not is considered overdue.
     :param final_window: the time in which 100% of arrival must be processed by. Must correspond to the same time unit
            as the rate of arrivals time
-    :param num_sim_runs: the number of times in which to run the simulation
+    :param num_sim_runs: the number of times in which to run the simulation, or the most times with a tolerance
     :param confidence: the level of confidence in which the stochastic optimum is calculated in
+    :param executor: the process pool to split the simulation runs across, or None to run them in this process
+    :param num_chunks: the number of chunks to split the simulation runs in when there is an executor
+    :param seed_sequence: the seed of the random streams of the samples
+    :param reuse_samples: whether the remainder queues are simulated on the same sampled arrivals as the allocations
+    :param tolerance: the width in slots of the confidence interval of the allocation percentile at which to stop
+           running batches of simulations, or None to run all the simulations at once
+    :param batch_size: the number of simulation runs per batch when there is a tolerance or a deadline
+    :param deadline: the `time.monotonic` time after which no more batches of simulations are started, or None to
+           run all the simulations
     :return: the optimal allocation for the interval
     """
-    allocations: List[int] = []
+    if seed_sequence is None:
+        seed_sequence = np.random.SeedSequence()
+    allocation_seeds, remainder_seeds = seed_sequence.spawn(2)
+    num_chunks = num_chunks if executor is not None else 1
     offset = data_frame.intervals[interval][0]
-    for _ in range(num_sim_runs):
-        stochastic_arrivals = data_frame.get_interval_sample(interval)
-        hi = _hi(queue, stochastic_arrivals)
-        allocation = _min_uniform_allocation(arrivals=stochastic_arrivals, queue=queue, offset=offset,
-                                             min_ratio=min_ratio, window=window, final_window=final_window,
-                                             lo=0, hi=hi)
-        # if no schedule was found
-        # only occurs when the starting queue contains arrivals past the final deadline
-        if allocation is None:
-            return None
-        allocations.append(allocation)
+    # common random numbers: the allocation and its remainder queues are evaluated on the same arrivals
+    # without an executor the samples are kept, with one each chunk regenerates them from the same seed
+    batched_runs = _batched_allocations(queue=queue, data_frame=data_frame, interval=interval, offset=offset,
+                                        min_ratio=min_ratio, window=window, final_window=final_window,
+                                        num_sim_runs=num_sim_runs, confidence=confidence, executor=executor,
+                                        num_chunks=num_chunks,
+                                        seed_sequence=allocation_seeds, tolerance=tolerance, batch_size=batch_size,
+                                        deadline=deadline)
+    # if no schedule was found
+    # only occurs when the starting queue contains arrivals past the final deadline
+    if batched_runs is None:
+        return None
+    allocations, samples, batches = batched_runs
     # calculate the resulting queue for N*
     opt = math.ceil(np.percentile(allocations, confidence))
 
     # get the remainder queue for the next interval by getting the confidence percentile of remainder queues
-    remainder_queues: deque = []
-    for _ in range(num_sim_runs):
-        stochastic_arrivals = data_frame.get_interval_sample(interval)
-        schedule_with_padding = _gen_uniform_suggested_schedule(arrivals=stochastic_arrivals, allocation_amount=opt, window=window)
-        interval_size_schedule = schedule_with_padding[:data_frame.get_interval_size(interval)]
-        schedule_sim_result = simulate_allocations(arrivals=stochastic_arrivals, slot_schedule=interval_size_schedule,
-                                                   current_queue=queue, offset=offset)
-        remainder_queues.append(schedule_sim_result.remainder_queue)
+    if not reuse_samples:
+        samples = []
+        batches = [(len(allocations), remainder_seeds.spawn(num_chunks))]
+    if samples:
+        remainder_queues = _remainder_queues(np.concatenate(samples), queue, offset, opt, window,
+                                             data_frame.get_interval_size(interval))
+    else:
+        remainder_queues = [remainder_queue for size, chunk_seeds in batches
+                            for remainder_queue in _map_runs(executor, size, chunk_seeds, _interval_remainder_queues,
+                                                             data_frame, interval, queue, offset, opt, window)]
     # remainder queue index corresponding to N* is the confidence-level percentile index
     opt_remainder_queue_index = math.ceil(confidence / 100 * len(remainder_queues)) - 1
     # sort by largest carryover size
     # TODO: investigate whether sorting by size is best, and if the sequence of values in a queue has an effect
-    sorted(remainder_queues, key = lambda e : sum([remainder for time, remainder in e]))
+    remainder_queues = sorted(remainder_queues, key=lambda e: sum([remainder for time, remainder in e]))
     opt_remainder_queue = remainder_queues[opt_remainder_queue_index]
-    opt_allocation = AllocationResult(opt, opt_remainder_queue)
+    opt_allocation = AllocationResult(opt, opt_remainder_queue, len(allocations))
     return opt_allocation
 
 
+def _batched_allocations(queue: Queue, data_frame: DataFrame, interval: int, offset: int, min_ratio: float,
+                         window: float, final_window: float, num_sim_runs: int, confidence: float,
+                         executor: Union[Executor, None], num_chunks: int, seed_sequence: np.random.SeedSequence,
+                         tolerance: Union[float, None], batch_size: int, deadline: Union[float, None]) \
+        -> Union[None, Tuple[List[int], List[np.ndarray], List[Tuple[int, List[np.random.SeedSequence]]]]]:
+    """
+    Find the minimum allocation of the simulation runs of an interval, in batches when there is a tolerance or a
+    deadline, stopping early once the tolerance is reached or the deadline has passed
+
+    :param offset: the relative starting time of the interval
+    :param seed_sequence: the seed of the random streams of the allocation samples
+    :return: the minimum allocation of each simulation run, the samples when there is no executor and the size and
+             chunk seeds of each batch, or None if a simulation run has no allocation
+    """
+    allocations: List[Union[int, None]] = []
+    samples: List[np.ndarray] = []
+    batches: List[Tuple[int, List[np.random.SeedSequence]]] = []
+    batched = tolerance is not None or deadline is not None
+    for size in _batch_sizes(num_sim_runs, batch_size if batched else num_sim_runs):
+        chunk_seeds = seed_sequence.spawn(num_chunks)
+        batches.append((size, chunk_seeds))
+        if executor is None:
+            samples.append(_sample_interval(data_frame, interval, size, chunk_seeds[0], False))
+            allocations += _allocations(samples[-1], queue, offset, min_ratio, window, final_window)
+        else:
+            allocations += _map_runs(executor, size, chunk_seeds, _interval_allocations,
+                                     data_frame, interval, queue, offset, min_ratio, window, final_window)
+        if None in allocations:
+            return None
+        if tolerance is not None and _percentile_interval_width(allocations, confidence) <= tolerance:
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+    return allocations, samples, batches
+
+
+def _batch_sizes(num_sim_runs: int, batch_size: int) -> List[int]:
+    """
+    Split the simulation runs into batches
+
+    :param num_sim_runs: the number of times in which to run the simulation
+    :param batch_size: the largest number of simulation runs in a batch
+    :return: the number of simulation runs in each batch
+    """
+    return [min(batch_size, num_sim_runs - start) for start in range(0, num_sim_runs, batch_size)]
+
+
+def _percentile_interval_width(allocations: List[int], confidence: float) -> float:
+    """
+    Get the width of the 95% confidence interval of the confidence percentile of the allocations.
+    The interval is bounded by the order statistics whose ranks are the binomial bounds of the number of
+    allocations under the percentile, using the normal approximation.
+
+    :param allocations: the minimum allocation of each simulation run so far
+    :param confidence: the percentile of the allocations to estimate
+    :return: the width of the interval in slots, or infinity if there are too few runs to bound the percentile
+    """
+    num_runs = len(allocations)
+    quantile = confidence / 100
+    spread = _Z_95 * math.sqrt(num_runs * quantile * (1 - quantile))
+    lower = math.floor(num_runs * quantile - spread)
+    upper = math.ceil(num_runs * quantile + spread)
+    if lower < 1 or upper > num_runs:
+        return math.inf
+    ordered = np.sort(allocations)
+    return ordered[upper - 1] - ordered[lower - 1]
+
+
+def _map_runs(executor: Union[Executor, None], num_sim_runs: int, chunk_seeds: List[np.random.SeedSequence],
+              run_chunk: Callable[..., list], *args) -> list:
+    """
+    Run the simulation runs of an interval, split in chunks across the executor workers when there is an executor
+
+    :param executor: the process pool to split the simulation runs across, or None to run them in this process
+    :param num_sim_runs: the number of times in which to run the simulation
+    :param chunk_seeds: the seed of the independent random stream of each chunk, one chunk without an executor
+    :param run_chunk: the function running a chunk of simulation runs, called with args, the number of runs, the
+           seed of the chunk and whether it runs in a worker
+    :return: the results of all the simulation runs, in chunk order
+    """
+    if executor is None:
+        return run_chunk(*args, num_sim_runs, chunk_seeds[0], False)
+    chunk_sizes = np.diff(np.linspace(0, num_sim_runs, len(chunk_seeds) + 1).astype(int))
+    futures = [executor.submit(run_chunk, *args, int(size), chunk_seed, True)
+               for size, chunk_seed in zip(chunk_sizes, chunk_seeds) if size > 0]
+    return [result for future in futures for result in future.result()]
+
+
+def _sample_interval(data_frame: DataFrame, interval: int, num_sim_runs: int,
+                     seed_sequence: np.random.SeedSequence, in_worker: bool) -> np.ndarray:
+    """
+    Sample the arrivals of an interval for a number of simulation runs.
+    Data frames with a `get_interval_samples` method are sampled in a single draw from a generator seeded with
+    the seed sequence, others are sampled a run at a time from the global numpy stream.
+
+    :param data_frame: an object which generates stochastic arrivals per unit time
+    :param interval: the interval time
+    :param num_sim_runs: the number of samples
+    :param seed_sequence: the seed of the random stream of the samples
+    :param in_worker: whether the samples are drawn in a worker, in which case the global numpy stream is reseeded
+    :return: the arrivals of each simulation run, shape (runs, time units)
+    """
+    if hasattr(data_frame, 'get_interval_samples'):
+        rng = np.random.default_rng(seed_sequence)
+        return np.asarray(data_frame.get_interval_samples(interval, num_sim_runs, rng))
+    if in_worker:
+        np.random.seed(seed_sequence.generate_state(4))
+    return np.array([data_frame.get_interval_sample(interval) for _ in range(num_sim_runs)])
+
+
+def _interval_allocations(data_frame: DataFrame, interval: int, queue: Queue, offset: int, min_ratio: float,
+                          window: float, final_window: float, num_sim_runs: int,
+                          seed_sequence: np.random.SeedSequence, in_worker: bool) -> List[Union[int, None]]:
+    """
+    Sample the arrivals of an interval and find the minimum uniform allocation of each simulation run
+
+    :return: the minimum allocation of each simulation run, see `_min_uniform_allocations`
+    """
+    stochastic_arrivals = _sample_interval(data_frame, interval, num_sim_runs, seed_sequence, in_worker)
+    return _allocations(stochastic_arrivals, queue, offset, min_ratio, window, final_window)
+
+
+def _interval_remainder_queues(data_frame: DataFrame, interval: int, queue: Queue, offset: int, allocation: int,
+                               window: float, num_sim_runs: int,
+                               seed_sequence: np.random.SeedSequence, in_worker: bool) -> List[Queue]:
+    """
+    Sample the arrivals of an interval and simulate the allocation to get the remainder queue of each simulation run
+
+    :return: the remainder queue of each simulation run
+    """
+    stochastic_arrivals = _sample_interval(data_frame, interval, num_sim_runs, seed_sequence, in_worker)
+    return _remainder_queues(stochastic_arrivals, queue, offset, allocation, window,
+                             data_frame.get_interval_size(interval))
+
+
+def _allocations(arrivals: np.ndarray, queue: Queue, offset: int, min_ratio: float, window: float,
+                 final_window: float) -> List[Union[int, None]]:
+    """
+    Find the minimum uniform allocation of each simulation run
+
+    :param arrivals: the arrivals of each simulation run, shape (runs, time units)
+    :return: the minimum allocation of each simulation run, see `_min_uniform_allocations`
+    """
+    # search the minimum allocation of every run together
+    hi = _hi_batch(queue, arrivals)
+    return _min_uniform_allocations(arrivals=arrivals, queue=queue, offset=offset, min_ratio=min_ratio,
+                                    window=window, final_window=final_window, lo=np.zeros_like(hi), hi=hi)
+
+
+def _remainder_queues(arrivals: np.ndarray, queue: Queue, offset: int, allocation: int, window: float,
+                      interval_size: int) -> List[Queue]:
+    """
+    Simulate the allocation over the interval to get the remainder queue of each simulation run
+
+    :param arrivals: the arrivals of each simulation run, shape (runs, time units)
+    :param interval_size: the number of time units in the interval
+    :return: the remainder queue of each simulation run
+    """
+    # all runs are simulated together since they share the same start queue and schedule
+    schedule_with_padding = _gen_uniform_suggested_schedule(arrivals=arrivals[0], allocation_amount=allocation,
+                                                            window=window)
+    interval_size_schedule = schedule_with_padding[:interval_size]
+    schedule_sim_result = simulate_allocations_batch(arrivals=arrivals, slot_schedule=interval_size_schedule,
+                                                     current_queue=queue, offset=offset)
+    return [schedule_sim_result.remainder_queue(run) for run in range(len(arrivals))]
+
+
 def _gen_uniform_suggested_schedule(arrivals: List[int], allocation_amount: int, window: float) \
         -> List[int]:
     """
@@ -161,7 +439,7 @@ def _gen_uniform_suggested_schedule(arrivals: List[int], allocation_amount: int,
     return [allocation_amount] * (len(arrivals) + max_time_to_process_last_arrivals)
 
 
-def _min_uniform_allocation(queue: deque, arrivals: List[int], min_ratio: float, window: float, final_window: float,
+def _min_uniform_allocation(queue: Queue, arrivals: List[int], min_ratio: float, window: float, final_window: float,
                             offset: int, lo: int, hi: int) -> Union[int, None]:
     """
     Binary search for the minimum uniform allocation (all allocations are equal) of quantity n
@@ -184,12 +462,11 @@ def _min_uniform_allocation(queue: deque, arrivals: List[int], min_ratio: float,
     while lo <= hi:
         mid = (lo + hi) // 2
         schedule = _gen_uniform_suggested_schedule(arrivals=arrivals, allocation_amount=mid, window=window)
-        sim_result = simulate_allocations(arrivals=arrivals, slot_schedule=schedule,
-                                          current_queue=queue, offset=offset)
-        success_rate = success_ratio(sim_result.schedule, queue, sim_result.remainder_queue, window, offset)
-        processed_all_already_overdue = success_ratio_already_overdue(sim_result.schedule, queue,
-                                                                      sim_result.remainder_queue, window, final_window,
-                                                                      offset) == 1
+        success_rate, success_rate_already_overdue = uniform_success_ratios(queue=queue, arrivals=arrivals,
+                                                                            capacity=mid, window=window,
+                                                                            final_window=final_window, offset=offset,
+                                                                            schedule_length=len(schedule))
+        processed_all_already_overdue = success_rate_already_overdue == 1
 
         # update the min feasible value
         if success_rate >= min_ratio and processed_all_already_overdue and mid < lowest_alloc:
@@ -214,7 +491,82 @@ def _min_uniform_allocation(queue: deque, arrivals: List[int], min_ratio: float,
     return None
 
 
-def _hi(queue: deque, arrivals: List[int]):
+def _min_uniform_allocations(queue: Queue, arrivals: np.ndarray, min_ratio: float, window: float, final_window: float,
+                             offset: int, lo: np.ndarray, hi: np.ndarray) -> List[Union[int, None]]:
+    """
+    Binary search for the minimum uniform allocation of many runs of arrivals in lockstep.
+    Every run keeps its own search bounds and follows the same steps as `_min_uniform_allocation`, but the midpoints
+    of all runs still searching are evaluated together in each step.
+
+    :param queue: the queue of arrivals before this interval start time
+    :param arrivals: the arrivals per unit time of each run, shape (runs, time units), starting at a time
+           (time = 0) relative to the interval
+    :param min_ratio: the minimum rate at which arrivals must be processed at
+    :param window: the time in which an arrival must be processed by, and if not is considered overdue.
+           Must correspond to the same time unit as the rate of arrivals time.
+    :param final_window: the time in which 100% of arrival must be processed by. Must correspond to the same time unit
+           as the rate of arrivals time
+    :param offset: the relative starting time of the simulation in the as an int time unit
+    :param lo: the search minimum of each run
+    :param hi: the search upper bound of each run
+    :return: the number of slots of each run that returns a feasible schedule given the processing constraints, or
+             None for the runs without one
+    """
+    lo = np.array(lo, dtype=int)
+    hi = np.array(hi, dtype=int)
+    schedule_length = arrivals.shape[1] + math.ceil(window * 2)
+    lowest_alloc = np.full(len(arrivals), np.inf)
+    allocations: List[Union[int, None]] = [None] * len(arrivals)
+    searching = np.flatnonzero(lo <= hi)
+    while len(searching) > 0:
+        mid = (lo[searching] + hi[searching]) // 2
+        run_arrivals = arrivals[searching]
+        success_rate, success_rate_already_overdue = uniform_success_ratios(queue=queue, arrivals=run_arrivals,
+                                                                            capacity=mid, window=window,
+                                                                            final_window=final_window, offset=offset,
+                                                                            schedule_length=schedule_length)
+        processed_all_already_overdue = success_rate_already_overdue == 1
+        exists_gap = ~np.any(run_arrivals == mid[:, np.newaxis], axis=1)
+
+        # update the min feasible value
+        feasible = (success_rate >= min_ratio) & processed_all_already_overdue
+        lowest_alloc[searching] = np.where(feasible, np.minimum(mid, lowest_alloc[searching]), lowest_alloc[searching])
+
+        ratio_eq_100_and_success = (~exists_gap & (min_ratio == 1) & (success_rate == 1)
+                                    & processed_all_already_overdue)
+
+        ratio_lt_100_and_success = ((min_ratio < 1.) & (success_rate == min_ratio) & processed_all_already_overdue)
+
+        # search until we have minimized the feasible value we can go
+        found = (ratio_lt_100_and_success | ratio_eq_100_and_success
+                 | ((lo[searching] == hi[searching]) & (lowest_alloc[searching] < np.inf)))
+        for run in searching[found]:
+            allocations[run] = int(lowest_alloc[run])
+
+        ratio_is_100_and_fail = exists_gap & (success_rate == min_ratio) & processed_all_already_overdue
+        ratio_lt_100_and_minimizable = (success_rate > min_ratio) & processed_all_already_overdue
+        shrink_hi = ratio_is_100_and_fail | ratio_lt_100_and_minimizable
+        hi[searching] = np.where(shrink_hi, mid, hi[searching])
+        lo[searching] = np.where(shrink_hi, lo[searching], mid + 1)
+
+        searching = searching[~found]
+        searching = searching[lo[searching] <= hi[searching]]
+    return allocations
+
+
+def _hi_batch(queue: Queue, arrivals: np.ndarray) -> np.ndarray:
+    """
+    Calculate the search upper bound of many runs of arrivals, see `_hi`
+
+    :param queue: the arrivals that need to be processed going into the simulation
+    :param arrivals: the arrivals that occur throughout the simulation per unit time of each run
+    :return: the search upper bound of each run
+    """
+    _, queue_counts = queue_arrays(queue)
+    return queue_counts.sum() + np.max(arrivals, axis=1)
+
+
+def _hi(queue: Queue, arrivals: List[int]):
     """
     Calculate the search upper bound
 
@@ -1,12 +1,12 @@
-from .types import ScheduleResult, TimeUnitBreakdown
+from .types import BatchScheduleResult, Queue, RunLengthQueue, ScheduleRecord, ScheduleResult, queue_arrays
 from collections import deque
-from copy import deepcopy
-from typing import List
+from typing import List, Tuple
+import numpy as np
 
 
 def simulate_allocations(
         arrivals: List[int], slot_schedule: List[int], offset: int,
-        current_queue: deque = deque()
+        current_queue: Queue = deque()
 ) -> ScheduleResult:
     """
     Simulate the proposed schedule and return the processing results of each arrival.
@@ -19,52 +19,151 @@ def simulate_allocations(
     """
     if len(arrivals) > len(slot_schedule):
         raise Exception('The slot schedule should have an entry for each arrival to be simulated')
-    # the queue will be manipulated throughout the simulation
-    # make copy so can reuse the original queue for other simulations with same start
-    queue = deepcopy(current_queue)
-    allocations: List[TimeUnitBreakdown] = []
+    # the start queue is never modified, so the same queue can be reused for other simulations with same start.
+    # the queue of this simulation is the start queue followed by all new nonzero arrivals, and processing only moves
+    # the head of the queue forward
+    if not isinstance(current_queue, RunLengthQueue):
+        current_queue = RunLengthQueue.from_queue(current_queue)
+    start_times, start_counts = current_queue.creation_times[current_queue.head:], \
+        current_queue.counts[current_queue.head:]
+    arrival_times = np.flatnonzero(np.asarray(arrivals) != 0)
+    queue = RunLengthQueue(np.concatenate((start_times, offset + arrival_times)),
+                           np.concatenate((start_counts, np.asarray(arrivals)[arrival_times])),
+                           0, current_queue.head_processed)
+    queue_times, queue_counts = queue.creation_times.tolist(), queue.counts.tolist()
+    # the number of queue entries that have arrived before each time unit is processed
+    arrived = np.searchsorted(arrival_times, np.arange(len(slot_schedule)), side='right')
+    available = (len(start_times) + arrived).tolist()
+
+    # processing entries of the schedule as aligned columns of (time, creation time, count)
+    processed_times: List[int] = []
+    processed_creation_times: List[int] = []
+    processed_counts: List[int] = []
     # simulate the slot schedule given over the arrivals
     for rel_time in range(len(slot_schedule)):
         arrival_time = rel_time + offset
-        # schedule can be longer than the actual arrivals due to carryovers
-        if rel_time < len(arrivals) and arrivals[rel_time] != 0:
-            # queue all new nonzero arrivals no matter what, ONCE. Store in format [creation time, slots]
-            queue.append([arrival_time, arrivals[rel_time]])
         capacity = slot_schedule[rel_time]
-        current_allocation_breakdown = _process_available(queue, capacity, arrival_time)
+        num_processed = _process_available(queue, queue_times, queue_counts, available[rel_time], capacity,
+                                           processed_creation_times, processed_counts)
         # add current allocation to the total schedule sequence
-        allocations.append(current_allocation_breakdown)
+        processed_times.extend([arrival_time] * num_processed)
 
-    allocation_results = ScheduleResult(allocations, queue)
+    schedule = ScheduleRecord(offset + np.arange(len(slot_schedule)), np.array(processed_times, dtype=int),
+                              np.array(processed_creation_times, dtype=int), np.array(processed_counts))
+    allocation_results = ScheduleResult(schedule, queue)
     return allocation_results
 
 
-def _process_available(queue: deque, capacity: int, time_id: int) -> TimeUnitBreakdown:
+def _process_available(queue: RunLengthQueue, queue_times: List[int], queue_counts: List[int], available: int,
+                       capacity: int, creation_times: List[int], counts: List[int]) -> int:
     """
     Process as many queue items as possible (cannot exceed max slots allowed) in this time unit.
     Otherwise, leave queue elements to be processed for next time unit.
-    Updates queue so that it only contains items that needs to be processed
+    Moves the queue head so that it only contains items that needs to be processed
 
-    :param queue: the arrivals that need to be processed
+    :param queue: the arrivals that need to be processed, its head is updated
+    :param queue_times: the creation time of each queue entry
+    :param queue_counts: the number of arrivals of each queue entry
+    :param available: the number of queue entries that have arrived by this time unit
     :param capacity: the max number of arrivals that can be processed
-    :param time_id: the current time when processing the arrivals
-    :return: the details of how arrivals were processed at a specific time
+    :param creation_times: the creation time of each processing entry, appended to for this time unit
+    :param counts: the number processed of each processing entry, appended to for this time unit
+    :return: the number of processing entries appended for this time unit
     """
-    allocation_breakdown: TimeUnitBreakdown = TimeUnitBreakdown(time_id)
-    while len(queue) > 0 and allocation_breakdown.total < capacity:
-        top = queue[0]
-        (top_time, top_arrivals) = top
+    total = 0
+    num_entries = 0
+    while queue.head < available and total < capacity:
+        top_time = queue_times[queue.head]
+        top_arrivals = queue_counts[queue.head] - queue.head_processed
         # process what you can: either the max slots or all the current and previous queue elements
-        if top_arrivals + allocation_breakdown.total > capacity:
+        if top_arrivals + total > capacity:
             # don't dequeue because it will need to cascade to next iteration
-            processable = capacity - allocation_breakdown.total
-            top[1] -= processable
-            allocation_breakdown.add(top_time, processable)
+            processable = capacity - total
+            queue.head_processed += processable
+            creation_times.append(top_time)
+            counts.append(processable)
+            total += processable
         else:
             # process everything that can
-            last_processed = queue.popleft()
-            (creation_time, slots) = last_processed
-            # if slots is 0 it does not increase the total slots allocated count
+            queue.head += 1
+            queue.head_processed = 0
+            # if top_arrivals is 0 it does not increase the total slots allocated count
             # (although 0 items should not be in the queue)
-            allocation_breakdown.add(creation_time, slots)
-    return allocation_breakdown
+            creation_times.append(top_time)
+            counts.append(top_arrivals)
+            total += top_arrivals
+        num_entries += 1
+    return num_entries
+
+
+def simulate_allocations_batch(
+        arrivals: np.ndarray, slot_schedule: np.ndarray, offset: int,
+        current_queue: Queue = deque()
+) -> BatchScheduleResult:
+    """
+    Simulate the proposed schedule for many runs of arrivals at once and return the processing results as arrays.
+    Produces the same processing order as `simulate_allocations` for each run.
+
+    Under first in first out processing the number of arrivals processed by time t is
+    S(t) = min(A(t), S(t - 1) + c(t)), where A is the cumulative number of arrivals and c the slots at time t.
+    Unrolled, S(t) = C(t) + min(0, min_{s <= t}(A(s) - C(s))) where C is the cumulative number of slots,
+    which is evaluated for all runs with a single running minimum.
+
+    :param arrivals: the arrivals per unit time of each run, shape (runs, time units), starting at a time relative
+           to the interval
+    :param slot_schedule: The amount of slots to allocate per unit time to process arrivals, either shared by all
+           runs with shape (time units,) or per run with shape (runs, time units)
+    :param offset: the relative starting time of the simulation as an int time unit
+    :param current_queue: the arrivals that need to be processed, ordered by creation time
+    :return: The details of when the arrivals of each run were processed
+    """
+    arrivals = np.atleast_2d(np.asarray(arrivals))
+    slot_schedule = np.asarray(slot_schedule)
+    num_runs, num_arrivals = arrivals.shape
+    num_slots = slot_schedule.shape[-1]
+    if num_arrivals > num_slots:
+        raise Exception('The slot schedule should have an entry for each arrival to be simulated')
+
+    creation_times, bounds = _cohort_bounds(arrivals, offset, current_queue)
+    served = _cumulative_served(bounds, num_arrivals, slot_schedule)
+    return BatchScheduleResult(offset + np.arange(num_slots), served, creation_times, bounds)
+
+
+def _cohort_bounds(arrivals: np.ndarray, offset: int, current_queue: Queue) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Group the start queue and the arrivals of each run into cohorts by creation time
+
+    :param arrivals: the arrivals per unit time of each run, shape (runs, time units)
+    :param offset: the relative starting time of the simulation as an int time unit
+    :param current_queue: the arrivals that need to be processed, ordered by creation time
+    :return: the creation time of each cohort, shape (cohorts,), and the cumulative number of arrivals before each
+             cohort, shape (runs, cohorts + 1)
+    """
+    num_runs, num_arrivals = arrivals.shape
+    queue_times, queue_counts = queue_arrays(current_queue)
+    creation_times = np.concatenate((queue_times, offset + np.arange(num_arrivals)))
+
+    # the start queue cohorts come before any arrival
+    cohort_counts = np.concatenate((np.broadcast_to(queue_counts, (num_runs, len(queue_counts))), arrivals), axis=1)
+    bounds = np.concatenate((np.zeros((num_runs, 1), dtype=cohort_counts.dtype),
+                             np.cumsum(cohort_counts, axis=1)), axis=1)
+    return creation_times, bounds
+
+
+def _cumulative_served(bounds: np.ndarray, num_arrivals: int, slot_schedule: np.ndarray) -> np.ndarray:
+    """
+    The cumulative number of arrivals processed by the end of each time unit under first in first out processing
+
+    :param bounds: the cumulative number of arrivals before each cohort, shape (runs, cohorts + 1)
+    :param num_arrivals: the number of arrival time units, which are the last cohorts
+    :param slot_schedule: the slots per unit time, shape (time units,) or (runs, time units)
+    :return: the cumulative number processed, shape (runs, time units)
+    """
+    num_runs, num_bounds = bounds.shape
+    num_slots = slot_schedule.shape[-1]
+    # the schedule can be longer than the arrivals due to carryovers, which have no new arrivals
+    arrived_cohorts = num_bounds - 1 - num_arrivals + np.minimum(np.arange(num_slots) + 1, num_arrivals)
+    cumulative_arrivals = bounds[:, arrived_cohorts]
+    cumulative_slots = np.cumsum(np.broadcast_to(slot_schedule, (num_runs, num_slots)), axis=1)
+    backlog = np.minimum(np.minimum.accumulate(cumulative_arrivals - cumulative_slots, axis=1), 0)
+    return cumulative_slots + backlog
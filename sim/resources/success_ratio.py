@@ -1,9 +1,7 @@
-from .types import (TimeUnitBreakdown)
-from typing import List
-from collections import deque
+from .types import (Queue, Schedule, ScheduleRecord, queue_arrays)
 
 
-def success_ratio(schedule: List[TimeUnitBreakdown], start_queue: deque, carryover_queue: deque, window: float,
+def success_ratio(schedule: Schedule, start_queue: Queue, carryover_queue: Queue, window: float,
                   sim_start_time: int) -> float:
     """
     The success rate at which not already overdue arrivals are processed at
@@ -33,7 +31,7 @@ def success_ratio(schedule: List[TimeUnitBreakdown], start_queue: deque, carryov
     return success_rate
 
 
-def success_ratio_already_overdue(schedule: List[TimeUnitBreakdown], start_queue: deque, carryover_queue: deque,
+def success_ratio_already_overdue(schedule: Schedule, start_queue: Queue, carryover_queue: Queue,
                                   window: float, final_window: float, sim_start_time: int) -> float:
     """
     The success rate at which already overdue arrivals are processed at
@@ -58,7 +56,7 @@ def success_ratio_already_overdue(schedule: List[TimeUnitBreakdown], start_queue
     return success_rate
 
 
-def _total(schedule: List[TimeUnitBreakdown], carryover_queue: deque) -> int:
+def _total(schedule: Schedule, carryover_queue: Queue) -> int:
     """
     Calculates the total number of arrivals in this simulation interval
 
@@ -67,16 +65,11 @@ def _total(schedule: List[TimeUnitBreakdown], carryover_queue: deque) -> int:
     :param carryover_queue: the resulting queue after all the arrivals were processed for a particular time period
     :return: The total number of arrivals in this simulation interval
     """
-    total = 0
-    for unit_time in range(len(schedule)):
-        total += schedule[unit_time].total
-    # check the carryover queue
-    for (_, arrival_count) in carryover_queue:
-        total += arrival_count
-    return total
+    _, carryover_counts = queue_arrays(carryover_queue)
+    return _schedule_record(schedule).counts.sum() + carryover_counts.sum()
 
 
-def _num_became_overdue(schedule: List[TimeUnitBreakdown], carryover_queue: deque, window: float, sim_start_time: int)\
+def _num_became_overdue(schedule: Schedule, carryover_queue: Queue, window: float, sim_start_time: int)\
         -> int:
     """
     Count the number of arrivals that became overdue
@@ -88,22 +81,20 @@ def _num_became_overdue(schedule: List[TimeUnitBreakdown], carryover_queue: dequ
     :param sim_start_time: the relative starting time of the simulation as an int time unit
     :return:
     """
-    count = 0
-    unit_time = 0
+    record = _schedule_record(schedule)
     # check the schedule
-    for unit_time in range(len(schedule)):
-        for (arrival_time, num_arrivals) in schedule[unit_time].record.items():
-            if schedule[unit_time].current_time - arrival_time > window and arrival_time >= sim_start_time-window:
-                count += num_arrivals
-    # check the carryover queue
-    unit_time += 1
-    for (arrival_time, arrival_count) in carryover_queue:
-        if arrival_time >= sim_start_time-window and unit_time + sim_start_time - arrival_time > window:
-            count += arrival_count
-    return count
-
-
-def _total_already_overdue(start_queue: deque, window: float, sim_start_time: int)\
+    became_overdue = ((record.times - record.creation_times > window)
+                      & (record.creation_times >= sim_start_time - window))
+    count = record.counts[became_overdue].sum()
+    # check the carryover queue as if it were processed the time unit after the schedule ends
+    unit_time = max(len(record), 1)
+    carryover_times, carryover_counts = queue_arrays(carryover_queue)
+    carryover_overdue = ((carryover_times >= sim_start_time - window)
+                         & (unit_time + sim_start_time - carryover_times > window))
+    return count + carryover_counts[carryover_overdue].sum()
+
+
+def _total_already_overdue(start_queue: Queue, window: float, sim_start_time: int)\
         -> int:
     """
     Gives the number of already overdue processed that arrived to this interval in the start queue
@@ -114,15 +105,12 @@ def _total_already_overdue(start_queue: deque, window: float, sim_start_time: in
     :param sim_start_time: the relative starting time of the simulation as an int time unit
     :return: the number of already overdue processed that arrived to this interval in the start queue
     """
-    count = 0
     # check the start of simulation queue
-    for (arrival_time, arrival_count) in start_queue:
-        if sim_start_time - arrival_time > window:
-            count += arrival_count
-    return count
+    start_times, start_counts = queue_arrays(start_queue)
+    return start_counts[sim_start_time - start_times > window].sum()
 
 
-def _num_already_overdue_failed(schedule: List[TimeUnitBreakdown], carryover_queue: deque, final_window: float,
+def _num_already_overdue_failed(schedule: Schedule, carryover_queue: Queue, final_window: float,
                                 sim_start_time: int) -> int:
     """
     Gives the number of items that are already overdue and failed to be processed within the final window time
@@ -135,15 +123,24 @@ def _num_already_overdue_failed(schedule: List[TimeUnitBreakdown], carryover_que
     :param sim_start_time: the relative starting time of the simulation as an int time unit
     :return: the number of items that are already overdue and failed to be processed within the final window time
     """
-    count = 0
-    unit_time = 0
+    record = _schedule_record(schedule)
     # check the schedule
-    for unit_time in range(len(schedule)):
-        for (arrival_time, num_arrivals) in schedule[unit_time].record.items():
-            if arrival_time < sim_start_time and schedule[unit_time].current_time - arrival_time > final_window:
-                count += num_arrivals
-    # check the carryover queue
-    for (arrival_time, arrival_count) in carryover_queue:
-        if sim_start_time + unit_time - arrival_time > final_window:
-            count += arrival_count
-    return count
+    overdue_failed = ((record.creation_times < sim_start_time)
+                      & (record.times - record.creation_times > final_window))
+    count = record.counts[overdue_failed].sum()
+    # check the carryover queue as if it were processed on the last time unit of the schedule
+    unit_time = max(len(record) - 1, 0)
+    carryover_times, carryover_counts = queue_arrays(carryover_queue)
+    return count + carryover_counts[sim_start_time + unit_time - carryover_times > final_window].sum()
+
+
+def _schedule_record(schedule: Schedule) -> ScheduleRecord:
+    """
+    The compact record of a schedule, converting a list of time unit breakdowns if needed
+
+    :param schedule: the details on when each arrival was processed at for an interval
+    :return: the compact record of the schedule
+    """
+    if isinstance(schedule, ScheduleRecord):
+        return schedule
+    return ScheduleRecord.from_breakdowns(schedule)
@@ -1,5 +1,6 @@
 from collections import deque
-from typing import List
+from typing import Iterable, List, Tuple, Union
+import numpy as np
 
 
 class TimeUnitBreakdown:
@@ -13,6 +14,8 @@ class TimeUnitBreakdown:
     total: int
         The total number of arrivals processed on this time unit
     """
+    __slots__ = ('current_time', 'record', 'total')
+
     def __init__(self, current_time: int):
         self.current_time = current_time
         self.record = {}
@@ -44,17 +47,208 @@ class TimeUnitBreakdown:
         return arrival in self.record
 
 
+class ScheduleRecord:
+    """
+    A compact record of how arrivals were processed over consecutive time units.
+    Each processing entry is stored in aligned arrays instead of a `TimeUnitBreakdown` per time unit, sorted by the
+    time it was processed at. Indexing returns a `TimeUnitView` for callers that need a time unit object.
+
+    Properties
+    ----------
+    time_ids: np.ndarray
+        The time of each time unit in the schedule, shape (time units,)
+    times: np.ndarray
+        The time each entry was processed at, shape (entries,)
+    creation_times: np.ndarray
+        The creation time of the arrivals of each entry, shape (entries,)
+    counts: np.ndarray
+        The number of arrivals processed in each entry, shape (entries,)
+    """
+    __slots__ = ('time_ids', 'times', 'creation_times', 'counts', '_starts')
+
+    def __init__(self, time_ids: np.ndarray, times: np.ndarray, creation_times: np.ndarray, counts: np.ndarray):
+        self.time_ids = time_ids
+        self.times = times
+        self.creation_times = creation_times
+        self.counts = counts
+        self._starts = None
+
+    @classmethod
+    def from_breakdowns(cls, schedule: List[TimeUnitBreakdown]) -> 'ScheduleRecord':
+        """
+        Create the compact record of a list of time unit breakdowns
+
+        :param schedule: the details on when each arrival was processed at for each time unit
+        :return: the compact record of the schedule
+        """
+        entries = [(breakdown.current_time, creation_time, count)
+                   for breakdown in schedule for creation_time, count in breakdown.record.items()]
+        times, creation_times, counts = (np.array(column) for column in zip(*entries)) if entries \
+            else (np.zeros(0, dtype=int) for _ in range(3))
+        return cls(np.array([breakdown.current_time for breakdown in schedule], dtype=int),
+                   times, creation_times, counts)
+
+    def entries(self, index: int) -> slice:
+        """
+        The range of entries processed in a time unit
+
+        :param index: the index of the time unit in the schedule
+        :return: the slice of the entry arrays for the time unit
+        """
+        if self._starts is None:
+            self._starts = np.searchsorted(self.times, self.time_ids, side='left').tolist() + [len(self.times)]
+        return slice(self._starts[index], self._starts[index + 1])
+
+    def __len__(self) -> int:
+        return len(self.time_ids)
+
+    def __getitem__(self, index: int) -> 'TimeUnitView':
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('schedule index out of range')
+        return TimeUnitView(self, index)
+
+    def __iter__(self) -> Iterable['TimeUnitView']:
+        return (TimeUnitView(self, index) for index in range(len(self)))
+
+
+class TimeUnitView:
+    """
+    A read only `TimeUnitBreakdown` of a single time unit of a `ScheduleRecord`
+
+    Properties
+    ----------
+    current_time: int
+        The date of this time unit
+    record: record
+        A report on what was processed on this time unit and how many
+    total: int
+        The total number of arrivals processed on this time unit
+    """
+    __slots__ = ('_schedule', '_index')
+
+    def __init__(self, schedule: ScheduleRecord, index: int):
+        self._schedule = schedule
+        self._index = index
+
+    @property
+    def current_time(self) -> int:
+        return int(self._schedule.time_ids[self._index])
+
+    @property
+    def record(self) -> dict:
+        entries = self._schedule.entries(self._index)
+        return dict(zip(self._schedule.creation_times[entries].tolist(), self._schedule.counts[entries].tolist()))
+
+    @property
+    def total(self) -> int:
+        return self._schedule.counts[self._schedule.entries(self._index)].sum().item()
+
+    def contains(self, arrival: int) -> bool:
+        """
+        Indicates whether or not an arrival
+
+        :param arrival: the creation time id of the arrival (as a time unit)
+        :return: Whether or not an arrival
+        """
+        return arrival in self._schedule.creation_times[self._schedule.entries(self._index)]
+
+
+class RunLengthQueue:
+    """
+    A queue of arrivals stored as run length arrays that are never modified.
+    Entries before the head have been processed, and the head entry may be partially processed. Simulations starting
+    from the same queue can share it since processing only moves the head of a new queue over the same arrivals.
+    Iterating or indexing gives [creation time, count] entries of the unprocessed arrivals, like a deque.
+
+    Properties
+    ----------
+    creation_times: np.ndarray
+        The creation time of each entry, shape (entries,)
+    counts: np.ndarray
+        The number of arrivals of each entry, shape (entries,)
+    head: int
+        The index of the first entry with unprocessed arrivals
+    head_processed: int
+        The number of arrivals of the head entry that have been processed
+    """
+    __slots__ = ('creation_times', 'counts', 'head', 'head_processed')
+
+    def __init__(self, creation_times: np.ndarray, counts: np.ndarray, head: int = 0, head_processed: int = 0):
+        self.creation_times = creation_times
+        self.counts = counts
+        self.head = head
+        self.head_processed = head_processed
+
+    @classmethod
+    def from_queue(cls, queue: Iterable[List[int]]) -> 'RunLengthQueue':
+        """
+        Create a run length queue from a queue of [creation time, count] entries
+
+        :param queue: the queue of arrivals
+        :return: the run length queue of the same arrivals
+        """
+        return cls(*queue_arrays(queue))
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The creation times and counts of the unprocessed arrivals
+
+        :return: the creation times and the counts, both of shape (entries,)
+        """
+        counts = self.counts[self.head:]
+        if self.head_processed:
+            counts = counts.copy()
+            counts[0] -= self.head_processed
+        return self.creation_times[self.head:], counts
+
+    def __len__(self) -> int:
+        return len(self.counts) - self.head
+
+    def __getitem__(self, index: int) -> List[int]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('queue index out of range')
+        count = self.counts[self.head + index] - (self.head_processed if index == 0 else 0)
+        return [self.creation_times[self.head + index].item(), count.item()]
+
+    def __iter__(self) -> Iterable[List[int]]:
+        creation_times, counts = self.arrays()
+        return ([creation_time, count] for creation_time, count in zip(creation_times.tolist(), counts.tolist()))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (RunLengthQueue, deque, list)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return 'RunLengthQueue(%s)' % list(self)
+
+
+Queue = Union[deque, RunLengthQueue]
+"""
+A queue of arrivals, either a deque of [creation time, count] entries or a run length queue
+"""
+
+Schedule = Union[ScheduleRecord, List[TimeUnitBreakdown]]
+"""
+The processing details of a schedule, either a compact record or a breakdown per time unit
+"""
+
+
 class ScheduleResult:
     """
     Properties
     ----------
-    schedule: List[TimeUnitBreakdown]
+    schedule: Schedule
         The number history report on how arrivals were processed and when
-    remainder_queue: deque
+    remainder_queue: Queue
         The queue of unprocessed arrivals
     """
-    def __init__(self, schedule_results: List[TimeUnitBreakdown], remainder_queue: deque):
-        self.schedule: List[TimeUnitBreakdown] = schedule_results
+    def __init__(self, schedule_results: Schedule, remainder_queue: Queue):
+        self.schedule: Schedule = schedule_results
         self.remainder_queue = remainder_queue
 
 
@@ -64,9 +258,100 @@ class AllocationResult:
     ----------
     allocation: int
         The number of slots to allocate for each time unit in the interval
-    remainder_queue: deque
+    remainder_queue: Queue
         The queue of unprocessed arrivals
+    num_sim_runs: int
+        The number of simulation runs the allocation was calculated from
     """
-    def __init__(self, allocation: int, remainder_queue: deque):
+    def __init__(self, allocation: int, remainder_queue: Queue, num_sim_runs: int = None):
         self.allocation = allocation
         self.remainder_queue = remainder_queue
+        self.num_sim_runs = num_sim_runs
+
+
+class BatchScheduleResult:
+    """
+    The processing results of many simulation runs of the same schedule, stored as arrays.
+    Arrivals are grouped into cohorts by creation time, the start queue cohorts first followed by one cohort per
+    arrival time unit. Cohorts are processed first in first out, so the items of cohort k occupy the positions
+    [bounds[k], bounds[k + 1]) of the processing order of a run.
+
+    Properties
+    ----------
+    time_ids: np.ndarray
+        The time of each time unit of the schedule, shape (time units,)
+    served: np.ndarray
+        The cumulative number of arrivals processed by the end of each time unit, shape (runs, time units)
+    creation_times: np.ndarray
+        The creation time of each cohort in ascending order, shape (cohorts,)
+    bounds: np.ndarray
+        The cumulative number of arrivals before each cohort, shape (runs, cohorts + 1)
+    """
+    def __init__(self, time_ids: np.ndarray, served: np.ndarray, creation_times: np.ndarray, bounds: np.ndarray):
+        self.time_ids = time_ids
+        self.served = served
+        self.creation_times = creation_times
+        self.bounds = bounds
+
+    @property
+    def processed(self) -> np.ndarray:
+        """
+        The number of arrivals processed in each time unit of each run, shape (runs, time units)
+        """
+        return np.diff(self.served, axis=1, prepend=0)
+
+    @property
+    def remainder(self) -> np.ndarray:
+        """
+        The number of unprocessed arrivals left in each cohort of each run, shape (runs, cohorts)
+        """
+        return self._remainder(slice(None))
+
+    def _remainder(self, runs) -> np.ndarray:
+        """
+        The number of unprocessed arrivals left in each cohort of the selected runs
+        """
+        bounds = self.bounds[runs]
+        total_served = self.served[runs, -1:] if self.served.shape[1] else np.zeros(bounds.shape[:-1] + (1,))
+        return np.clip(bounds[..., 1:] - np.maximum(bounds[..., :-1], total_served), 0, None)
+
+    def overdue(self, window: float) -> np.ndarray:
+        """
+        The number of arrivals processed in each time unit of each run that waited longer than the window
+
+        :param window: the time in which an arrival must be processed by, and if not is considered overdue.
+               Must correspond to the same time unit as the rate of arrivals time.
+        :return: the overdue processed counts, shape (runs, time units)
+        """
+        # arrivals created before (time - window) are overdue when processed at that time, and since cohorts are
+        # processed in order they are exactly the positions before the first cohort created after the cutoff
+        late_cohorts = np.searchsorted(self.creation_times, self.time_ids - window, side='left')
+        late_positions = self.bounds[:, late_cohorts]
+        previously_served = self.served - self.processed
+        return np.clip(np.minimum(self.served, late_positions) - previously_served, 0, None)
+
+    def remainder_queue(self, run: int) -> RunLengthQueue:
+        """
+        The queue of unprocessed arrivals of a single run, in the same format as `ScheduleResult.remainder_queue`
+
+        :param run: the index of the simulation run
+        :return: the queue of unprocessed arrivals
+        """
+        remainder = self._remainder(run)
+        nonzero = remainder > 0
+        return RunLengthQueue(self.creation_times[nonzero], remainder[nonzero])
+
+
+def queue_arrays(queue: Iterable[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The creation times and counts of the unprocessed arrivals of a queue as arrays
+
+    :param queue: a run length queue or a queue of [creation time, count] entries
+    :return: the creation times and the counts, both of shape (entries,)
+    """
+    if isinstance(queue, RunLengthQueue):
+        return queue.arrays()
+    if len(queue) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    return (np.array([creation_time for creation_time, _ in queue], dtype=int),
+            np.array([count for _, count in queue]))
@@ -0,0 +1,92 @@
+from .simulateallocations import _cohort_bounds, _cumulative_served
+from .types import Queue
+from typing import List, Tuple, Union
+import math
+import numpy as np
+
+
+def uniform_success_ratios(queue: Queue, arrivals: Union[List[int], np.ndarray], capacity: Union[int, np.ndarray],
+                           window: float, final_window: float, offset: int, schedule_length: int = None) \
+        -> Tuple[Union[float, np.ndarray], Union[float, np.ndarray]]:
+    """
+    Evaluate the success ratios of a uniform schedule without simulating it.
+    Returns the same values as `success_ratio` and `success_ratio_already_overdue` applied to the result of
+    `simulate_allocations` with a schedule of `capacity` slots every time unit.
+
+    Arrivals are processed first in first out, so the arrivals processed by time t are exactly the first S(t)
+    arrivals, where S is the cumulative served count. An arrival created at time r is on time when it is processed
+    by time floor(r + window), so the number processed on time in each cohort is read off S at a single index.
+
+    :param queue: the queue of arrivals before this interval start time, ordered by creation time
+    :param arrivals: the arrivals per unit time starting at the interval start, either a single run with shape
+           (time units,) or many runs with shape (runs, time units)
+    :param capacity: the slots allocated every time unit, a single value or one value per run
+    :param window: the time in which an arrival must be processed by, and if not is considered overdue.
+           Must correspond to the same time unit as the rate of arrivals time.
+    :param final_window: the time in which 100% of arrival must be processed by. Must correspond to the same time unit
+           as the rate of arrivals time
+    :param offset: the relative starting time of the simulation as an int time unit
+    :param schedule_length: the number of time units in the schedule, defaults to the padded length used by
+           `_gen_uniform_suggested_schedule`
+    :return: the success ratio and the already overdue success ratio, as floats for a single run or arrays of shape
+             (runs,) for many runs
+    """
+    single_run = np.ndim(arrivals) == 1
+    arrivals = np.atleast_2d(np.asarray(arrivals))
+    num_runs, num_arrivals = arrivals.shape
+    if schedule_length is None:
+        schedule_length = num_arrivals + math.ceil(window * 2)
+    capacity = np.broadcast_to(np.asarray(capacity).reshape(-1, 1), (num_runs, 1))
+
+    creation_times, bounds = _cohort_bounds(arrivals, offset, queue)
+    served = _cumulative_served(bounds, num_arrivals, np.repeat(capacity, schedule_length, axis=1))
+    # prepend the nothing served state so that a deadline before the schedule start reads 0
+    served = np.concatenate((np.zeros((num_runs, 1), dtype=served.dtype), served), axis=1)
+    before, after = bounds[:, :-1], bounds[:, 1:]
+    total_served = served[:, -1:]
+    processed = np.minimum(np.maximum(total_served, before), after) - before
+    remaining = (after - before) - processed
+
+    num_queued = len(creation_times) - num_arrivals
+    already_overdue_cohorts = np.arange(len(creation_times)) < num_queued
+    already_overdue_cohorts &= offset - creation_times > window
+    total_already_overdue = (after - before)[:, already_overdue_cohorts].sum(axis=1)
+    total_not_already_overdue = bounds[:, -1] - total_already_overdue
+
+    # arrivals that became overdue, excluding those already overdue before the start time
+    # the carryover queue is checked as if it were processed the time unit after the schedule ends
+    processed_on_time = _processed_by(served, bounds, np.floor(creation_times + window) - offset)
+    unit_time = max(schedule_length, 1)
+    late_remaining = remaining * (unit_time + offset - creation_times > window)
+    became_overdue = (processed - processed_on_time + late_remaining)[:, creation_times >= offset - window]
+    num_became_overdue = became_overdue.sum(axis=1)
+
+    # arrivals from before the start time that are not processed within the final window
+    # the carryover queue is checked as if it were processed on the last time unit of the schedule
+    processed_by_final = _processed_by(served, bounds, np.floor(creation_times + final_window) - offset)
+    unit_time = max(schedule_length - 1, 0)
+    late_remaining = remaining * (offset + unit_time - creation_times > final_window)
+    late_processed = (processed - processed_by_final) * (creation_times < offset)
+    num_overdue_failed = (late_processed + late_remaining).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(total_not_already_overdue == 0, 1., 1 - num_became_overdue / total_not_already_overdue)
+        ratio_already_overdue = np.where(total_already_overdue == 0, 1.,
+                                         1 - num_overdue_failed / total_already_overdue)
+    if single_run:
+        return float(ratio[0]), float(ratio_already_overdue[0])
+    return ratio, ratio_already_overdue
+
+
+def _processed_by(served: np.ndarray, bounds: np.ndarray, deadlines: np.ndarray) -> np.ndarray:
+    """
+    The number of arrivals of each cohort processed by the end of the cohort's deadline
+
+    :param served: the cumulative served counts with a leading nothing served column, shape (runs, time units + 1)
+    :param bounds: the cumulative number of arrivals before each cohort, shape (runs, cohorts + 1)
+    :param deadlines: the last time unit relative to the schedule start for each cohort, shape (cohorts,)
+    :return: the number processed by the deadline, shape (runs, cohorts)
+    """
+    # deadlines past the end of the schedule read the final served count
+    served_by_deadline = served[:, np.clip(deadlines.astype(int) + 1, 0, served.shape[1] - 1)]
+    return np.minimum(np.maximum(served_by_deadline, bounds[:, :-1]), bounds[:, 1:]) - bounds[:, :-1]
@@ -0,0 +1,40 @@
+from sim.resources import minintervalschedule as gas
+from collections import deque
+import numpy as np
+import pytest
+
+
+def scalar_allocations(queue, arrivals, min_ratio, window, final_window, offset, lo, hi):
+    return [gas._min_uniform_allocation(queue=queue, arrivals=list(run_arrivals), min_ratio=min_ratio, window=window,
+                                        final_window=final_window, offset=offset, lo=run_lo, hi=run_hi)
+            for run_arrivals, run_lo, run_hi in zip(arrivals, lo, hi)]
+
+
+def test_no_schedule_when_overdue_arrivals_exceed_final_window():
+    start_queue = deque([[-4, 9], [-3, 5], [-2, 1], [-1, 10]])
+    arrivals = np.array([[0, 0, 0], [1, 2, 3]])
+    allocations = gas._min_uniform_allocations(queue=start_queue, arrivals=arrivals, window=0, min_ratio=1.,
+                                               final_window=0, offset=0, lo=np.array([0, 0]),
+                                               hi=np.array([25, 28]))
+    assert allocations == [None, None]
+
+
+def test_no_schedule_only_for_runs_where_hi_too_small():
+    arrivals = np.array([[2, 0, 0], [1, 1, 0]])
+    allocations = gas._min_uniform_allocations(queue=deque(), arrivals=arrivals, window=0, min_ratio=1.,
+                                               final_window=0, offset=0, lo=np.array([0, 0]), hi=np.array([1, 1]))
+    assert allocations == [None, 1]
+
+
+@pytest.mark.parametrize('min_ratio,window,final_window', [(1., 0., 0.), (0.8, 0., 2.), (0.8, 1., 2.),
+                                                           (0.5, 2., 4.), (0.9, 1.5, 3.)])
+def test_matches_scalar_search(min_ratio, window, final_window):
+    rng = np.random.default_rng(3)
+    for queue in [deque(), deque([[-2, 3], [-1, 6]]), deque([[-10, 2]])]:
+        arrivals = rng.integers(0, 10, size=(60, 5))
+        hi = gas._hi_batch(queue, arrivals)
+        lo = np.zeros_like(hi)
+        expected = scalar_allocations(queue, arrivals, min_ratio, window, final_window, 0, lo, hi)
+        allocations = gas._min_uniform_allocations(queue=queue, arrivals=arrivals, min_ratio=min_ratio, window=window,
+                                                   final_window=final_window, offset=0, lo=lo, hi=hi)
+        assert allocations == expected
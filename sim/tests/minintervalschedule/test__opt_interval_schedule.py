@@ -134,3 +134,51 @@ def test_confidence():
     assert schedule1.remainder_queue[0] == [1, 2]
 
 
+
+
+def test_remainder_queue_uses_allocation_samples():
+    queue = deque()
+    # every sample is different so the remainder depends on which samples it is simulated on
+    data_frame = DataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)], 100)
+    schedule = gas._opt_interval_schedule(queue=queue, data_frame=data_frame, interval=0, min_ratio=0.8,
+                                          window=1., final_window=2., num_sim_runs=2, confidence=90,
+                                          reuse_samples=True)
+    assert data_frame.invoke_count == 2
+    assert list(schedule.remainder_queue) == [[1, 6]]
+
+
+def test_remainder_queue_resamples_by_default():
+    queue = deque()
+    data_frame = DataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)], 100)
+    schedule = gas._opt_interval_schedule(queue=queue, data_frame=data_frame, interval=0, min_ratio=0.8,
+                                          window=1., final_window=2., num_sim_runs=2, confidence=90)
+    assert data_frame.invoke_count == 4
+    assert list(schedule.remainder_queue) == [[1, 10]]
+
+
+class SequenceDataFrame:
+    # mock data frame returning the given samples in turn, so the runs are not in order of their remainder queues
+    def __init__(self, samples, intervals):
+        self.samples = samples
+        self.intervals = intervals
+        self.invoke_count = 0
+
+    def get_interval_size(self, interval):
+        return self.intervals[interval][1] - self.intervals[interval][0]
+
+    def get_interval_sample(self, interval):
+        sample = self.samples[self.invoke_count % len(self.samples)]
+        self.invoke_count += 1
+        return sample
+
+
+def test_remainder_queue_is_confidence_percentile():
+    # the remainder queues of the runs are [[1, 8]], [], [[0, 2], [1, 12]] and [[1, 2]]
+    # the 50th percentile of the 4 queues sorted by size is the second smallest, [[1, 2]]
+    for reuse_samples in [True, False]:
+        data_frame = SequenceDataFrame([[9, 9], [3, 3], [12, 12], [6, 6]], [(0, 2)])
+        schedule = gas._opt_interval_schedule(queue=deque(), data_frame=data_frame, interval=0, min_ratio=0.8,
+                                              window=1., final_window=2., num_sim_runs=4, confidence=50,
+                                              reuse_samples=reuse_samples)
+        assert schedule.allocation == 5
+        assert list(schedule.remainder_queue) == [[1, 2]]
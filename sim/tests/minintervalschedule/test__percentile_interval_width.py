@@ -0,0 +1,21 @@
+from sim.resources import minintervalschedule as gas
+import math
+
+
+def test_infinite_when_too_few_runs():
+    assert gas._percentile_interval_width([5, 6, 7], 90) == math.inf
+
+
+def test_zero_when_allocations_agree():
+    assert gas._percentile_interval_width([4] * 100, 90) == 0
+
+
+def test_width_between_order_statistics():
+    # ranks 84 and 96 bound the 90th percentile of 100 runs
+    allocations = list(range(100, 0, -1))
+    assert gas._percentile_interval_width(allocations, 90) == 96 - 84
+
+
+def test_batch_sizes_cover_all_runs():
+    assert gas._batch_sizes(250, 100) == [100, 100, 50]
+    assert gas._batch_sizes(100, 100) == [100]
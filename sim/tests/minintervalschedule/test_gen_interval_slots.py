@@ -1,5 +1,7 @@
 from sim.resources.minintervalschedule import gen_min_interval_slots, DataFrame
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pytest
 
 
@@ -51,6 +53,120 @@ def test_none_when_schedule_infeasible():
     assert slots is None
 
 
+class BatchedDataFrame(DataFrame):
+    def get_interval_samples(self, i: int, n: int, rng: np.random.Generator):
+        start, end = self.intervals[i]
+        return np.asarray(self.data[start: end]) + rng.integers(0, 3, size=(n, end - start))
+
+
+def test_batched_samples_are_reproducible_with_seed():
+    data_frame = BatchedDataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)])
+
+    def expected_slots(executor=None):
+        slots = gen_min_interval_slots(queue=deque(), data_frame=data_frame, start=0, end=3, min_ratio=0.8,
+                                       window=1., final_window=2., num_sim_runs=50, confidence=90,
+                                       executor=executor, max_workers=2 if executor else None, seed=7)
+        return [slot.expected_slots for slot in slots]
+
+    assert expected_slots() == expected_slots()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert expected_slots(executor) == expected_slots(executor)
+
+
+def test_reports_runs_used():
+    data_frame = DataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)])
+    slots = gen_min_interval_slots(queue=deque(), data_frame=data_frame, start=1, end=2, min_ratio=0.8,
+                                   window=1., final_window=2., num_sim_runs=30, confidence=90)
+    assert [slot.num_sim_runs for slot in slots] == [30, 30]
+
+
+def test_stops_early_within_tolerance():
+    data_frame = DataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)])
+    slots = gen_min_interval_slots(queue=deque(), data_frame=data_frame, start=1, end=2, min_ratio=0.8,
+                                   window=1., final_window=2., num_sim_runs=1000, confidence=90,
+                                   tolerance=0, batch_size=50)
+    assert [slot.expected_slots for slot in slots] == [5, 6]
+    assert [slot.num_sim_runs for slot in slots] == [50, 50]
+
+
+def test_runs_all_batches_when_outside_tolerance():
+    data_frame = BatchedDataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)])
+    slots = gen_min_interval_slots(queue=deque(), data_frame=data_frame, start=0, end=3, min_ratio=0.8,
+                                   window=1., final_window=2., num_sim_runs=120, confidence=99,
+                                   tolerance=0, batch_size=50, seed=3)
+    assert [slot.num_sim_runs for slot in slots] == [120] * 4
+
+
+def test_runs_one_batch_per_interval_without_time():
+    data_frame = DataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)])
+    slots = gen_min_interval_slots(queue=deque(), data_frame=data_frame, start=1, end=2, min_ratio=0.8,
+                                   window=1., final_window=2., num_sim_runs=1000, confidence=90,
+                                   batch_size=20, time_budget=0)
+    assert [slot.expected_slots for slot in slots] == [5, 6]
+    assert [slot.num_sim_runs for slot in slots] == [20, 20]
+
+
+def test_runs_all_simulations_within_time_budget():
+    data_frame = DataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)])
+    slots = gen_min_interval_slots(queue=deque(), data_frame=data_frame, start=1, end=2, min_ratio=0.8,
+                                   window=1., final_window=2., num_sim_runs=60, confidence=90,
+                                   batch_size=20, time_budget=60)
+    assert [slot.num_sim_runs for slot in slots] == [60, 60]
+
+
+def test_error_when_time_budget_is_negative():
+    data_frame = DataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)])
+    with pytest.raises(ValueError):
+        gen_min_interval_slots(queue=deque(), data_frame=data_frame, start=0, end=2, min_ratio=0.8,
+                               window=1., final_window=2., num_sim_runs=10, confidence=90, time_budget=-1)
+
+
+def test_error_when_tolerance_is_negative():
+    data_frame = DataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)])
+    with pytest.raises(ValueError):
+        gen_min_interval_slots(queue=deque(), data_frame=data_frame, start=0, end=2, min_ratio=0.8,
+                               window=1., final_window=2., num_sim_runs=10, confidence=90, tolerance=-1)
+
+
+def test_returns_same_schedule_with_executor():
+    queue = deque()
+    data_frame = DataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)])
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        slots = gen_min_interval_slots(queue=queue, data_frame=data_frame, start=1, end=2, min_ratio=0.8,
+                                       window=1., final_window=2., num_sim_runs=5, confidence=90,
+                                       executor=executor, max_workers=3)
+    assert len(slots) == 2
+    assert slots[0].expected_slots == 5
+    assert slots[0].interval_range == (2, 4)
+    assert slots[1].expected_slots == 6
+    assert slots[1].interval_range == (4, 7)
+
+
+def test_returns_same_schedule_with_process_pool():
+    queue = deque()
+    data_frame = DataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)])
+    slots = gen_min_interval_slots(queue=queue, data_frame=data_frame, start=1, end=2, min_ratio=0.8,
+                                   window=1., final_window=2., num_sim_runs=4, confidence=90, max_workers=2)
+    assert [slot.expected_slots for slot in slots] == [5, 6]
+
+
+def test_none_when_schedule_infeasible_with_executor():
+    queue = deque([[-10, 1]])
+    data_frame = DataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)])
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        slots = gen_min_interval_slots(queue=queue, data_frame=data_frame, start=0, end=2, min_ratio=0.8,
+                                       window=1., final_window=2., num_sim_runs=3, confidence=90,
+                                       executor=executor, max_workers=2)
+    assert slots is None
+
+
+def test_error_when_max_workers_is_0():
+    data_frame = DataFrame([5, 7, 4, 8, 6, 4, 5, 7, 7], [(0, 2), (2, 4), (4, 7), (7, 9)])
+    with pytest.raises(ValueError):
+        gen_min_interval_slots(queue=deque(), data_frame=data_frame, start=0, end=2, min_ratio=0.8,
+                               window=1., final_window=2., num_sim_runs=1, confidence=90, max_workers=0)
+
+
 @pytest.mark.stress
 def test_succeeds_when_thousands_of_sims_are_ran():
     queue = deque()
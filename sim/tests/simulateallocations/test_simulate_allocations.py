@@ -1,4 +1,5 @@
 from sim import simulate_allocations
+from collections import deque
 import pytest
 
 
@@ -120,3 +121,20 @@ def test_offset_applied_to_all_arrival_times():
     assert True, schedule_same_length_as_arrivals.schedule[0].contains(2)
     assert True, schedule_same_length_as_arrivals.schedule[1].contains(3)
     assert True, schedule_same_length_as_arrivals.schedule[2].contains(4)
+
+
+def test_start_queue_is_reused_without_modification():
+    """
+    Validate that simulations starting from the same queue do not change it, so it can be shared between simulations
+    :return:
+    """
+    start_queue = deque([[-2, 3], [-1, 4]])
+    first = simulate_allocations([5, 5], [4, 4], 0, start_queue)
+    assert start_queue == deque([[-2, 3], [-1, 4]])
+    assert first.remainder_queue == deque([[0, 4], [1, 5]])
+
+    # the remainder queue is the start of the next simulation
+    second = simulate_allocations([1], [10], 2, first.remainder_queue)
+    assert second.remainder_queue == deque()
+    assert first.remainder_queue == deque([[0, 4], [1, 5]])
+    assert second.schedule[0].record == {0: 4, 1: 5, 2: 1}
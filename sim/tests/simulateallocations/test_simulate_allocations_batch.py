@@ -0,0 +1,51 @@
+from sim import simulate_allocations, simulate_allocations_batch
+from collections import deque
+import numpy as np
+import pytest
+
+
+def test_errors_when_arrivals_longer_than_schedule():
+    with pytest.raises(Exception):
+        simulate_allocations_batch(np.array([[100, 200, 300]]), np.array([100]), 0)
+
+
+def test_processes_each_run_independently():
+    arrivals = np.array([[10, 10, 10],
+                         [1000000, 1000000, 1000000],
+                         [10, 10, 10]])
+    result = simulate_allocations_batch(arrivals, np.array([8, 8, 8, 8]), 0)
+    assert result.processed.tolist() == [[8, 8, 8, 6], [8, 8, 8, 8], [8, 8, 8, 6]]
+    assert result.remainder_queue(0) == deque()
+    assert result.remainder_queue(1) == deque([[0, 999968], [1, 1000000], [2, 1000000]])
+
+
+def test_accepts_a_schedule_per_run():
+    arrivals = np.array([[10, 10, 10], [10, 10, 10]])
+    result = simulate_allocations_batch(arrivals, np.array([[10, 10, 10], [5, 5, 5]]), 0)
+    assert result.processed.tolist() == [[10, 10, 10], [5, 5, 5]]
+    assert result.remainder.tolist() == [[0, 0, 0], [0, 5, 10]]
+
+
+def test_start_queue_processed_first_and_overdue_counted():
+    queue = deque([[-2, 3], [-1, 4]])
+    result = simulate_allocations_batch(np.array([[5, 0, 5]]), np.array([4, 4, 4, 4]), 0, queue)
+    assert result.processed.tolist() == [[4, 4, 4, 4]]
+    # the start queue is processed at times 0 and 1, the arrivals of time 0 finish at time 2
+    assert result.overdue(1.)[0].tolist() == [3, 3, 4, 0]
+    assert result.remainder_queue(0) == deque([[2, 1]])
+
+
+def test_matches_simulate_allocations():
+    rng = np.random.default_rng(0)
+    queue = deque([[-3, 2], [-1, 6]])
+    arrivals = rng.integers(0, 10, size=(50, 6))
+    slot_schedule = rng.integers(0, 10, size=8)
+    result = simulate_allocations_batch(arrivals, slot_schedule, 3, queue)
+    for run in range(len(arrivals)):
+        expected = simulate_allocations(list(arrivals[run]), list(slot_schedule), 3, queue)
+        assert result.processed[run].tolist() == [breakdown.total for breakdown in expected.schedule]
+        assert result.remainder_queue(run) == expected.remainder_queue
+        expected_overdue = [sum(count for creation_time, count in breakdown.record.items()
+                                if breakdown.current_time - creation_time > 1.)
+                            for breakdown in expected.schedule]
+        assert result.overdue(1.)[run].tolist() == expected_overdue
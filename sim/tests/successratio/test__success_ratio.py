@@ -155,3 +155,25 @@ def test_success_ratio_partial_multiple_allocations_zero_window():
 
     s = success_ratio(breakdown_allocations, start_queue, carryover_queue,  0., 2)
     np.testing.assert_almost_equal(s, (10 / (10*2)), decimal=8)
+
+
+def test_success_ratio_same_for_schedule_record():
+    """
+    validate that the compact schedule record gives the same ratio as the list of time unit breakdowns
+    :return:
+    """
+    breakdown_allocations = []
+    start_queue = deque([[0, 10], [1, 10]])
+    carryover_queue = deque([[3, 5]])
+    breakdown_2 = types.TimeUnitBreakdown(2)
+    breakdown_2.add(1, 10)
+    breakdown_2.add(0, 10)
+    breakdown_allocations.append(breakdown_2)
+    breakdown_3 = types.TimeUnitBreakdown(3)
+    breakdown_3.add(3, 5)
+    breakdown_3.add(2, 10)
+    breakdown_allocations.append(breakdown_3)
+    record = types.ScheduleRecord.from_breakdowns(breakdown_allocations)
+
+    s = success_ratio(breakdown_allocations, start_queue, carryover_queue,  0., 2)
+    assert success_ratio(record, start_queue, carryover_queue,  0., 2) == s
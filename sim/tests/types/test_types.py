@@ -1,4 +1,7 @@
 from sim.resources import types as t
+from collections import deque
+import numpy as np
+import pytest
 
 
 def test_time_unit_breakdown_add():
@@ -10,3 +13,49 @@ def test_time_unit_breakdown_add():
 
     tub.add(1, 20)
     assert tub.total == 20
+
+
+def test_schedule_record_from_breakdowns():
+    first = t.TimeUnitBreakdown(2)
+    first.add(0, 3)
+    first.add(1, 4)
+    second = t.TimeUnitBreakdown(3)
+    record = t.ScheduleRecord.from_breakdowns([first, second])
+    assert len(record) == 2
+    assert record.times.tolist() == [2, 2]
+    assert record.creation_times.tolist() == [0, 1]
+    assert record.counts.tolist() == [3, 4]
+
+
+def test_schedule_record_time_unit_views():
+    record = t.ScheduleRecord(np.array([2, 3, 4]), np.array([2, 2, 4]), np.array([0, 1, 2]), np.array([3, 4, 5]))
+    assert [view.current_time for view in record] == [2, 3, 4]
+    assert record[0].total == 7
+    assert record[0].record == {0: 3, 1: 4}
+    assert record[0].contains(1)
+    assert record[1].total == 0
+    assert record[1].record == {}
+    assert not record[1].contains(1)
+    assert record[-1].record == {2: 5}
+    with pytest.raises(IndexError):
+        record[3]
+
+
+def test_run_length_queue_reads_unprocessed_arrivals():
+    queue = t.RunLengthQueue(np.array([0, 1, 2]), np.array([3, 4, 5]), head=1, head_processed=1)
+    assert len(queue) == 2
+    assert queue[0] == [1, 3]
+    assert queue[-1] == [2, 5]
+    assert list(queue) == [[1, 3], [2, 5]]
+    assert queue == deque([[1, 3], [2, 5]])
+    # the arrays are not modified when reading a partially processed head
+    assert queue.counts.tolist() == [3, 4, 5]
+    with pytest.raises(IndexError):
+        queue[2]
+
+
+def test_run_length_queue_from_queue():
+    queue = t.RunLengthQueue.from_queue(deque([[-2, 3], [-1, 4]]))
+    assert queue.creation_times.tolist() == [-2, -1]
+    assert queue.counts.tolist() == [3, 4]
+    assert t.RunLengthQueue.from_queue(deque()) == deque()
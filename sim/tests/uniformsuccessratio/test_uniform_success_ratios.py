@@ -0,0 +1,50 @@
+from sim.resources.uniform_success_ratio import uniform_success_ratios
+from sim.resources.simulateallocations import simulate_allocations
+from sim.resources.success_ratio import success_ratio, success_ratio_already_overdue
+from sim.resources.minintervalschedule import _gen_uniform_suggested_schedule
+from collections import deque
+import numpy as np
+import pytest
+
+
+def simulated_ratios(queue, arrivals, capacity, window, final_window, offset):
+    # reference values from simulating the uniform schedule
+    schedule = _gen_uniform_suggested_schedule(arrivals, capacity, window)
+    result = simulate_allocations(arrivals, schedule, offset, queue)
+    return (success_ratio(result.schedule, queue, result.remainder_queue, window, offset),
+            success_ratio_already_overdue(result.schedule, queue, result.remainder_queue, window, final_window,
+                                          offset))
+
+
+def test_all_on_time_when_capacity_covers_arrivals():
+    assert uniform_success_ratios(deque(), [5, 7, 4], 7, 1., 2., 0) == (1., 1.)
+
+
+def test_already_overdue_queue_fails_when_never_processed():
+    queue = deque([[-4, 9], [-3, 5]])
+    ratio, ratio_already_overdue = uniform_success_ratios(queue, [0, 0, 0], 0, 0, 0, 0)
+    assert ratio == 1.
+    assert ratio_already_overdue == 0.
+
+
+@pytest.mark.parametrize('window,final_window', [(0., 0.), (0., 2.), (1., 2.), (1.5, 3.), (2., 2.)])
+def test_matches_simulation(window, final_window):
+    rng = np.random.default_rng(1)
+    for _ in range(100):
+        offset = int(rng.integers(0, 5))
+        queue = deque([[offset - 3, int(rng.integers(1, 6))], [offset - 1, int(rng.integers(1, 6))]])
+        arrivals = rng.integers(0, 10, size=int(rng.integers(1, 8))).tolist()
+        capacity = int(rng.integers(0, 12))
+        expected = simulated_ratios(queue, arrivals, capacity, window, final_window, offset)
+        assert uniform_success_ratios(queue, arrivals, capacity, window, final_window, offset) == expected
+
+
+def test_matches_simulation_for_many_runs():
+    rng = np.random.default_rng(2)
+    queue = deque([[-2, 4], [-1, 3]])
+    arrivals = rng.integers(0, 10, size=(40, 5))
+    capacity = rng.integers(0, 12, size=40)
+    ratios, ratios_already_overdue = uniform_success_ratios(queue, arrivals, capacity, 1., 2., 0)
+    for run in range(len(arrivals)):
+        expected = simulated_ratios(queue, arrivals[run].tolist(), int(capacity[run]), 1., 2., 0)
+        assert (ratios[run], ratios_already_overdue[run]) == expected